@@ -0,0 +1,1190 @@
+"""CSC110 Project 2020: The Benchmarks of the Project
+
+Description
+===========
+This module times the functions of this project on larger copies of the
+datasets. Each benchmark prints a small table of its results when this file
+is run.
+
+Copyright and Usage Information
+===============================
+This file is for the personal and private use of Katherine Luo, Kevin Xia,
+and Jennifer Cao. Any forms of distribution of this code, with or without
+changes to this code, are prohibited.
+
+This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import bz2
+import csv
+import datetime
+import gzip
+import json
+import lzma
+import math
+import platform
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import plotly.graph_objects as go
+
+import data_analysis
+import data_wrangling
+import incremental
+import instrumentation
+import plots
+import resampling
+import stations
+
+# The target time (in seconds) for importing the modules needed to compute the results of
+# main.py, as measured by python -X importtime, reported by benchmark_startup. The doctest
+# of instrumentation.import_times checks them against importing plots instead, which does
+# not depend on the speed of the machine.
+IMPORT_BUDGET = 0.5
+
+# The numbers of rows of the synthetic datasets of run_benchmark_suite
+SUITE_SIZES = (10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+
+# The largest number of rows run_benchmark_suite loads as lists of dataclasses, which take
+# several hundred bytes per row
+LIST_LIMIT = 10 ** 6
+
+# The number of rows written at once by the synthetic dataset writers
+WRITE_CHUNK = 10 ** 6
+
+# The memory limit (in bytes) of each process of benchmark_stations
+STATION_MEMORY_LIMIT = 2 ** 31
+
+
+def replicate_csv(filepath: str, factor: int, out_path: str) -> None:
+    """Write a copy of the CSV file at filepath to out_path with its data rows
+    repeated factor times. The header row is written once.
+
+    Preconditions:
+        - factor > 0
+    """
+    with open(filepath) as file:
+        header = file.readline()
+        body = file.read()
+
+    if not body.endswith('\n'):
+        body += '\n'
+
+    with open(out_path, 'w') as out:
+        out.write(header)
+        for _ in range(0, factor):
+            out.write(body)
+
+
+def measure(func: Callable, *args: Any) -> Tuple[float, int, int]:
+    """Return the wall time (in seconds), the peak traced memory (in bytes) and the
+    memory still held by the return value (in bytes) of calling func with the
+    given arguments.
+
+    func is called twice: once untraced for the time and once traced for the memory,
+    since tracing slows down allocation-heavy code far more than array code.
+    """
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = func(*args)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return (elapsed, peak, retained)
+
+
+def read_csv_rows2(filepath: str) -> List[data_wrangling.TorontoTemperatureDaily]:
+    """Return a list of TorontoTemperatureDaily dataclasses built one row at a
+    time from the CSV file: weatherstats_toronto_daily.csv.
+
+    This is the original row-by-row loader, kept as the baseline for
+    benchmark_loaders.
+    """
+    with open(filepath) as file:
+        reader = csv.reader(file)
+        next(reader)
+
+        return [data_wrangling.csv_to_dataclass2(row) for row in reader if row[1] != '']
+
+
+def benchmark_loaders(factors: Tuple[int, ...] = (1, 10, 100)) -> None:
+    """Print the time and peak memory of the row-by-row loader against the
+    columnar loader on weatherstats_toronto_daily.csv replicated by each factor.
+    """
+    print(f'{"rows":>10} {"loader":>16} {"seconds":>10} {"peak MiB":>10} {"held MiB":>10}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for factor in factors:
+            path = os.path.join(directory, f'weatherstats_x{factor}.csv')
+            replicate_csv('weatherstats_toronto_daily.csv', factor, path)
+            rows = len(data_wrangling.read_csv_table2(path).dates)
+
+            for name, loader in [('row-by-row', read_csv_rows2),
+                                 ('read_csv_table2', data_wrangling.read_csv_table2),
+                                 ('read_csv_data2', data_wrangling.read_csv_data2)]:
+                seconds, peak, retained = measure(loader, path)
+                print(f'{rows:>10} {name:>16} {seconds:>10.3f} '
+                      f'{peak / 2 ** 20:>10.1f} {retained / 2 ** 20:>10.1f}')
+
+
+def reference_linear_regression(x_coords: List[float], y_coords: List[float]) \
+        -> Dict[str, float]:
+    """Return the same mapping as data_analysis.simple_linear_regression, computed
+    with the original pure Python loops.
+
+    This is kept as the baseline for benchmark_regression.
+
+    Preconditions:
+        - len(x_coords) == len(y_coords) > 0
+    """
+    n = len(x_coords)
+    x_avg = sum(x_coords) / n
+    y_avg = sum(y_coords) / n
+
+    numerator, x_denominator, y_denominator = 0, 0, 0
+    for i in range(0, n):
+        numerator += (x_coords[i] - x_avg) * (y_coords[i] - y_avg)
+        x_denominator += (x_coords[i] - x_avg) ** 2
+        y_denominator += (y_coords[i] - y_avg) ** 2
+
+    slope = numerator / x_denominator
+    y_intercept = y_avg - slope * x_avg
+    correlation = numerator / math.sqrt(x_denominator * y_denominator)
+    r_squared_numerator = sum([(y_coords[i] - (slope * x_coords[i] + y_intercept)) ** 2
+                               for i in range(0, n)])
+
+    return {'slope': slope, 'y-intercept': y_intercept,
+            'correlation': correlation, 'R^2': 1 - r_squared_numerator / y_denominator}
+
+
+def synthetic_coordinates(n: int, seed: int = 110) -> Tuple[np.ndarray, np.ndarray]:
+    """Return n synthetic (year, temperature) coordinates with a linear trend and noise."""
+    rng = np.random.default_rng(seed)
+    x_coords = rng.uniform(1940, 2020, n)
+    y_coords = 0.02 * x_coords - 32 + rng.normal(0, 1, n)
+
+    return (x_coords, y_coords)
+
+
+def benchmark_regression(sizes: Tuple[int, ...] = (10 ** 4, 10 ** 6, 10 ** 8),
+                         reference_limit: int = 10 ** 6) -> None:
+    """Print the time of simple_linear_regression on float64 arrays and on lists
+    against the original pure Python version, for each number of points in sizes.
+
+    The pure Python version is skipped above reference_limit points, where the lists
+    alone would not fit in memory.
+    """
+    print(f'{"points":>10} {"regression":>22} {"seconds":>10} {"max rel. diff":>14}')
+
+    for n in sizes:
+        x_coords, y_coords = synthetic_coordinates(n)
+        start = time.perf_counter()
+        results = data_analysis.simple_linear_regression(x_coords, y_coords)
+        print(f'{n:>10} {"arrays":>22} {time.perf_counter() - start:>10.3f}')
+
+        if n <= reference_limit:
+            x_list, y_list = x_coords.tolist(), y_coords.tolist()
+            start = time.perf_counter()
+            data_analysis.simple_linear_regression(x_list, y_list)
+            print(f'{n:>10} {"lists":>22} {time.perf_counter() - start:>10.3f}')
+
+            start = time.perf_counter()
+            reference = reference_linear_regression(x_list, y_list)
+            elapsed = time.perf_counter() - start
+            difference = max(abs(results[key] - reference[key]) / max(1.0, abs(reference[key]))
+                             for key in reference)
+            print(f'{n:>10} {"pure Python (original)":>22} {elapsed:>10.3f} {difference:>14.1e}')
+
+        del x_coords, y_coords
+
+
+def benchmark_batch_regression(n: int = 10 ** 6, targets: Tuple[int, ...] = (1, 10, 50)) -> None:
+    """Print the time of one batch_linear_regression call against one
+    simple_linear_regression call per column, for each number of y-columns in targets.
+    """
+    print(f'{"points":>10} {"targets":>8} {"per column":>12} {"batched":>10}')
+    x_coords, _ = synthetic_coordinates(n)
+
+    for k in targets:
+        y_columns = np.random.default_rng(k).normal(0, 1, (n, k))
+
+        start = time.perf_counter()
+        for j in range(0, k):
+            data_analysis.simple_linear_regression(x_coords, y_columns[:, j])
+        per_column = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data_analysis.batch_linear_regression(x_coords, y_columns)
+        print(f'{n:>10} {k:>8} {per_column:>12.3f} {time.perf_counter() - start:>10.3f}')
+
+
+def reference_daily_to_yearly(daily_temps: List[data_wrangling.TorontoTemperatureDaily]) \
+        -> List[data_wrangling.TorontoTemperatureYearly]:
+    """Return the same list as data_wrangling.daily_to_yearly, computed with the
+    original loop, which assumes the days are contiguous by year.
+
+    This is kept as the baseline for benchmark_aggregation.
+
+    Preconditions:
+        - len(daily_temps) > 0
+    """
+    daily_temps_modified = daily_temps + [data_wrangling.TorontoTemperatureDaily(
+        date=datetime.date(9999, 1, 1), avg_temp=0)]
+
+    current_year = daily_temps[0].date.year
+    yearly_temps_so_far = []
+    temps_so_far = []
+
+    for daily_temp in daily_temps_modified:
+        temps_so_far.append(daily_temp.avg_temp)
+
+        if daily_temp.date.year != current_year:
+            yearly_temps_so_far.append(data_wrangling.TorontoTemperatureYearly(
+                date=datetime.date(current_year, 1, 1),
+                avg_temp=sum(temps_so_far) / len(temps_so_far)))
+            current_year = daily_temp.date.year
+            temps_so_far = []
+
+    return yearly_temps_so_far
+
+
+def synthetic_daily_table(n: int, seed: int = 110) -> data_wrangling.TorontoTemperatureTable:
+    """Return a TorontoTemperatureTable of n days in a random order, drawn from the
+    years 1840-2020 with a seasonal cycle and noise.
+    """
+    rng = np.random.default_rng(seed)
+    days = rng.integers(np.datetime64('1840-01-01').astype(int),
+                        np.datetime64('2020-12-31').astype(int), n)
+    avg_temps = 8 - 12 * np.cos(2 * np.pi * (days % 365.25) / 365.25) + rng.normal(0, 4, n)
+
+    return data_wrangling.TorontoTemperatureTable(dates=days.astype('datetime64[D]'),
+                                                  avg_temps=avg_temps)
+
+
+def benchmark_aggregation(n: int = 10 ** 6) -> None:
+    """Print the time of the original daily_to_yearly loop against daily_to_yearly
+    and summarize_temperatures on n days in a random order.
+
+    The original loop is only timed: its averages are wrong for unsorted days.
+    """
+    table = synthetic_daily_table(n)
+    daily_temps = [data_wrangling.TorontoTemperatureDaily(date=date, avg_temp=avg_temp)
+                   for date, avg_temp in zip(table.dates.tolist(), table.avg_temps.tolist())]
+
+    print(f'{"days":>10} {"aggregation":>30} {"seconds":>10}')
+    for name, func, data in [('original loop', reference_daily_to_yearly, daily_temps),
+                             ('daily_to_yearly', data_wrangling.daily_to_yearly, daily_temps),
+                             ('summarize_temperatures', data_wrangling.summarize_temperatures,
+                              table)]:
+        start = time.perf_counter()
+        func(data)
+        print(f'{n:>10} {name:>30} {time.perf_counter() - start:>10.3f}')
+
+    for period in data_wrangling.PERIODS[1:]:
+        start = time.perf_counter()
+        data_wrangling.summarize_temperatures(table, period)
+        print(f'{n:>10} {"summarize_temperatures " + period:>30} '
+              f'{time.perf_counter() - start:>10.3f}')
+
+
+def benchmark_parallel_loading(factor: int = 100, workers: Tuple[int, ...] = (1, 2, 4, 8)) -> None:
+    """Print the time of read_csv_table2 on weatherstats_toronto_daily.csv replicated
+    factor times, for each number of worker processes in workers.
+
+    The speed-up is bounded by os.cpu_count(), which is printed first.
+    """
+    print(f'cpu count: {os.cpu_count()}')
+    print(f'{"rows":>10} {"workers":>8} {"seconds":>10} {"speed-up":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'weatherstats_x{factor}.csv')
+        replicate_csv('weatherstats_toronto_daily.csv', factor, path)
+        serial = None
+
+        for count in workers:
+            start = time.perf_counter()
+            rows = len(data_wrangling.read_csv_table2(path, workers=count).dates)
+            elapsed = time.perf_counter() - start
+            serial = serial or elapsed
+            print(f'{rows:>10} {count:>8} {elapsed:>10.3f} {serial / elapsed:>9.2f}')
+
+
+def benchmark_cache(factor: int = 100) -> None:
+    """Print the time and bytes read of a cold read_csv_table2 call, which parses the
+    file and writes the cache, against a warm call, which memory-maps the cache, on
+    weatherstats_toronto_daily.csv replicated factor times.
+    """
+    print(f'{"rows":>10} {"start":>6} {"seconds":>10} {"MiB read":>10}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'weatherstats_x{factor}.csv')
+        replicate_csv('weatherstats_toronto_daily.csv', factor, path)
+
+        for name in ('cold', 'warm'):
+            before = instrumentation.bytes_read()
+            start = time.perf_counter()
+            table = data_wrangling.read_csv_table2(path, cache=True)
+            elapsed = time.perf_counter() - start
+            read = (instrumentation.bytes_read() - before) / 2 ** 20
+            print(f'{len(table.dates):>10} {name:>6} {elapsed:>10.3f} {read:>10.2f}')
+            del table
+
+
+def write_sorted_daily_csv(out_path: str, n: int) -> None:
+    """Write a CSV file in the format of weatherstats_toronto_daily.csv with n days
+    ending on 2020-12-31, newest first.
+
+    Preconditions:
+        - 0 < n < 737000
+    """
+    table = synthetic_daily_table(n)
+    dates = np.datetime64('2020-12-31') - np.arange(n)
+
+    with open(out_path, 'w') as out:
+        out.write('date, avg_temperature\n')
+        out.writelines(f'{date},{avg_temp:.2f},\n'
+                       for date, avg_temp in zip(dates.astype(str), table.avg_temps.tolist()))
+
+
+def benchmark_mmap(factor: int = 100, n_sorted: int = 700000) -> None:
+    """Print the time and peak memory of read_csv_table2 against read_mmap_table2, on
+    weatherstats_toronto_daily.csv replicated factor times, and of selecting one year
+    from the daily file and from a sorted file of n_sorted days.
+
+    The year is selected by filtering a full read_csv_table2 load, and by the binary
+    search of read_mmap_table2.
+    """
+    print(f'{"rows":>10} {"query":>10} {"reader":>16} {"seconds":>10} {"peak MiB":>10}')
+    year = (datetime.date(2000, 1, 1), datetime.date(2000, 12, 31))
+
+    def filtered(path: str) -> data_wrangling.TorontoTemperatureTable:
+        table = data_wrangling.read_csv_table2(path)
+        keep = (table.dates >= np.datetime64(year[0])) & (table.dates <= np.datetime64(year[1]))
+        return data_wrangling.TorontoTemperatureTable(table.dates[keep], table.avg_temps[keep])
+
+    with tempfile.TemporaryDirectory() as directory:
+        replicated = os.path.join(directory, f'weatherstats_x{factor}.csv')
+        replicate_csv('weatherstats_toronto_daily.csv', factor, replicated)
+        sorted_path = os.path.join(directory, f'weatherstats_sorted_{n_sorted}.csv')
+        write_sorted_daily_csv(sorted_path, n_sorted)
+
+        cases = [(replicated, 'all', 'read_csv_table2', data_wrangling.read_csv_table2),
+                 (replicated, 'all', 'read_mmap_table2', data_wrangling.read_mmap_table2)]
+        for path in ('weatherstats_toronto_daily.csv', sorted_path):
+            cases.append((path, 'year 2000', 'read_csv_table2', filtered))
+            cases.append((path, 'year 2000', 'read_mmap_table2',
+                          lambda p: data_wrangling.read_mmap_table2(p, *year)))
+
+        for path, query, name, reader in cases:
+            with open(path, 'rb') as file:
+                rows = sum(1 for _ in file) - 1
+            seconds, peak, _ = measure(reader, path)
+            print(f'{rows:>10} {query:>10} {name:>16} {seconds:>10.4f} {peak / 2 ** 20:>10.1f}')
+
+
+def synthetic_atmosphere_table(n_hours: int, start: str = '2011-01-01',
+                               seed: int = 110) -> data_wrangling.TorontoAtmosphereTable:
+    """Return a TorontoAtmosphereTable of n_hours consecutive hourly readings from start,
+    with random concentrations.
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = np.datetime64(start, 'm') + np.arange(n_hours) * np.timedelta64(60, 'm')
+    columns = {name: rng.gamma(4, 5, n_hours) for name in data_wrangling.ATMOSPHERE_COLUMNS[1:]}
+
+    return data_wrangling.TorontoAtmosphereTable(timestamps=timestamps, **columns)
+
+
+def benchmark_join(years_hourly: int = 10, years_daily: int = 80,
+                   stations: Tuple[int, ...] = (1, 100)) -> None:
+    """Print the time of join_daily_temperatures against a dict lookup per reading, for
+    years_hourly years of hourly readings from each of the given numbers of stations
+    joined to years_daily years of daily temperatures, newest first.
+    """
+    n_days = years_daily * 365
+    daily = data_wrangling.TorontoTemperatureTable(
+        dates=np.datetime64('2020-12-31') - np.arange(n_days),
+        avg_temps=np.random.default_rng(1).normal(8, 10, n_days))
+
+    print(f'{"readings":>10} {"days":>7} {"join":>16} {"seconds":>10}')
+    for count in stations:
+        hourly = synthetic_atmosphere_table(years_hourly * 8760 * count)
+
+        if count == 1:
+            start = time.perf_counter()
+            by_date = dict(zip(daily.dates.tolist(), daily.avg_temps.tolist()))
+            _ = [by_date.get(timestamp.date()) for timestamp in hourly.timestamps.tolist()]
+            print(f'{len(hourly.timestamps):>10} {n_days:>7} {"dict lookup":>16} '
+                  f'{time.perf_counter() - start:>10.3f}')
+
+        for how in data_wrangling.JOIN_METHODS:
+            start = time.perf_counter()
+            data_wrangling.join_daily_temperatures(hourly, daily, how)
+            print(f'{len(hourly.timestamps):>10} {n_days:>7} {how:>16} '
+                  f'{time.perf_counter() - start:>10.3f}')
+
+
+def reference_resampling(x_coords: np.ndarray, y_coords: np.ndarray,
+                         replicates: int) -> None:
+    """Call simple_linear_regression once per bootstrap replicate and once per permutation
+    replicate of the given coordinates.
+
+    This is kept as the baseline for benchmark_resampling.
+    """
+    rng = np.random.default_rng(110)
+    for _ in range(replicates):
+        indices = rng.integers(0, len(x_coords), len(x_coords))
+        data_analysis.simple_linear_regression(x_coords[indices], y_coords[indices])
+        data_analysis.simple_linear_regression(x_coords, y_coords[rng.permutation(len(y_coords))])
+
+
+def benchmark_resampling(replicates: int = 2000, workers: Tuple[int, ...] = (1, 2, 4)) -> None:
+    """Print the time of resampled_linear_regression of date vs average temperature and of
+    year vs average yearly temperature on weatherstats_toronto_daily.csv, for each number
+    of worker processes in workers, against reference_resampling.
+
+    The speed-up is bounded by os.cpu_count(), which is printed first.
+    """
+    table = data_wrangling.read_csv_table2('weatherstats_toronto_daily.csv')
+    summary = data_wrangling.summarize_temperatures(table, 'year')
+    series = [(table.dates.astype(np.float64), table.avg_temps),
+              (summary.starts.astype('datetime64[Y]').astype(np.float64) + 1970,
+               summary.avg_temps)]
+
+    print(f'cpu count: {os.cpu_count()}')
+    print(f'{"rows":>8} {"replicates":>10} {"method":>10} {"seconds":>10} {"speed-up":>9}')
+
+    for x_coords, y_coords in series:
+        start = time.perf_counter()
+        reference_resampling(x_coords, y_coords, replicates)
+        reference = time.perf_counter() - start
+        print(f'{len(x_coords):>8} {replicates:>10} {"loop":>10} {reference:>10.3f} {1:>9.2f}')
+
+        for count in workers:
+            start = time.perf_counter()
+            resampling.resampled_linear_regression(x_coords, y_coords, replicates,
+                                                   workers=count)
+            elapsed = time.perf_counter() - start
+            print(f'{len(x_coords):>8} {replicates:>10} {f"{count} workers":>10} '
+                  f'{elapsed:>10.3f} {reference / elapsed:>9.2f}')
+
+
+def benchmark_rolling_regression(years: int = 30, step: int = 1) -> None:
+    """Print the time of rolling_linear_regression over windows of the given number of
+    years of weatherstats_toronto_daily.csv, for the daily and the yearly temperatures,
+    against one simple_linear_regression call per window.
+    """
+    table = data_wrangling.read_csv_table2('weatherstats_toronto_daily.csv')
+    summary = data_wrangling.summarize_temperatures(table, 'year')
+    series = [(table.dates.astype(np.float64), table.avg_temps, round(years * 365.25)),
+              (summary.starts.astype('datetime64[Y]').astype(np.float64) + 1970,
+               summary.avg_temps, years)]
+
+    print(f'{"rows":>8} {"window":>8} {"windows":>8} {"method":>12} {"seconds":>10}')
+    for x_coords, y_coords, window in series:
+        starts = range(0, len(x_coords) - window + 1, step)
+
+        start = time.perf_counter()
+        for first in starts:
+            data_analysis.simple_linear_regression(x_coords[first:first + window],
+                                                   y_coords[first:first + window])
+        print(f'{len(x_coords):>8} {window:>8} {len(starts):>8} {"loop":>12} '
+              f'{time.perf_counter() - start:>10.3f}')
+
+        start = time.perf_counter()
+        data_analysis.rolling_linear_regression(x_coords, y_coords, window, step)
+        print(f'{len(x_coords):>8} {window:>8} {len(starts):>8} {"prefix sums":>12} '
+              f'{time.perf_counter() - start:>10.3f}')
+
+
+def synthetic_hourly_chunk(n: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return n random rows of year and temperature inputs, and nitrogen dioxide and
+    ozone outputs depending linearly on them with noise.
+    """
+    rng = np.random.default_rng(seed)
+    x_columns = np.column_stack([rng.uniform(2000, 2020, n), rng.normal(8, 10, n)])
+    y_columns = np.column_stack([x_columns @ [-0.1, -0.35] + 215 + rng.normal(0, 5, n),
+                                 x_columns @ [0.05, 0.48] - 76 + rng.normal(0, 5, n)])
+
+    return (x_columns, y_columns)
+
+
+def streamed_multiple_regression(n: int, chunk_size: int) -> data_analysis.LinearModel:
+    """Return the model of n synthetic rows fitted by a LeastSquaresAccumulator updated
+    with chunks of chunk_size rows generated one at a time."""
+    accumulator = data_analysis.LeastSquaresAccumulator()
+    for start in range(0, n, chunk_size):
+        accumulator.update(*synthetic_hourly_chunk(min(chunk_size, n - start), start))
+
+    return accumulator.solve()
+
+
+def lstsq_regression(x_columns: np.ndarray, y_columns: np.ndarray) -> np.ndarray:
+    """Return the intercepts and coefficients of the least-squares fit of y_columns on
+    x_columns and an intercept, solved by numpy.linalg.lstsq on the whole design matrix.
+
+    This is the baseline for benchmark_multiple_regression.
+    """
+    design = np.column_stack([np.ones(len(x_columns)), x_columns])
+
+    return np.linalg.lstsq(design, y_columns, rcond=None)[0]
+
+
+def benchmark_multiple_regression(n: int = 10 ** 6, chunk_size: int = 10 ** 5) -> None:
+    """Print the time and peak memory of fitting nitrogen dioxide and ozone on year and
+    temperature for n synthetic hourly rows: with numpy.linalg.lstsq, with
+    multiple_linear_regression, and streamed in chunks of chunk_size rows.
+
+    The data of the first two methods is generated before they are measured, but the
+    streamed method generates its chunks as it goes.
+    """
+    x_columns, y_columns = synthetic_hourly_chunk(n, 0)
+
+    print(f'{"rows":>10} {"method":>10} {"seconds":>10} {"peak MiB":>10}')
+    for name, func, args in [('lstsq', lstsq_regression, (x_columns, y_columns)),
+                             ('normal', data_analysis.multiple_linear_regression,
+                              (x_columns, y_columns)),
+                             ('streamed', streamed_multiple_regression, (n, chunk_size))]:
+        seconds, peak, _ = measure(func, *args)
+        print(f'{n:>10} {name:>10} {seconds:>10.3f} {peak / 2 ** 20:>10.1f}')
+
+
+def reference_plot(x_coords: np.ndarray, y_coords: np.ndarray,
+                   results: Dict[str, float]) -> go.Figure:
+    """Return a figure with a go.Scatter trace of every given point and the regression
+    line of the results, the way add_plot drew them before decimation.
+
+    This is kept as the baseline for benchmark_plot_decimation.
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x_coords, y=y_coords, mode='markers'))
+    fig.add_trace(go.Scatter(x=[x_coords.min(), x_coords.max()],
+                             y=[results['y-intercept'] + results['slope'] * x_coords.min(),
+                                results['y-intercept'] + results['slope'] * x_coords.max()],
+                             mode='lines'))
+
+    return fig
+
+
+def decimated_plot(x_coords: np.ndarray, y_coords: np.ndarray, results: Dict[str, float],
+                   decimation: Optional[str]) -> go.Figure:
+    """Return a figure with the plot and regression line of the given points drawn by
+    plots.add_plot with the given decimation."""
+    fig = go.Figure()
+    plots.add_plot(fig, [float(x_coords.min()), float(x_coords.max())], ('Points', 'Line'),
+                   True, (x_coords, y_coords, results), decimation)
+
+    return fig
+
+
+def benchmark_plot_decimation(hourly_years: int = 10) -> None:
+    """Print the time to build and serialize a figure of the daily temperatures of
+    weatherstats_toronto_daily.csv, and of hourly_years years of synthetic hourly
+    readings, and the size of its JSON, for every point drawn with go.Scatter and for
+    each decimation of plots.add_plot.
+
+    The time to draw the figure in a browser grows with the number of points drawn,
+    but cannot be measured here.
+    """
+    table = data_wrangling.read_csv_table2('weatherstats_toronto_daily.csv')
+    hourly = synthetic_atmosphere_table(hourly_years * 8760)
+    series = [('daily', table.dates.astype(np.float64), table.avg_temps),
+              ('hourly', hourly.temperature, hourly.ozone)]
+
+    # Build and serialize one figure first, so that loading the plotly validators is not timed
+    decimated_plot(table.dates[:10].astype(np.float64), table.avg_temps[:10],
+                   data_analysis.simple_linear_regression([0.0, 1.0], [0.0, 1.0]), None).to_json()
+
+    print(f'{"data":>8} {"rows":>9} {"method":>10} {"points":>7} {"seconds":>9} {"MiB":>8}')
+    for name, x_coords, y_coords in series:
+        results = data_analysis.simple_linear_regression(x_coords, y_coords)
+        methods = [('scatter', lambda: reference_plot(x_coords, y_coords, results))]
+        methods.extend((str(decimation), lambda decimation=decimation: decimated_plot(
+            x_coords, y_coords, results, decimation))
+            for decimation in (None,) + plots.DECIMATIONS)
+
+        for method, build in methods:
+            start = time.perf_counter()
+            fig = build()
+            payload = fig.to_json()
+            elapsed = time.perf_counter() - start
+            print(f'{name:>8} {len(x_coords):>9} {method:>10} {len(fig.data[0].x):>7} '
+                  f'{elapsed:>9.3f} {len(payload) / 2 ** 20:>8.2f}')
+
+
+def synthetic_plot_results(seed: int) -> Tuple[List[plots.Analysis], List[plots.View]]:
+    """Return the analyses and views of the figure of this project for random results,
+    for one station.
+    """
+    rng = np.random.default_rng(seed)
+    years = np.arange(1940, 2021, dtype=np.float64)
+    temperatures = rng.normal(8, 10, 330)
+
+    # ACCUMULATOR: Keep track of the results of the analyses so far
+    results_so_far = []
+    for x_coords in (years, temperatures, temperatures, years, years):
+        y_coords = rng.normal(0, 1, len(x_coords)) + 0.1 * x_coords
+        results_so_far.append((x_coords, y_coords,
+                               data_analysis.simple_linear_regression(x_coords, y_coords)))
+
+    return plots.project_analyses(results_so_far)
+
+
+def benchmark_export(n_figures: int = 24, workers: Tuple[int, ...] = (1, 2, 4)) -> None:
+    """Print the time and total size of exporting n_figures HTML figures of synthetic
+    stations with plots.export_plots, with plotly.js inlined in every file and shared
+    by the directory, for each number of worker processes in workers.
+
+    The speed-up is bounded by os.cpu_count(), which is printed first.
+    """
+    results = [synthetic_plot_results(seed) for seed in range(n_figures)]
+
+    print(f'cpu count: {os.cpu_count()}')
+    print(f'{"figures":>8} {"plotly.js":>10} {"workers":>8} {"seconds":>9} {"MiB":>8}')
+    for include_plotlyjs in (True, 'directory'):
+        for count in workers:
+            with tempfile.TemporaryDirectory() as directory:
+                paths = [os.path.join(directory, f'station_{i}.html') for i in range(n_figures)]
+
+                start = time.perf_counter()
+                plots.export_plots(results, paths, include_plotlyjs, count)
+                elapsed = time.perf_counter() - start
+                size = sum(os.path.getsize(os.path.join(directory, filename))
+                           for filename in os.listdir(directory))
+
+            print(f'{n_figures:>8} {"inline" if include_plotlyjs is True else "shared":>10} '
+                  f'{count:>8} {elapsed:>9.3f} {size / 2 ** 20:>8.2f}')
+
+
+def benchmark_figure_scaling(counts: Tuple[int, ...] = (10, 100, 1000)) -> None:
+    """Print the time to build the figure of plots.create_figure for each number of
+    analyses in counts, and the size of its JSON, per analysis and in total.
+
+    Every analysis is shown by its own button, so the visibility lists of the buttons
+    together have 2 * n ** 2 elements for n analyses.
+    """
+    # Build one figure first, so that loading the plotly validators is not timed
+    plots.create_figure(plots.example_analyses(1))
+
+    print(f'{"analyses":>9} {"seconds":>9} {"ms each":>8} {"MiB":>8} {"KiB each":>9}')
+    for n in counts:
+        analyses = plots.example_analyses(n)
+
+        start = time.perf_counter()
+        payload = plots.create_figure(analyses).to_json()
+        elapsed = time.perf_counter() - start
+        print(f'{n:>9} {elapsed:>9.3f} {elapsed / n * 1000:>8.2f} '
+              f'{len(payload) / 2 ** 20:>8.2f} {len(payload) / n / 2 ** 10:>9.2f}')
+
+
+def benchmark_startup() -> None:
+    """Print the time taken to import the modules that compute the results of main.py,
+    and the modules that plot them, against IMPORT_BUDGET.
+    """
+    print(f'{"module":>10} {"seconds":>9} {"plotly":>7} {"budget":>7}')
+    for module in ('pipeline', 'plots'):
+        times = instrumentation.import_times(f'import {module}')
+        plotly_imported = any(name.startswith('plotly') for name in times)
+        print(f'{module:>10} {times[module]:>9.3f} {str(plotly_imported):>7} '
+              f'{"ok" if times[module] < IMPORT_BUDGET else "over":>7}')
+
+
+def benchmark_instrumentation(n: int = 100, calls: int = 10 ** 4) -> None:
+    """Print the time per call of simple_linear_regression on n points, undecorated,
+    instrumented with the registry disabled, and instrumented with the registry enabled
+    with and without tracing memory.
+    """
+    x_coords, y_coords = synthetic_coordinates(n)
+    undecorated = data_analysis.simple_linear_regression.__wrapped__
+    decorated = data_analysis.simple_linear_regression
+    registry = instrumentation.REGISTRY
+    was_enabled, traced_memory = registry.enabled, registry.trace_memory
+
+    print(f'{"points":>8} {"instrumentation":>16} {"us per call":>12} {"overhead":>9}')
+    base = None
+    for label, func, enable, trace_memory in (('none', undecorated, False, False),
+                                              ('disabled', decorated, False, False),
+                                              ('enabled', decorated, True, False),
+                                              ('with memory', decorated, True, True)):
+        registry.disable()
+        if enable:
+            registry.enable(trace_memory)
+        start = time.perf_counter()
+        for _ in range(calls):
+            func(x_coords, y_coords)
+        per_call = (time.perf_counter() - start) / calls * 10 ** 6
+        base = per_call if base is None else base
+        print(f'{n:>8} {label:>16} {per_call:>12.2f} {per_call / base - 1:>9.1%}')
+
+    registry.disable()
+    registry.reset()
+    if was_enabled:
+        registry.enable(traced_memory)
+
+
+def benchmark_validation(n: int = 10 ** 7, malformed: float = 0.001) -> None:
+    """Print the time of the plain readers of synthetic daily temperature and atmosphere
+    CSV files with n rows against validate_table2 and validate_table1, and of
+    validate_table2 on a daily file where a fraction malformed of the rows fail
+    validation. The plain readers raise on the malformed file.
+    """
+    print(f'{"rows":>10} {"file":>19} {"reader":>18} {"seconds":>9} {"rows/s":>10} '
+          f'{"quarantined":>12}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        daily_path = os.path.join(directory, 'daily.csv')
+        malformed_path = os.path.join(directory, 'malformed_daily.csv')
+        atmosphere_path = os.path.join(directory, 'atmosphere.csv')
+        write_synthetic_daily_csv(daily_path, n)
+        write_synthetic_daily_csv(malformed_path, n, malformed=malformed)
+        write_synthetic_atmosphere_csv(atmosphere_path, n)
+
+        cases = [(daily_path, 'read_csv_table2', data_wrangling.read_csv_table2),
+                 (daily_path, 'read_mmap_table2', data_wrangling.read_mmap_table2),
+                 (daily_path, 'validate_table2', data_wrangling.validate_table2),
+                 (malformed_path, 'validate_table2', data_wrangling.validate_table2),
+                 (atmosphere_path, 'read_csv_table1', data_wrangling.read_csv_table1),
+                 (atmosphere_path, 'read_mmap_table1', data_wrangling.read_mmap_table1),
+                 (atmosphere_path, 'validate_table1', data_wrangling.validate_table1)]
+        for path, name, reader in cases:
+            start = time.perf_counter()
+            result = reader(path)
+            elapsed = time.perf_counter() - start
+            quarantined = len(result[1].line_numbers) if isinstance(result, tuple) else 0
+            print(f'{n:>10} {os.path.basename(path):>19} {name:>18} {elapsed:>9.3f} '
+                  f'{n / elapsed:>10.3g} {quarantined:>12}')
+            del result
+
+
+def compress_file(path: str, out_path: str, compression: str) -> None:
+    """Write the file at path compressed with the given compression in
+    data_wrangling.COMPRESSIONS to out_path, at the default level of each format
+    (6 for gzip). zstd needs the zstandard package.
+    """
+    if compression == 'gzip':
+        out = gzip.open(out_path, 'wb', compresslevel=6)
+    elif compression == 'bz2':
+        out = bz2.open(out_path, 'wb')
+    elif compression == 'xz':
+        out = lzma.open(out_path, 'wb')
+    else:
+        import zstandard
+        out = zstandard.ZstdCompressor().stream_writer(open(out_path, 'wb'))
+
+    with open(path, 'rb') as file, out:
+        shutil.copyfileobj(file, out, data_wrangling.CHUNK_SIZE)
+
+
+def decompress_then_read(path: str, out_path: str) -> data_wrangling.TorontoTemperatureTable:
+    """Return read_csv_table2 of the compressed file at path, after decompressing it to
+    out_path, as before the readers could decompress files themselves."""
+    with data_wrangling.open_source(path) as (stream, _), open(out_path, 'wb') as out:
+        shutil.copyfileobj(stream, out, data_wrangling.CHUNK_SIZE)
+
+    return data_wrangling.read_csv_table2(out_path)
+
+
+def benchmark_compressed(n: int = 10 ** 6) -> None:
+    """Print the end-to-end time and the peak traced memory of reading a synthetic daily
+    temperature CSV file with n rows compressed with each compression, by decompressing
+    it to disk and reading the copy, and by streaming it into read_csv_table2 and
+    validate_table2. The plain file is read first, for reference. zstd is skipped if the
+    zstandard package is not installed.
+    """
+    print(f'{"rows":>10} {"compression":>12} {"reader":>20} {"seconds":>9} {"peak MiB":>9} '
+          f'{"file MiB":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'daily.csv')
+        write_synthetic_daily_csv(path, n)
+        elapsed, peak, _ = measure(data_wrangling.read_csv_table2, path)
+        print(f'{n:>10} {"none":>12} {"read_csv_table2":>20} {elapsed:>9.3f} '
+              f'{peak / 2 ** 20:>9.1f} {os.path.getsize(path) / 2 ** 20:>9.1f}')
+
+        for compression in data_wrangling.COMPRESSIONS.values():
+            compressed_path = os.path.join(directory, f'daily.csv.{compression}')
+            try:
+                compress_file(path, compressed_path, compression)
+            except ImportError:
+                print(f'{n:>10} {compression:>12} {"(not installed)":>20}')
+                continue
+
+            copy_path = os.path.join(directory, 'decompressed.csv')
+            for name, func, args in (('decompress, read', decompress_then_read,
+                                      (compressed_path, copy_path)),
+                                     ('read_csv_table2', data_wrangling.read_csv_table2,
+                                      (compressed_path,)),
+                                     ('validate_table2', data_wrangling.validate_table2,
+                                      (compressed_path,))):
+                elapsed, peak, _ = measure(func, *args)
+                print(f'{n:>10} {compression:>12} {name:>20} {elapsed:>9.3f} '
+                      f'{peak / 2 ** 20:>9.1f} {os.path.getsize(compressed_path) / 2 ** 20:>9.1f}')
+
+
+def reference_theil_sen(x_coords: np.ndarray, y_coords: np.ndarray) -> float:
+    """Return the Theil-Sen slope of the given coordinates, computed from the slopes of
+    all n * (n - 1) / 2 pairs of points at once.
+
+    This is kept as the baseline for benchmark_robust_regression.
+    """
+    firsts, seconds = np.triu_indices(len(x_coords), 1)
+    defined = x_coords[firsts] != x_coords[seconds]
+    firsts, seconds = firsts[defined], seconds[defined]
+
+    return float(np.median((y_coords[seconds] - y_coords[firsts])
+                           / (x_coords[seconds] - x_coords[firsts])))
+
+
+def benchmark_robust_regression(sizes: Tuple[int, ...] = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6),
+                                pairs_limit: int = 10 ** 4, spikes: float = 0.02) -> None:
+    """Print the time and the slope of each regression of data_analysis on n synthetic
+    (year, temperature) coordinates with a slope of 0.02, for each n in sizes, a fraction
+    spikes of which are raised by 30 degrees.
+
+    The weights of weighted_linear_regression are random day counts. The Theil-Sen slope
+    of all pairs, reference_theil_sen, is skipped above pairs_limit points, where the
+    slopes of the pairs would not fit in memory.
+    """
+    print(f'{"points":>10} {"regression":>28} {"seconds":>9} {"slope":>10}')
+
+    for n in sizes:
+        x_coords, y_coords = synthetic_coordinates(n)
+        rng = np.random.default_rng(n)
+        y_coords[rng.random(n) < spikes] += 30
+        weights = rng.integers(300, 367, n).astype(np.float64)
+
+        regressions = [('simple_linear_regression', data_analysis.simple_linear_regression,
+                        (x_coords, y_coords)),
+                       ('weighted_linear_regression', data_analysis.weighted_linear_regression,
+                        (x_coords, y_coords, weights)),
+                       ('huber_linear_regression', data_analysis.huber_linear_regression,
+                        (x_coords, y_coords)),
+                       ('theil_sen_regression', data_analysis.theil_sen_regression,
+                        (x_coords, y_coords))]
+        for name, func, args in regressions:
+            start = time.perf_counter()
+            slope = func(*args)['slope']
+            print(f'{n:>10} {name:>28} {time.perf_counter() - start:>9.3f} {slope:>10.5f}')
+
+        if n <= pairs_limit:
+            start = time.perf_counter()
+            slope = reference_theil_sen(x_coords, y_coords)
+            print(f'{n:>10} {"all pairs (reference)":>28} {time.perf_counter() - start:>9.3f} '
+                  f'{slope:>10.5f}')
+
+
+def prepend_days(path: str, days: int, seed: int = 110) -> None:
+    """Add days rows to the top of the synthetic daily temperature CSV file at path, for
+    the days after its first date, newest first, as the daily updates of
+    weatherstats_toronto_daily.csv do."""
+    rng = np.random.default_rng(seed)
+    with open(path, 'rb') as file:
+        header = file.readline()
+        rest = file.read()
+
+    latest = np.datetime64(rest[:10].decode())
+    dates = np.datetime_as_string(latest + np.arange(days, 0, -1))
+    rows = ''.join(f'{date},{temperature:.1f},\n'
+                   for date, temperature in zip(dates.tolist(), rng.normal(8, 10, days).tolist()))
+
+    with open(path, 'wb') as file:
+        file.write(header + rows.encode() + rest)
+
+
+def benchmark_incremental(sizes: Tuple[int, ...] = (10 ** 5, 10 ** 6, 10 ** 7),
+                          updates: Tuple[int, ...] = (1, 30, 365)) -> None:
+    """Print the time of building the incremental state of a synthetic daily temperature
+    CSV file with n rows, for each n in sizes, and of updating it after prepending each
+    number of days in updates, against the stages of main.py that recompute the yearly
+    temperatures and the regression from the whole file.
+
+    Rewriting the file to prepend the days is not timed.
+    """
+    print(f'{"rows":>10} {"new rows":>9} {"method":>24} {"seconds":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            path = os.path.join(directory, 'daily.csv')
+            write_synthetic_daily_csv(path, n)
+            start = time.perf_counter()
+            incremental.update_state(path)
+            print(f'{n:>10} {n:>9} {"build state":>24} {time.perf_counter() - start:>9.3f}')
+
+            for days in updates:
+                prepend_days(path, days)
+                start = time.perf_counter()
+                state, outcome = incremental.update_state(path)
+                print(f'{n:>10} {days:>9} {"update state (" + outcome + ")":>24} '
+                      f'{time.perf_counter() - start:>9.3f}')
+
+                start = time.perf_counter()
+                table, _ = data_wrangling.validate_table2(path)
+                summary = data_wrangling.summarize_temperatures(table, 'year')
+                results = data_analysis.simple_linear_regression(
+                    incremental.summary_years(summary), summary.avg_temps)
+                elapsed = time.perf_counter() - start
+                difference = abs(results['slope'] - state.regression.results()['slope'])
+                print(f'{n:>10} {days:>9} {"recompute everything":>24} {elapsed:>9.3f} '
+                      f'(slope difference {difference:.1e})')
+
+            os.remove(path + incremental.STATE_SUFFIX)
+
+
+def write_synthetic_daily_csv(out_path: str, n: int, seed: int = 110,
+                              malformed: float = 0.0) -> None:
+    """Write a CSV file with n data rows in the format of weatherstats_toronto_daily.csv
+    to out_path: one day per row, newest first, going back from 2020-12-31 over the
+    81 years of that file and then starting over, with random seasonal temperatures.
+    About one temperature in a thousand is missing, as in the real file, and about a
+    fraction malformed of the rows have a temperature that is not a number, a
+    temperature below absolute zero, or an invalid date, in turn.
+    """
+    rng = np.random.default_rng(seed)
+    period = 81 * 365
+
+    with open(out_path, 'w') as file:
+        file.write('date, avg_temperature\n')
+        for start in range(0, n, WRITE_CHUNK):
+            days = np.arange(start, min(start + WRITE_CHUNK, n)) % period
+            dates = np.datetime_as_string(np.datetime64('2020-12-31') - days)
+            temperatures = (8 - 14 * np.cos(2 * np.pi * (days - 20) / 365.25)
+                            + rng.normal(0, 4, len(days))).round(1)
+            missing = rng.random(len(days)) < 0.001
+            rows = [f'{date},{"" if gap else temperature},\n' for date, temperature, gap
+                    in zip(dates.tolist(), temperatures.tolist(), missing.tolist())]
+            if malformed > 0:
+                for k, i in enumerate(np.flatnonzero(rng.random(len(days)) < malformed).tolist()):
+                    rows[i] = (f'{dates[i]},n/a,\n', f'{dates[i]},-300.0,\n',
+                               f'{dates[i][:5]}13{dates[i][7:]},1.0,\n')[k % 3]
+            file.writelines(rows)
+
+
+def write_synthetic_atmosphere_csv(out_path: str, n: int, seed: int = 110) -> None:
+    """Write a CSV file with n data rows in the format of toronto_atmospheres.csv to
+    out_path: one hour per row, oldest first, from 2011-01-01 over ten years and then
+    starting over, with random temperatures and positive concentrations. The 8-hour
+    ozone column is left empty, as in most rows of the real file.
+    """
+    rng = np.random.default_rng(seed)
+    period = 10 * 8760
+
+    with open(out_path, 'w') as file:
+        file.write('Date,temperature,NO2,O3,OX,O3 moving 8hr\n')
+        for start in range(0, n, WRITE_CHUNK):
+            hours = np.arange(start, min(start + WRITE_CHUNK, n)) % period
+            dates = np.datetime_as_string(np.datetime64('2011-01-01') + hours // 24)
+            temperatures = (rng.normal(8, 10, len(hours))).round(1)
+            nitrogen_dioxide = rng.integers(1, 60, len(hours))
+            ozone = rng.integers(1, 60, len(hours))
+            file.writelines(f'{date} {hour}:00,{temperature},{no2},{o3},{no2 + o3},\n'
+                            for date, hour, temperature, no2, o3
+                            in zip(dates.tolist(), (hours % 24).tolist(), temperatures.tolist(),
+                                   nitrogen_dioxide.tolist(), ozone.tolist()))
+
+
+def write_synthetic_registry(directory: str, n_stations: int, daily_rows: int = 81 * 365,
+                             hourly_rows: int = 5 * 8760) -> str:
+    """Write the files of n_stations synthetic stations, with daily_rows daily temperatures
+    and hourly_rows atmosphere readings each, and a registry of them to directory, and
+    return the path of the registry. Every other station names its temperature column
+    'mean_temp', so that the registry maps it.
+    """
+    entries = []
+    for i in range(n_stations):
+        atmosphere_path = f'atmosphere_{i}.csv'
+        daily_path = f'daily_{i}.csv'
+        write_synthetic_atmosphere_csv(os.path.join(directory, atmosphere_path), hourly_rows, i)
+        write_synthetic_daily_csv(os.path.join(directory, daily_path), daily_rows, i)
+        entry = {'name': f'station_{i}', 'city': f'city_{i // 4}',
+                 'atmosphere_path': atmosphere_path, 'daily_path': daily_path}
+
+        if i % 2 == 1:
+            with open(os.path.join(directory, daily_path)) as file:
+                lines = file.readlines()
+            lines[0] = 'date,mean_temp\n'
+            with open(os.path.join(directory, daily_path), 'w') as file:
+                file.writelines(lines)
+            entry['daily_headers'] = {'avg_temps': 'mean_temp'}
+        entries.append(entry)
+
+    path = os.path.join(directory, 'stations.json')
+    with open(path, 'w') as file:
+        json.dump({'stations': entries}, file)
+
+    return path
+
+
+def benchmark_stations(n_stations: int = 32, workers: Tuple[int, ...] = (1, 2, 4)) -> None:
+    """Print the throughput of stations.analyze_stations on n_stations synthetic stations,
+    for each number of worker processes in workers, each worker process limited to
+    STATION_MEMORY_LIMIT bytes. The caches of the files are removed before each run,
+    so every station is parsed.
+
+    The speed-up is bounded by os.cpu_count(), which is printed first.
+    """
+    print(f'cpu count: {os.cpu_count()}')
+    print(f'{"stations":>9} {"workers":>8} {"seconds":>9} {"stations/s":>11} {"speed-up":>9} '
+          f'{"errors":>7}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        registry = stations.read_registry(write_synthetic_registry(directory, n_stations))
+        serial = None
+
+        for count in workers:
+            for filename in os.listdir(directory):
+                if filename.endswith(data_wrangling.CACHE_SUFFIX):
+                    shutil.rmtree(os.path.join(directory, filename))
+
+            start = time.perf_counter()
+            summary = stations.analyze_stations(registry, count,
+                                                memory_limit=STATION_MEMORY_LIMIT)
+            elapsed = time.perf_counter() - start
+            serial = serial or elapsed
+            errors = sum(error != '' for error in summary.errors)
+            print(f'{n_stations:>9} {count:>8} {elapsed:>9.3f} {n_stations / elapsed:>11.2f} '
+                  f'{serial / elapsed:>9.2f} {errors:>7}')
+
+
+def run_benchmark_suite(sizes: Tuple[int, ...] = SUITE_SIZES,
+                        output_path: Optional[str] = 'benchmark_results.json') \
+        -> List[Dict[str, Any]]:
+    """Return the results of timing the ingestion, aggregation, regression and plotting
+    functions of this project on synthetic datasets of each number of rows in sizes, and
+    write them with information about this machine as JSON to output_path, unless it is
+    None. A table of the results is also printed.
+
+    Each result maps 'stage', 'function' and 'rows' to the function measured, and
+    'seconds', 'rows per second', 'peak bytes' and 'held bytes' to its measurements,
+    from measure. The functions returning lists of dataclasses are only measured up to
+    LIST_LIMIT rows.
+
+    Preconditions:
+        - all(size > 1 for size in sizes)
+    """
+    # ACCUMULATOR: Keep track of the results so far
+    results_so_far = []
+
+    print(f'{"stage":>12} {"function":>26} {"rows":>9} {"seconds":>9} '
+          f'{"rows/s":>11} {"peak MiB":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            daily_path = os.path.join(directory, f'daily_{n}.csv')
+            atmosphere_path = os.path.join(directory, f'atmosphere_{n}.csv')
+            write_synthetic_daily_csv(daily_path, n)
+            write_synthetic_atmosphere_csv(atmosphere_path, n)
+
+            table = data_wrangling.read_csv_table2(daily_path)
+            x_coords = table.dates.astype(np.float64)
+            regression = data_analysis.simple_linear_regression(x_coords, table.avg_temps)
+            analyses = [plots.Analysis(f'Analysis {i}', x_coords, table.avg_temps, regression,
+                                       [float(x_coords.min()), float(x_coords.max())],
+                                       'Regression Line', 'Title', 'x', 'y')
+                        for i in range(5)]
+
+            cases = [('ingestion', 'read_csv_table1', data_wrangling.read_csv_table1,
+                      (atmosphere_path,)),
+                     ('ingestion', 'read_csv_table2', data_wrangling.read_csv_table2,
+                      (daily_path,)),
+                     ('aggregation', 'summarize_temperatures',
+                      data_wrangling.summarize_temperatures, (table, 'year')),
+                     ('regression', 'simple_linear_regression',
+                      data_analysis.simple_linear_regression, (x_coords, table.avg_temps)),
+                     ('regression', 'calculate_formulas', data_analysis.calculate_formulas,
+                      (x_coords, table.avg_temps, len(x_coords), float(x_coords.mean()),
+                       float(table.avg_temps.mean()))),
+                     ('plotting', 'add_plot', decimated_plot,
+                      (x_coords, table.avg_temps, regression, 'lttb')),
+                     ('plotting', 'create_figure', plots.create_figure, (analyses,))]
+            if n <= LIST_LIMIT:
+                daily = data_wrangling.read_csv_data2(daily_path)
+                cases.extend([('ingestion', 'read_csv_data1', data_wrangling.read_csv_data1,
+                               (atmosphere_path,)),
+                              ('ingestion', 'read_csv_data2', data_wrangling.read_csv_data2,
+                               (daily_path,)),
+                              ('aggregation', 'daily_to_yearly', data_wrangling.daily_to_yearly,
+                               (daily,))])
+
+            for stage, name, func, args in cases:
+                seconds, peak, retained = measure(func, *args)
+                results_so_far.append({'stage': stage, 'function': name, 'rows': n,
+                                       'seconds': seconds,
+                                       'rows per second': n / seconds if seconds > 0 else None,
+                                       'peak bytes': peak, 'held bytes': retained})
+                print(f'{stage:>12} {name:>26} {n:>9} {seconds:>9.4f} '
+                      f'{n / max(seconds, 1e-9):>11.3g} {peak / 2 ** 20:>9.1f}')
+
+            del table, x_coords, analyses
+
+    if output_path is not None:
+        with open(output_path, 'w') as file:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__,
+                       'machine': platform.machine(), 'cpu count': os.cpu_count(),
+                       'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'results': results_so_far}, file, indent=1)
+
+    return results_so_far
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    benchmark_loaders()
+    benchmark_regression()
+    benchmark_batch_regression()
+    benchmark_aggregation()
+    benchmark_parallel_loading()
+    benchmark_cache()
+    benchmark_mmap()
+    benchmark_join()
+    benchmark_resampling()
+    benchmark_rolling_regression()
+    benchmark_multiple_regression()
+    benchmark_plot_decimation()
+    benchmark_export()
+    benchmark_figure_scaling()
+    benchmark_startup()
+    benchmark_instrumentation()
+    benchmark_stations()
+    benchmark_validation()
+    benchmark_compressed()
+    benchmark_robust_regression()
+    benchmark_incremental()
+    run_benchmark_suite()
+
+    import python_ta
+    python_ta.check_all(
+        config={
+            # The names (strs) of imported modules
+            'extra-imports': ['bz2', 'csv', 'datetime', 'gzip', 'json', 'lzma', 'math', 'platform',
+                              'os', 'shutil', 'tempfile', 'time',
+                              'tracemalloc', 'numpy', 'zstandard',
+                              'plotly.graph_objects', 'data_analysis', 'data_wrangling',
+                              'incremental', 'instrumentation', 'plots', 'resampling', 'stations'],
+            # The names (strs) of functions that call print/open/input
+            'allowed-io': ['replicate_csv', 'read_csv_rows2', 'benchmark_loaders',
+                           'benchmark_regression', 'benchmark_batch_regression',
+                           'benchmark_aggregation', 'benchmark_parallel_loading',
+                           'benchmark_cache', 'write_sorted_daily_csv',
+                           'benchmark_mmap', 'benchmark_join', 'benchmark_resampling',
+                           'benchmark_rolling_regression', 'benchmark_multiple_regression',
+                           'benchmark_plot_decimation', 'benchmark_export',
+                           'benchmark_figure_scaling', 'benchmark_startup',
+                           'benchmark_instrumentation',
+                           'write_synthetic_daily_csv', 'write_synthetic_atmosphere_csv',
+                           'write_synthetic_registry', 'benchmark_stations',
+                           'benchmark_validation', 'compress_file', 'decompress_then_read',
+                           'benchmark_compressed', 'benchmark_robust_regression',
+                           'prepend_days', 'benchmark_incremental', 'run_benchmark_suite'],
+            'max-line-length': 100,
+            # zstandard is imported inside compress_file, since it is only needed for zstd
+            'disable': ['R1705', 'C0200', 'C0415']
+        }
+    )
@@ -5,6 +5,11 @@ Description
 This module does the data analysis for this project. It contains functions
 that perform simple linear regression and related calculations on the datasets.
 
+Besides least squares, the regression line can be fitted by weighted least squares,
+for example weighting yearly averages by their numbers of days, or by the robust
+Theil-Sen and Huber estimators, which are not pulled around by spikes in the readings.
+They return their results in the same form as simple_linear_regression.
+
 Copyright and Usage Information
 ===============================
 This file is for the personal and private use of Katherine Luo, Kevin Xia,
@@ -13,49 +18,1048 @@ changes to this code, is prohibited.
 
 This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
 """
-from typing import List, Dict, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass
 import math
 
+import numpy as np
+
+import instrumentation
+
+# The coordinate types accepted by the regression functions. Float64 arrays and
+# memoryviews of doubles are used without being copied.
+Coordinates = Union[List[float], np.ndarray, memoryview]
+
+# The number of coordinates reduced at once by sufficient_statistics
+BLOCK_SIZE = 2 ** 16
+
+# The tuning constant of huber_linear_regression, in units of the scale of the residuals,
+# which keeps 95% of the efficiency of least squares when the errors are normal
+HUBER_TUNING = 1.345
 
-def simple_linear_regression(x_coords: List[float], y_coords: List[float]) \
+# The ratio of the standard deviation to the median absolute deviation of normal errors
+MAD_SCALE = 1.4826
+
+# The seed of the pairs of points sampled by slope_order_statistics
+THEIL_SEN_SEED = 110
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def simple_linear_regression(x_coords: Coordinates, y_coords: Coordinates) \
         -> Dict[str, float]:
     """Return a mapping of the slope, the y-intercept, the correlation, and
     the coefficient of determination (R^2) of the regression line to their
     corresponding values after performing simple linear regression on the
     given x- and y-coordinates.
 
+    >>> results = simple_linear_regression([1.0, 2.0, 3.0], [2.0, 4.0, 6.5])
+    >>> round(results['slope'], 6), round(results['y-intercept'], 6)
+    (2.25, -0.333333)
+
     Preconditions:
         - len(x_coords) > 0
         - len(y_coords) > 0
         - len(x_coords) == len(y_coords)
     """
-    # n = the number of x- and y-coodinates
-    n = len(x_coords)
+    return regression_results(*sufficient_statistics(x_coords, y_coords))
+
+
+def sufficient_statistics(x_coords: Coordinates, y_coords: Coordinates) \
+        -> Tuple[int, float, float, float, float, float]:
+    """Return the sufficient statistics of simple linear regression on the given
+    x- and y-coordinates, in the same order as the parameters of regression_results.
+
+    The sums of x, y, x^2, y^2 and xy are accumulated in one pass over blocks of
+    BLOCK_SIZE coordinates. The coordinates are shifted by the first point while
+    summing so that the centred sums do not lose precision to cancellation.
+
+    Preconditions:
+        - len(x_coords) > 0
+        - len(x_coords) == len(y_coords)
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    n = len(x_array)
+    x_shift = x_array[0]
+    y_shift = y_array[0]
 
-    # Calculate the average of x-coordinates and the average of y-coordinates
-    x_avg = sum(x_coords) / len(x_coords)
-    y_avg = sum(y_coords) / len(y_coords)
+    # ACCUMULATOR: Keep track of the sums of the shifted x, y, x^2, y^2 and xy so far
+    sum_x, sum_y, sum_xx, sum_yy, sum_xy = 0.0, 0.0, 0.0, 0.0, 0.0
 
-    # Calculate the numerators and denominators of the formulas for the
-    # slope, correlation, and R^2 of the regression line
-    numerator, x_denominator, y_denominator = \
-        calculate_formulas(x_coords, y_coords, n, x_avg, y_avg)
+    for start in range(0, n, BLOCK_SIZE):
+        x_block = x_array[start:start + BLOCK_SIZE] - x_shift
+        y_block = y_array[start:start + BLOCK_SIZE] - y_shift
 
+        sum_x += float(np.sum(x_block))
+        sum_y += float(np.sum(y_block))
+        sum_xx += float(np.dot(x_block, x_block))
+        sum_yy += float(np.dot(y_block, y_block))
+        sum_xy += float(np.dot(x_block, y_block))
+
+    return (n, x_shift + sum_x / n, y_shift + sum_y / n,
+            sum_xy - sum_x * sum_y / n,
+            sum_xx - sum_x * sum_x / n,
+            sum_yy - sum_y * sum_y / n)
+
+
+def regression_results(n: int, x_avg: float, y_avg: float, numerator: float,
+                       x_denominator: float, y_denominator: float) -> Dict[str, float]:
+    """Return a mapping of the slope, the y-intercept, the correlation, and
+    the coefficient of determination (R^2) of the regression line to their
+    corresponding values, given the sufficient statistics of the coordinates.
+
+    n is the number of x- and y-coordinates.
+    x_avg is the average of the x-coordinates.
+    y_avg is the average of the y-coordinates.
+    numerator, x_denominator and y_denominator are the numerator and denominators
+    of the formulas, as returned by calculate_formulas.
+
+    Preconditions:
+        - n > 0
+        - x_denominator > 0
+        - y_denominator > 0
+    """
     # Calculate the slope, y-intercept, and correlation
     slope = numerator / x_denominator
     y_intercept = y_avg - slope * x_avg
     correlation = numerator / math.sqrt(x_denominator * y_denominator)
 
-    # Calculate R^2
-    r_squared_numerator = sum([(y_coords[i] - (slope * x_coords[i] + y_intercept)) ** 2
-                               for i in range(0, n)])
-    r_squared = 1 - r_squared_numerator / y_denominator
+    # Calculate R^2 from the sum of squared residuals, which is
+    # y_denominator - slope * numerator for the least-squares line
+    r_squared = 1 - (y_denominator - slope * numerator) / y_denominator
+
+    return {'slope': float(slope), 'y-intercept': float(y_intercept),
+            'correlation': float(correlation), 'R^2': float(r_squared)}
+
+
+@dataclass
+class RegressionAccumulator:
+    """A dataclass keeping the running sufficient statistics of simple linear
+    regression, so that the coordinates can be added in chunks.
+
+    The statistics are kept centred on the running averages and are combined
+    with the pairwise update of Chan, Golub and LeVeque, a chunked form of
+    Welford's algorithm, so they stay accurate over very many chunks. Two
+    accumulators built from different chunks can be merged.
+
+    >>> accumulator = RegressionAccumulator()
+    >>> accumulator.update([1.0, 2.0], [2.0, 4.0])
+    >>> other = RegressionAccumulator()
+    >>> other.update([3.0], [6.5])
+    >>> accumulator.merge(other)
+    >>> round(accumulator.results()['slope'], 6), round(accumulator.results()['y-intercept'], 6)
+    (2.25, -0.333333)
+
+    Instance Attributes:
+        - n: the number of coordinates added so far
+        - x_avg: the average of the x-coordinates added so far
+        - y_avg: the average of the y-coordinates added so far
+        - numerator: the sum of (x - x_avg) * (y - y_avg) so far
+        - x_denominator: the sum of (x - x_avg) ** 2 so far
+        - y_denominator: the sum of (y - y_avg) ** 2 so far
+
+    Representation Invariants:
+        - self.n >= 0
+        - self.x_denominator >= 0
+        - self.y_denominator >= 0
+    """
+    n: int = 0
+    x_avg: float = 0.0
+    y_avg: float = 0.0
+    numerator: float = 0.0
+    x_denominator: float = 0.0
+    y_denominator: float = 0.0
+
+    def update(self, x_coords: Coordinates, y_coords: Coordinates) -> None:
+        """Add the given chunk of x- and y-coordinates to this accumulator.
+
+        Preconditions:
+            - len(x_coords) == len(y_coords)
+        """
+        if len(x_coords) > 0:
+            self.merge(RegressionAccumulator(*sufficient_statistics(x_coords, y_coords)))
+
+    def merge(self, other: 'RegressionAccumulator') -> None:
+        """Add the coordinates summarized by other to this accumulator."""
+        if other.n == 0:
+            return
+        elif self.n == 0:
+            self.n, self.x_avg, self.y_avg = other.n, other.x_avg, other.y_avg
+            self.numerator = other.numerator
+            self.x_denominator = other.x_denominator
+            self.y_denominator = other.y_denominator
+            return
+
+        n = self.n + other.n
+        x_delta = other.x_avg - self.x_avg
+        y_delta = other.y_avg - self.y_avg
+        weight = self.n * other.n / n
+
+        self.x_avg += x_delta * other.n / n
+        self.y_avg += y_delta * other.n / n
+        self.numerator += other.numerator + x_delta * y_delta * weight
+        self.x_denominator += other.x_denominator + x_delta * x_delta * weight
+        self.y_denominator += other.y_denominator + y_delta * y_delta * weight
+        self.n = n
+
+    def remove(self, other: 'RegressionAccumulator') -> None:
+        """Remove the coordinates summarized by other, which were added to this
+        accumulator before, reversing merge.
+
+        Coordinates whose values changed can then be replaced in place, by removing
+        their old values and adding the new ones.
+
+        >>> accumulator = RegressionAccumulator()
+        >>> accumulator.update([1.0, 2.0, 3.0, 4.0], [2.0, 4.0, 6.5, 0.0])
+        >>> other = RegressionAccumulator()
+        >>> other.update([4.0], [0.0])
+        >>> accumulator.remove(other)
+        >>> round(accumulator.results()['slope'], 6), round(accumulator.results()['y-intercept'], 6)
+        (2.25, -0.333333)
+
+        Preconditions:
+            - other.n <= self.n
+            - every coordinate summarized by other was added to this accumulator
+        """
+        if other.n == 0:
+            return
+        elif other.n == self.n:
+            self.n, self.x_avg, self.y_avg = 0, 0.0, 0.0
+            self.numerator, self.x_denominator, self.y_denominator = 0.0, 0.0, 0.0
+            return
+
+        n = self.n - other.n
+        x_avg = (self.n * self.x_avg - other.n * other.x_avg) / n
+        y_avg = (self.n * self.y_avg - other.n * other.y_avg) / n
+        x_delta = other.x_avg - x_avg
+        y_delta = other.y_avg - y_avg
+        weight = n * other.n / self.n
+
+        self.numerator -= other.numerator + x_delta * y_delta * weight
+        # Rounding must not leave a sum of squares below zero
+        self.x_denominator = max(self.x_denominator
+                                 - other.x_denominator - x_delta * x_delta * weight, 0.0)
+        self.y_denominator = max(self.y_denominator
+                                 - other.y_denominator - y_delta * y_delta * weight, 0.0)
+        self.n, self.x_avg, self.y_avg = n, x_avg, y_avg
+
+    def results(self) -> Dict[str, float]:
+        """Return the results of simple linear regression on every coordinate added
+        so far, in the form returned by simple_linear_regression.
+
+        Preconditions:
+            - self.n > 0
+            - self.x_denominator > 0
+            - self.y_denominator > 0
+        """
+        return regression_results(self.n, self.x_avg, self.y_avg, self.numerator,
+                                  self.x_denominator, self.y_denominator)
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def batch_linear_regression(x_coords: Coordinates, y_columns: np.ndarray) \
+        -> Dict[str, np.ndarray]:
+    """Return a mapping of the slope, the y-intercept, the correlation, and
+    the coefficient of determination (R^2) to arrays holding their values for
+    simple linear regression of each column of y_columns on the x-coordinates.
+
+    Index j of each array is the result for y_columns[:, j], the same as
+    simple_linear_regression(x_coords, y_columns[:, j]). The statistics of the
+    x-coordinates are computed only once for all the columns.
+
+    >>> results = batch_linear_regression([1.0, 2.0, 3.0], [[2.0, 3.0], [4.0, 2.0], [6.5, 1.0]])
+    >>> results['slope'].round(6).tolist()
+    [2.25, -1.0]
+
+    Preconditions:
+        - len(x_coords) > 0
+        - np.ndim(y_columns) == 2
+        - len(x_coords) == len(y_columns)
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_columns, dtype=np.float64)
+    n = len(x_array)
+    x_shift = x_array[0]
+    y_shift = y_array[0]
+
+    # ACCUMULATOR: Keep track of the sums of the shifted x and x^2 so far
+    sum_x, sum_xx = 0.0, 0.0
+    # ACCUMULATOR: Keep track of the sums of the shifted y, y^2 and xy so far, per column
+    sum_y = np.zeros(y_array.shape[1])
+    sum_yy = np.zeros(y_array.shape[1])
+    sum_xy = np.zeros(y_array.shape[1])
+
+    for start in range(0, n, BLOCK_SIZE):
+        x_block = x_array[start:start + BLOCK_SIZE] - x_shift
+        y_block = y_array[start:start + BLOCK_SIZE] - y_shift
+
+        sum_x += float(np.sum(x_block))
+        sum_xx += float(np.dot(x_block, x_block))
+        sum_y += np.sum(y_block, axis=0)
+        sum_yy += np.einsum('ij,ij->j', y_block, y_block)
+        sum_xy += x_block @ y_block
+
+    return batch_results(n, x_shift + sum_x / n, y_shift + sum_y / n,
+                         sum_xy - sum_x * sum_y / n,
+                         sum_xx - sum_x * sum_x / n,
+                         sum_yy - sum_y * sum_y / n)
+
+
+def batch_results(n: np.ndarray, x_avg: np.ndarray, y_avg: np.ndarray, numerator: np.ndarray,
+                  x_denominator: np.ndarray, y_denominator: np.ndarray) -> Dict[str, np.ndarray]:
+    """Return a mapping of the slope, the y-intercept, the correlation, and
+    the coefficient of determination (R^2) to arrays holding their values, given
+    arrays of the sufficient statistics of several regressions.
+
+    The parameters are the same as for regression_results, one element per regression.
+    The results of a regression whose x- or y-coordinates are all equal are NaN or infinite.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = numerator / x_denominator
+
+        return {'slope': slope,
+                'y-intercept': y_avg - slope * x_avg,
+                'correlation': numerator / np.sqrt(x_denominator * y_denominator),
+                'R^2': 1 - (y_denominator - slope * numerator) / y_denominator}
+
+
+def column_results(batch_results: Dict[str, np.ndarray], index: int) -> Dict[str, float]:
+    """Return the mapping of the results for the column at the given index of
+    batch_results, in the form returned by simple_linear_regression.
+
+    Preconditions:
+        - batch_results was returned by batch_linear_regression
+        - 0 <= index < len(batch_results['slope'])
+    """
+    return {key: float(values[index]) for key, values in batch_results.items()}
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def window_linear_regression(x_coords: Coordinates, y_coords: Coordinates,
+                             starts: np.ndarray, stops: np.ndarray) -> Dict[str, np.ndarray]:
+    """Return a mapping of the slope, the y-intercept, the correlation, and
+    the coefficient of determination (R^2) to arrays holding their values for
+    simple linear regression on each window of the given coordinates.
+
+    Window i is made of the coordinates at indices starts[i] to stops[i] - 1, so index i
+    of each array is the same as simple_linear_regression(x_coords[starts[i]:stops[i]],
+    y_coords[starts[i]:stops[i]]). The cumulative sums of x, y, x^2, y^2 and xy are
+    computed once, so the sums of each window take constant time whatever its length.
+    The coordinates are shifted by the first point before being summed, as in
+    sufficient_statistics.
+
+    >>> results = window_linear_regression([1.0, 2.0, 3.0, 4.0], [2.0, 4.0, 6.5, 7.0],
+    ...                                    np.array([0, 1]), np.array([3, 4]))
+    >>> results['slope'].round(6).tolist()
+    [2.25, 1.5]
+
+    Preconditions:
+        - len(x_coords) > 0
+        - len(x_coords) == len(y_coords)
+        - len(starts) == len(stops)
+        - all(0 <= start < stop <= len(x_coords) for start, stop in zip(starts, stops))
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    x_shifted = x_array - x_array[0]
+    y_shifted = y_array - y_array[0]
+
+    # Row i + 1 holds the sums of the first i + 1 shifted coordinates, and row 0 is zero
+    prefix_sums = np.zeros((len(x_array) + 1, 5))
+    np.cumsum(np.column_stack([x_shifted, y_shifted, x_shifted * x_shifted,
+                               y_shifted * y_shifted, x_shifted * y_shifted]),
+              axis=0, out=prefix_sums[1:])
+    sum_x, sum_y, sum_xx, sum_yy, sum_xy = (prefix_sums[stops] - prefix_sums[starts]).T
+    n = np.asarray(stops) - np.asarray(starts)
+
+    return batch_results(n, x_array[0] + sum_x / n, y_array[0] + sum_y / n,
+                         sum_xy - sum_x * sum_y / n,
+                         sum_xx - sum_x * sum_x / n,
+                         sum_yy - sum_y * sum_y / n)
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def rolling_linear_regression(x_coords: Coordinates, y_coords: Coordinates,
+                              window: int, step: int = 1) -> Dict[str, np.ndarray]:
+    """Return the results of simple linear regression on every run of window consecutive
+    coordinates, starting at indices 0, step, 2 * step, ..., in the form returned by
+    window_linear_regression.
+
+    The coordinates should be in order of their x-coordinates, in either direction, for
+    each run to cover a range of x-coordinates. A run counts coordinates, not a range of
+    x-coordinates: 30 yearly temperatures only span 30 years if no year is missing. Call
+    window_linear_regression with the bounds from numpy.searchsorted for windows of a
+    fixed range.
+
+    >>> results = rolling_linear_regression([1.0, 2.0, 3.0, 4.0], [2.0, 4.0, 6.5, 7.0], 3)
+    >>> results['slope'].round(6).tolist()
+    [2.25, 1.5]
+
+    Preconditions:
+        - 0 < window <= len(x_coords)
+        - step > 0
+        - len(x_coords) == len(y_coords)
+    """
+    starts = np.arange(0, len(x_coords) - window + 1, step)
+
+    return window_linear_regression(x_coords, y_coords, starts, starts + window)
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def grouped_linear_regression(x_coords: Coordinates, y_coords: Coordinates,
+                              keys: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Return the keys present in the given integer keys, in increasing order, and the
+    results of simple linear regression on the coordinates of each of those keys, in the
+    form returned by window_linear_regression.
+
+    keys[i] is the group of the coordinates at index i, for example the decade numbered
+    by data_wrangling.period_keys. The coordinates can be in any order: the sums of every
+    group are reduced together with numpy.bincount. The coordinates are shifted by the
+    first point before being summed, as in sufficient_statistics.
+
+    >>> groups, results = grouped_linear_regression([1.0, 2.0, 3.0, 4.0, 5.0],
+    ...                                             [2.0, 1.0, 4.0, 2.0, 6.5], [-1, 1, -1, 1, -1])
+    >>> groups.tolist(), results['slope'].round(6).tolist()
+    ([-1, 1], [1.125, 0.5])
+
+    Preconditions:
+        - len(x_coords) > 0
+        - len(x_coords) == len(y_coords) == len(keys)
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    key_array = np.asarray(keys, dtype=np.int64)
+    first_key = int(key_array.min())
+    key_array = key_array - first_key
+    x_shifted = x_array - x_array[0]
+    y_shifted = y_array - y_array[0]
+
+    counts = np.bincount(key_array)
+    present = np.flatnonzero(counts)
+    sum_x, sum_y, sum_xx, sum_yy, sum_xy = (
+        np.bincount(key_array, weights=weights)[present]
+        for weights in (x_shifted, y_shifted, x_shifted * x_shifted,
+                        y_shifted * y_shifted, x_shifted * y_shifted))
+    n = counts[present]
+
+    return (present + first_key, batch_results(n, x_array[0] + sum_x / n, y_array[0] + sum_y / n,
+                                             sum_xy - sum_x * sum_y / n,
+                                             sum_xx - sum_x * sum_x / n,
+                                             sum_yy - sum_y * sum_y / n))
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def weighted_linear_regression(x_coords: Coordinates, y_coords: Coordinates,
+                               weights: Coordinates) -> Dict[str, float]:
+    """Return the results of weighted least-squares linear regression on the given x- and
+    y-coordinates, in the form returned by simple_linear_regression.
+
+    weights[i] is the weight of the point at index i, for example the number of days of
+    each year in data_wrangling.summarize_temperatures(...).counts, so that the averages
+    of partial years count for less. The correlation and R^2 are weighted the same way.
+    Equal weights give the results of simple_linear_regression.
+
+    >>> results = weighted_linear_regression([1.0, 2.0, 3.0, 4.0], [2.0, 4.0, 6.0, 20.0],
+    ...                                      [365.0, 366.0, 365.0, 0.0])
+    >>> round(results['slope'], 6), round(results['y-intercept'], 6)
+    (2.0, 0.0)
+
+    Preconditions:
+        - len(x_coords) > 0
+        - len(x_coords) == len(y_coords) == len(weights)
+        - all(weight >= 0 for weight in weights)
+        - sum(weights) > 0
+    """
+    return regression_results(*weighted_statistics(x_coords, y_coords, weights))
+
+
+def weighted_statistics(x_coords: Coordinates, y_coords: Coordinates, weights: Coordinates) \
+        -> Tuple[float, float, float, float, float, float]:
+    """Return the sufficient statistics of weighted least-squares linear regression on the
+    given x- and y-coordinates, in the same order as the parameters of regression_results,
+    with the total weight in place of the number of coordinates.
+
+    The weighted sums are accumulated over blocks of BLOCK_SIZE coordinates shifted by the
+    first point, as in sufficient_statistics.
+
+    Preconditions:
+        - len(x_coords) > 0
+        - len(x_coords) == len(y_coords) == len(weights)
+        - sum(weights) > 0
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    weight_array = np.asarray(weights, dtype=np.float64)
+    x_shift = x_array[0]
+    y_shift = y_array[0]
+
+    # ACCUMULATOR: Keep track of the weighted sums of 1, x, y, x^2, y^2 and xy so far
+    sum_w, sum_x, sum_y, sum_xx, sum_yy, sum_xy = 0.0, 0.0, 0.0, 0.0, 0.0, 0.0
+
+    for start in range(0, len(x_array), BLOCK_SIZE):
+        w_block = weight_array[start:start + BLOCK_SIZE]
+        x_block = x_array[start:start + BLOCK_SIZE] - x_shift
+        y_block = y_array[start:start + BLOCK_SIZE] - y_shift
+        wx_block = w_block * x_block
+        wy_block = w_block * y_block
+
+        sum_w += float(np.sum(w_block))
+        sum_x += float(np.sum(wx_block))
+        sum_y += float(np.sum(wy_block))
+        sum_xx += float(np.dot(wx_block, x_block))
+        sum_yy += float(np.dot(wy_block, y_block))
+        sum_xy += float(np.dot(wx_block, y_block))
+
+    return (sum_w, x_shift + sum_x / sum_w, y_shift + sum_y / sum_w,
+            sum_xy - sum_x * sum_y / sum_w,
+            sum_xx - sum_x * sum_x / sum_w,
+            sum_yy - sum_y * sum_y / sum_w)
+
+
+def line_results(x_coords: Coordinates, y_coords: Coordinates, slope: float,
+                 y_intercept: float) -> Dict[str, float]:
+    """Return the given regression line of the given x- and y-coordinates with its
+    correlation and R^2, in the form returned by simple_linear_regression.
+
+    The correlation is the correlation of the coordinates, and R^2 is the fraction of the
+    variation of the y-coordinates about their average explained by the line. They are the
+    same as for simple_linear_regression when the line is the least-squares line, and R^2
+    is smaller for any other line.
+
+    Preconditions:
+        - len(x_coords) > 1
+        - len(x_coords) == len(y_coords)
+        - not all x-coordinates are equal and not all y-coordinates are equal
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    _, _, _, numerator, x_denominator, y_denominator = sufficient_statistics(x_array, y_array)
+
+    # ACCUMULATOR: Keep track of the sum of squared residuals of the line so far
+    residuals_so_far = 0.0
+    for start in range(0, len(x_array), BLOCK_SIZE):
+        residuals = (y_array[start:start + BLOCK_SIZE]
+                     - (y_intercept + slope * x_array[start:start + BLOCK_SIZE]))
+        residuals_so_far += float(np.dot(residuals, residuals))
+
+    return {'slope': float(slope), 'y-intercept': float(y_intercept),
+            'correlation': float(numerator / math.sqrt(x_denominator * y_denominator)),
+            'R^2': float(1 - residuals_so_far / y_denominator)}
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def theil_sen_regression(x_coords: Coordinates, y_coords: Coordinates) -> Dict[str, float]:
+    """Return the results of Theil-Sen regression on the given x- and y-coordinates, in the
+    form returned by line_results.
+
+    The slope is the median of the slopes of the lines through every pair of points with
+    different x-coordinates, and the y-intercept is the median of y - slope * x. Up to 29%
+    of the points can be arbitrarily wrong without moving the line arbitrarily far.
+
+    The n * (n - 1) / 2 slopes are never all computed: slope_order_statistics selects the
+    middle ones in O(n log n) expected time.
+
+    >>> results = theil_sen_regression([1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    ...                                [2.0, 4.0, 6.0, 8.0, 10.0, 100.0])
+    >>> results['slope'], results['y-intercept']
+    (2.0, 0.0)
+
+    Preconditions:
+        - len(x_coords) == len(y_coords)
+        - not all x-coordinates are equal and not all y-coordinates are equal
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    order = np.lexsort((y_array, x_array))
+    x_sorted = x_array[order]
+    y_sorted = y_array[order]
+
+    # Pairs of points with the same x-coordinate have no slope
+    n = len(x_array)
+    _, ties = np.unique(x_sorted, return_counts=True)
+    n_pairs = n * (n - 1) // 2 - int(np.sum(ties * (ties - 1) // 2))
+
+    slope = float(np.mean(slope_order_statistics(x_sorted, y_sorted,
+                                                 sorted({(n_pairs - 1) // 2, n_pairs // 2}))))
+
+    return line_results(x_array, y_array, slope, float(np.median(y_array - slope * x_array)))
+
+
+def slope_order_statistics(x_sorted: np.ndarray, y_sorted: np.ndarray,
+                           ranks: List[int]) -> List[float]:
+    """Return the slopes at the given indices of the sorted slopes of the lines through
+    every pair of the given points with different x-coordinates.
+
+    For any slope t, sorting the points by y - t * x puts the right point of a pair before
+    its left point exactly when the slope of the pair is below t, so the number of slopes
+    below t is the number of inversions of that order, counted by inversion_pairs in
+    O(n log n) time. The slopes are narrowed to an interval known to hold the slopes at
+    ranks, bounded by two such orders: pairs sampled uniformly from the interval give new
+    bounds close around ranks, until the interval holds few enough pairs to compute all of
+    their slopes. This takes a few rounds, each in O(n log n) time (Matousek, Randomized
+    optimal algorithm for slope selection, 1991).
+
+    >>> slope_order_statistics(np.array([0.0, 1.0, 2.0]), np.array([0.0, 1.0, 4.0]), [0, 2])
+    [1.0, 3.0]
+
+    Preconditions:
+        - the points are sorted by x-coordinate, then by y-coordinate
+        - ranks is sorted and ranks[-1] - ranks[0] <= 1
+        - all(0 <= k < the number of pairs with different x-coordinates for k in ranks)
+    """
+    n = len(x_sorted)
+    rng = np.random.default_rng(THEIL_SEN_SEED)
+    found = {}
+    remaining = list(ranks)
+
+    # The orders of the points for slopes of minus and plus infinity, and the numbers of
+    # slopes they put below
+    lower, below_lower = np.arange(n), 0
+    upper = np.lexsort((np.arange(n), -x_sorted))
+    below_upper, _, _ = inversion_pairs(relative_order(lower, upper))
+
+    while remaining and below_upper - below_lower > max(n, BLOCK_SIZE):
+        inside = below_upper - below_lower
+        _, firsts, seconds = inversion_pairs(relative_order(lower, upper),
+                                             np.sort(rng.integers(0, inside, n)))
+        samples = np.sort(pair_slopes(x_sorted, y_sorted, lower[firsts], lower[seconds]))
+        spread = 3 * math.sqrt(len(samples))
+        candidates = [(math.floor((remaining[0] - below_lower) / inside * len(samples) - spread),
+                       False),
+                      (math.ceil((remaining[-1] - below_lower + 1) / inside * len(samples)
+                                 + spread), True)]
+        bounds = (below_lower, below_upper)
+
+        for rank, strict_first in candidates:
+            if not remaining or not 0 <= rank < len(samples):
+                continue
+
+            # Count the slopes strictly below, or up to, the sampled slope, whichever is
+            # likely to make a new bound first
+            value = float(samples[rank])
+            orders = {}
+            for strict in (strict_first, not strict_first):
+                orders[strict] = count_below(x_sorted, y_sorted, value, strict)
+                if (strict and remaining[-1] < orders[strict][1]) \
+                        or (not strict and orders[strict][1] <= remaining[0]):
+                    break
+            else:
+                # The slopes at the ranks from below_strict to below_loose equal value
+                found.update((k, value) for k in remaining
+                             if orders[True][1] <= k < orders[False][1])
+                remaining = [k for k in remaining if k not in found]
+
+            if remaining and True in orders and remaining[-1] < orders[True][1] < below_upper:
+                upper, below_upper = orders[True]
+            elif remaining and False in orders and below_lower < orders[False][1] <= remaining[0]:
+                lower, below_lower = orders[False]
+
+        if bounds == (below_lower, below_upper):
+            break
+
+    if remaining:
+        inside, _, _ = inversion_pairs(relative_order(lower, upper))
+        _, firsts, seconds = inversion_pairs(relative_order(lower, upper), np.arange(inside))
+        slopes = pair_slopes(x_sorted, y_sorted, lower[firsts], lower[seconds])
+        indices = [min(k - below_lower, len(slopes) - 1) for k in remaining]
+        slopes = np.partition(slopes, indices)
+        found.update((k, float(slopes[i])) for k, i in zip(remaining, indices))
+
+    return [found[k] for k in ranks]
+
+
+def count_below(x_sorted: np.ndarray, y_sorted: np.ndarray, slope: float,
+                strict: bool) -> Tuple[np.ndarray, int]:
+    """Return the order of the given points by slope_order and the number of the slopes of
+    their pairs below slope, or up to slope if strict is False.
+
+    Preconditions:
+        - the points are sorted by x-coordinate, then by y-coordinate
+    """
+    order = slope_order(x_sorted, y_sorted, slope, strict)
+    count, _, _ = inversion_pairs(relative_order(np.arange(len(x_sorted)), order))
+
+    return order, count
+
+
+def slope_order(x_sorted: np.ndarray, y_sorted: np.ndarray, slope: float,
+                strict: bool) -> np.ndarray:
+    """Return the indices of the given points sorted by y - slope * x.
+
+    A pair of points whose slope equals slope keeps its left point first if strict is
+    True, so the pair is not counted below slope by count_below, and is
+    reversed otherwise. The remaining ties keep the order of the points.
+    """
+    positions = np.arange(len(x_sorted))
+    return np.lexsort((positions, x_sorted if strict else -x_sorted, y_sorted - slope * x_sorted))
+
+
+def relative_order(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Return the position in the order second of each element of the order first, in the
+    order first. Its inversions are the pairs of elements ordered differently by first
+    and second.
+
+    >>> relative_order(np.array([2, 0, 1]), np.array([0, 1, 2])).tolist()
+    [2, 0, 1]
+
+    Preconditions:
+        - first and second are permutations of range(len(first))
+    """
+    positions = np.empty(len(second), dtype=np.int64)
+    positions[second] = np.arange(len(second))
+
+    return positions[first]
+
+
+def pair_slopes(x_coords: np.ndarray, y_coords: np.ndarray, firsts: np.ndarray,
+                seconds: np.ndarray) -> np.ndarray:
+    """Return the slopes of the lines through the points at the indices firsts[i] and
+    seconds[i] of the given coordinates, for each i.
+
+    Preconditions:
+        - all(x_coords[i] != x_coords[j] for i, j in zip(firsts, seconds))
+    """
+    return (y_coords[seconds] - y_coords[firsts]) / (x_coords[seconds] - x_coords[firsts])
+
+
+def inversion_pairs(permutation: np.ndarray, picks: Optional[np.ndarray] = None) \
+        -> Tuple[int, np.ndarray, np.ndarray]:
+    """Return the number of inversions of permutation, the pairs of indices i < j with
+    permutation[i] > permutation[j], and the indices i and j of the inversions at the
+    ranks in picks of a fixed order of all of the inversions.
+
+    The inversions are counted one bit of the values at a time, from the highest, in
+    O(n log n) time. Two values first differ at one bit, so each inversion is counted at
+    exactly one bit: the values are kept stably sorted by their bits above the current
+    one, and every value with the current bit set forms an inversion with each later
+    value of its group with the bit cleared. After the bit is counted, each group is
+    stably split by it. The values with the bit set that precede a value in its group
+    are then the first ones of the group, so the inversion at any rank is found directly.
+
+    >>> count, firsts, seconds = inversion_pairs(np.array([2, 0, 3, 1]), np.arange(3))
+    >>> count, sorted(zip(firsts.tolist(), seconds.tolist()))
+    (3, [(0, 1), (0, 3), (2, 3)])
+
+    Preconditions:
+        - permutation is a permutation of range(len(permutation))
+        - picks is None or picks is sorted and all(0 <= pick < count for pick in picks)
+    """
+    n = len(permutation)
+    # Half the memory traffic of int64 for the lengths of any realistic dataset
+    values = np.asarray(permutation, dtype=np.int32 if n < 2 ** 31 else np.int64)
+    indices = np.arange(n, dtype=values.dtype)
+    positions = np.arange(n, dtype=values.dtype)
+    picks = np.zeros(0, dtype=np.int64) if picks is None else picks
+
+    # ACCUMULATOR: Keep track of the number of inversions counted so far, and of the
+    # indices of the picked inversions found so far
+    count = 0
+    firsts_so_far, seconds_so_far = [], []
+
+    for bit in reversed(range(max(1, (n - 1).bit_length()))):
+        ones = (values >> bit) & 1
+        zeros = 1 - ones
+        starts = np.flatnonzero(np.diff(values >> (bit + 1), prepend=-1))
+        sizes = np.diff(starts, append=n)
+
+        ones_before = np.cumsum(ones, dtype=values.dtype) - ones
+        ones_before -= np.repeat(ones_before[starts], sizes)
+        counts = ones_before * zeros
+        # The position of the first value of each group with the bit set, once split
+        one_starts = np.repeat(starts + np.add.reduceat(zeros, starts), sizes)
+
+        # Stably split each group, its values with the bit cleared first
+        split = np.where(ones == 0, positions - ones_before, one_starts + ones_before)
+        split_indices = np.empty_like(indices)
+        split_indices[split] = indices
+
+        level_count = int(np.sum(counts, dtype=np.int64))
+        first_pick, last_pick = np.searchsorted(picks, [count, count + level_count])
+        if first_pick < last_pick:
+            cumulative = np.cumsum(counts, dtype=np.int64)
+            ranks = picks[first_pick:last_pick] - count
+            later = np.searchsorted(cumulative, ranks, side='right')
+            offsets = ranks - (cumulative[later] - counts[later])
+            firsts_so_far.append(split_indices[one_starts[later] + offsets])
+            seconds_so_far.append(indices[later])
+
+        split_values = np.empty_like(values)
+        split_values[split] = values
+        values, indices = split_values, split_indices
+        count += level_count
+
+    if firsts_so_far:
+        return count, np.concatenate(firsts_so_far), np.concatenate(seconds_so_far)
+    else:
+        return count, np.zeros(0, dtype=values.dtype), np.zeros(0, dtype=values.dtype)
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def huber_linear_regression(x_coords: Coordinates, y_coords: Coordinates,
+                            tuning: float = HUBER_TUNING, max_iterations: int = 50,
+                            tolerance: float = 1e-8) -> Dict[str, float]:
+    """Return the results of Huber regression on the given x- and y-coordinates, in the
+    form returned by line_results.
+
+    The line minimizes the sum of the squares of the small residuals and of the absolute
+    values of the large ones, beyond tuning times the scale of the residuals, so spikes
+    pull it less than the least-squares line. It is found by iteratively reweighted least
+    squares, starting from the least-squares line: each iteration weights every point at
+    once by min(1, tuning * scale / |residual|), the scale being estimated from the median
+    absolute residual, and fits the weighted least-squares line. The iterations stop when
+    the line moves by less than tolerance times the scale over the range of the
+    x-coordinates, or after max_iterations iterations.
+
+    >>> results = huber_linear_regression([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0],
+    ...                                   [2.1, 3.9, 6.0, 8.1, 9.9, 12.0, 14.1, 100.0])
+    >>> round(results['slope'], 1)
+    2.0
+
+    Preconditions:
+        - len(x_coords) > 1
+        - len(x_coords) == len(y_coords)
+        - not all x-coordinates are equal and not all y-coordinates are equal
+        - tuning > 0
+        - max_iterations >= 0
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    x_bounds = np.array([x_array.min(), x_array.max()])
+    results = regression_results(*sufficient_statistics(x_array, y_array))
+    slope, y_intercept = results['slope'], results['y-intercept']
+
+    for _ in range(max_iterations):
+        residuals = np.abs(y_array - (y_intercept + slope * x_array))
+        scale = MAD_SCALE * float(np.median(residuals))
+        if scale == 0:
+            # Most of the points are on the line already
+            break
+
+        threshold = tuning * scale
+        weights = threshold / np.maximum(residuals, threshold)
+        _, x_avg, y_avg, numerator, x_denominator, _ = weighted_statistics(x_array, y_array,
+                                                                           weights)
+        new_slope = numerator / x_denominator
+        new_intercept = y_avg - new_slope * x_avg
+        moved = np.max(np.abs((new_intercept - y_intercept) + (new_slope - slope) * x_bounds))
+        slope, y_intercept = new_slope, new_intercept
+
+        if moved <= tolerance * scale:
+            break
+
+    return line_results(x_array, y_array, slope, y_intercept)
+
+
+@dataclass
+class LinearModel:
+    """A dataclass representing a fitted linear model predicting k outputs from p inputs.
+
+    Output j of a row of inputs x is intercepts[j] + x @ coefficients[:, j].
+
+    Instance Attributes:
+        - intercepts: the intercept of each output, an array of shape (k,)
+        - coefficients: the coefficient of each input for each output, an array of
+          shape (p, k)
+        - r_squared: the coefficient of determination (R^2) of each output on the
+          data it was fitted to, or NaN if the model was not fitted to data
+
+    Representation Invariants:
+        - self.coefficients.ndim == 2
+        - self.intercepts.shape == self.r_squared.shape == (self.coefficients.shape[1],)
+    """
+    intercepts: np.ndarray
+    coefficients: np.ndarray
+    r_squared: np.ndarray
+
+    def predict(self, x_columns: np.ndarray) -> np.ndarray:
+        """Return the outputs predicted for each row of x_columns, as an array of shape
+        (len(x_columns), k).
+
+        >>> model = LinearModel(np.array([1.0, 0.0]), np.array([[2.0, -1.0]]),
+        ...                     np.array([np.nan, np.nan]))
+        >>> model.predict(np.array([[0.0], [3.0]])).tolist()
+        [[1.0, 0.0], [7.0, -3.0]]
+
+        Preconditions:
+            - np.ndim(x_columns) == 2
+            - np.shape(x_columns)[1] == self.coefficients.shape[0]
+        """
+        return self.intercepts + np.asarray(x_columns, dtype=np.float64) @ self.coefficients
+
+
+def simple_model(results: List[Dict[str, float]]) -> LinearModel:
+    """Return the linear model predicting one output per mapping of results from a single
+    input, the x-coordinate of the regressions.
+
+    Preconditions:
+        - len(results) > 0
+        - every mapping of results was returned by simple_linear_regression
+    """
+    return LinearModel(intercepts=np.array([result['y-intercept'] for result in results]),
+                       coefficients=np.array([[result['slope'] for result in results]]),
+                       r_squared=np.array([result['R^2'] for result in results]))
+
+
+def chain_models(first: LinearModel, second: LinearModel) -> LinearModel:
+    """Return the linear model predicting the outputs of second from the inputs of first,
+    when the outputs of first are the inputs of second.
+
+    Both models are linear, so the chain is one model, and predicting with it takes a
+    single matrix product. Its r_squared is NaN, as it was not fitted to data.
+
+    >>> first = LinearModel(np.array([1.0]), np.array([[2.0]]), np.array([np.nan]))
+    >>> second = LinearModel(np.array([0.0, 1.0]), np.array([[3.0, -1.0]]),
+    ...                      np.array([np.nan, np.nan]))
+    >>> chain_models(first, second).predict(np.array([[1.0]])).tolist()
+    [[9.0, -2.0]]
+
+    Preconditions:
+        - first.coefficients.shape[1] == second.coefficients.shape[0]
+    """
+    return LinearModel(intercepts=first.intercepts @ second.coefficients + second.intercepts,
+                       coefficients=first.coefficients @ second.coefficients,
+                       r_squared=np.full(len(second.intercepts), np.nan))
+
+
+@dataclass
+class LeastSquaresAccumulator:
+    """A dataclass keeping the running statistics of multiple linear regression of
+    several outputs on several inputs, so that the rows can be added in chunks.
+
+    The statistics are the averages of the input and output columns and the matrix of
+    the sums of products of their deviations from those averages, which generalize
+    the statistics of RegressionAccumulator and are merged with the same pairwise
+    update. The model is solved from these centred normal equations by Cholesky
+    factorization, after scaling the inputs to unit variance.
+
+    >>> accumulator = LeastSquaresAccumulator()
+    >>> accumulator.update(np.array([[0.0, 1.0], [1.0, 0.0]]), np.array([[3.0], [4.0]]))
+    >>> accumulator.update(np.array([[1.0, 1.0], [2.0, 3.0]]), np.array([[5.0], [9.0]]))
+    >>> model = accumulator.solve()
+    >>> model.intercepts.round(6).tolist(), model.coefficients.round(6).tolist()
+    ([2.0], [[2.0], [1.0]])
+
+    Instance Attributes:
+        - n: the number of rows added so far
+        - averages: the averages of the input columns followed by the output columns,
+          or None if no row was added
+        - comoments: the sums of the products of the deviations from averages of each
+          pair of columns, or None if no row was added
+        - n_inputs: the number of input columns, or 0 if no row was added
+
+    Representation Invariants:
+        - self.n >= 0
+        - (self.averages is None) == (self.n == 0)
+    """
+    n: int = 0
+    averages: Optional[np.ndarray] = None
+    comoments: Optional[np.ndarray] = None
+    n_inputs: int = 0
+
+    def update(self, x_columns: np.ndarray, y_columns: np.ndarray) -> None:
+        """Add the given chunk of rows of inputs and outputs to this accumulator.
+
+        y_columns can be one-dimensional for a single output.
+
+        Preconditions:
+            - np.ndim(x_columns) == 2
+            - len(x_columns) == len(y_columns)
+        """
+        if len(x_columns) == 0:
+            return
+
+        x_array = np.asarray(x_columns, dtype=np.float64)
+        columns = np.column_stack([x_array, np.asarray(y_columns, dtype=np.float64)])
+
+        # ACCUMULATOR: Keep track of the statistics of the blocks of the chunk so far
+        chunk = LeastSquaresAccumulator()
+        for start in range(0, len(columns), BLOCK_SIZE):
+            block = columns[start:start + BLOCK_SIZE]
+            averages = block.mean(axis=0)
+            deviations = block - averages
+            chunk.merge(LeastSquaresAccumulator(len(block), averages,
+                                                deviations.T @ deviations, x_array.shape[1]))
+
+        self.merge(chunk)
+
+    def merge(self, other: 'LeastSquaresAccumulator') -> None:
+        """Add the rows summarized by other to this accumulator.
+
+        Preconditions:
+            - self.n == 0 or other.n == 0 or self.n_inputs == other.n_inputs
+        """
+        if other.n == 0:
+            return
+        elif self.n == 0:
+            self.n, self.n_inputs = other.n, other.n_inputs
+            self.averages = other.averages.copy()
+            self.comoments = other.comoments.copy()
+            return
+
+        n = self.n + other.n
+        delta = other.averages - self.averages
+
+        self.averages += delta * other.n / n
+        self.comoments += other.comoments + np.outer(delta, delta) * (self.n * other.n / n)
+        self.n = n
+
+    def solve(self) -> LinearModel:
+        """Return the least-squares linear model of the rows added so far.
+
+        Preconditions:
+            - self.n > self.n_inputs
+            - the input columns added so far are linearly independent and not constant
+        """
+        p = self.n_inputs
+        x_comoments = self.comoments[:p, :p]
+        xy_comoments = self.comoments[:p, p:]
+        y_variations = np.diag(self.comoments)[p:]
+
+        # Scale the inputs to unit variation so that inputs of very different
+        # magnitudes, such as years and temperatures, stay well conditioned
+        scales = np.sqrt(np.diag(x_comoments))
+        lower = np.linalg.cholesky(x_comoments / np.outer(scales, scales))
+        scaled = np.linalg.solve(lower.T, np.linalg.solve(lower, xy_comoments / scales[:, None]))
+        coefficients = scaled / scales[:, None]
+
+        # The sum of squared residuals of each output is its variation minus the part
+        # explained by the inputs
+        residuals = y_variations - np.einsum('ij,ij->j', coefficients, xy_comoments)
+
+        return LinearModel(intercepts=self.averages[p:] - self.averages[:p] @ coefficients,
+                           coefficients=coefficients,
+                           r_squared=1 - residuals / y_variations)
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def multiple_linear_regression(x_columns: np.ndarray, y_columns: np.ndarray) -> LinearModel:
+    """Return the least-squares linear model predicting each column of y_columns from
+    all the columns of x_columns together.
+
+    y_columns can be one-dimensional for a single output. The rows are reduced in blocks
+    of BLOCK_SIZE by a LeastSquaresAccumulator, which can also be updated directly with
+    chunks of a dataset too large to hold in memory.
+
+    >>> model = multiple_linear_regression(np.array([[0.0, 1.0], [1.0, 0.0], [1.0, 1.0],
+    ...                                              [2.0, 3.0]]),
+    ...                                    np.array([3.0, 4.0, 5.0, 9.0]))
+    >>> model.predict(np.array([[2.0, 2.0]])).round(6).tolist()
+    [[8.0]]
+
+    Preconditions:
+        - np.ndim(x_columns) == 2
+        - len(x_columns) == len(y_columns)
+        - len(x_columns) > np.shape(x_columns)[1]
+        - the columns of x_columns are linearly independent and not constant
+    """
+    accumulator = LeastSquaresAccumulator()
+    accumulator.update(x_columns, y_columns)
 
-    return {'slope': slope, 'y-intercept': y_intercept,
-            'correlation': correlation, 'R^2': r_squared}
+    return accumulator.solve()
 
 
-def calculate_formulas(x_coords: List[float], y_coords: List[float], n: int,
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def calculate_formulas(x_coords: Coordinates, y_coords: Coordinates, n: int,
                        x_avg: float, y_avg: float) -> Tuple[float, float, float]:
     """Return a tuple of the numerators and denominators of the formulas for the slope,
     correlation, and coefficient of determination (R^2) for the regression
@@ -75,24 +1079,20 @@ def calculate_formulas(x_coords: List[float], y_coords: List[float], n: int,
         - n > 0
         - len(x_coords) == len(y_coords) == n
     """
-    # ACCUMULATOR: Keep track of the sum of the numerator seen
-    # so far for the formulas
-    numerator_so_far = 0
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
 
-    # ACCUMULATOR: Keep track of the sum of the denominator
-    # involving x-coordinates seen so far for the formulas
-    x_denominator_so_far = 0
+    # ACCUMULATOR: Keep track of the sums of the numerator and the
+    # denominators of the formulas seen so far
+    numerator_so_far, x_denominator_so_far, y_denominator_so_far = 0.0, 0.0, 0.0
 
-    # ACCUMULATOR: Keep track of the sum of the denominator
-    # involving y-coordinates seen so far for the formulas
-    y_denominator_so_far = 0
+    for start in range(0, n, BLOCK_SIZE):
+        x_block = x_array[start:start + BLOCK_SIZE] - x_avg
+        y_block = y_array[start:start + BLOCK_SIZE] - y_avg
 
-    # Calculate the numerators and denominators of the formulas for
-    # slope, y-intercept, correlation, and R^2
-    for i in range(0, n):
-        numerator_so_far += (x_coords[i] - x_avg) * (y_coords[i] - y_avg)
-        x_denominator_so_far += (x_coords[i] - x_avg) ** 2
-        y_denominator_so_far += (y_coords[i] - y_avg) ** 2
+        numerator_so_far += float(np.dot(x_block, y_block))
+        x_denominator_so_far += float(np.dot(x_block, x_block))
+        y_denominator_so_far += float(np.dot(y_block, y_block))
 
     return (numerator_so_far, x_denominator_so_far, y_denominator_so_far)
 
@@ -109,7 +1109,8 @@ if __name__ == '__main__':
     python_ta.check_all(
         config={
             # The names (strs) of imported modules
-            'extra-imports': ['math', 'python_ta.contracts'],
+            'extra-imports': ['dataclasses', 'math', 'numpy', 'instrumentation',
+                              'python_ta.contracts'],
             # The names (strs) of functions that call print/open/input
             'allowed-io': [],
             'max-line-length': 100,
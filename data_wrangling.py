@@ -15,10 +15,91 @@ changes to this code, is prohibited.
 
 This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
 """
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
+import bz2
+import collections
+import concurrent.futures
+import contextlib
 import csv
 import datetime
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import mmap
+import os
+import queue
+import threading
+
+import numpy as np
+
+import instrumentation
+
+# The sources of CSV files accepted by the readers: a path, or a binary file-like object
+Source = Union[str, BinaryIO]
+
+# The number of bytes of a CSV file parsed at once by load_columns
+CHUNK_SIZE = 2 ** 22
+
+# The magic numbers starting the compressed files that open_source decompresses, the
+# number of decompressed bytes parsed at once by load_stream_columns, and the number of
+# decompressed chunks that read_ahead may hold ahead of the parser
+COMPRESSIONS = {b'\x1f\x8b': 'gzip', b'BZh': 'bz2', b'\xfd7zXZ\x00': 'xz',
+                b'\x28\xb5\x2f\xfd': 'zstd'}
+STREAM_CHUNK_SIZE = 2 ** 20
+READ_AHEAD = 2
+
+# The names of the columns of TorontoAtmosphereTable, in the order of the columns of
+# toronto_atmospheres.csv, and the largest number of bytes of a timestamp in it
+ATMOSPHERE_COLUMNS = ('timestamps', 'temperature', 'nitrogen_dioxide', 'ozone', 'oxidants',
+                      'ozone_8hr')
+TIMESTAMP_WIDTH = 32
+
+# The names of the columns of TorontoTemperatureTable, and the indices of the columns of
+# toronto_atmospheres.csv and weatherstats_toronto_daily.csv that read_csv_table1 and
+# read_csv_table2 read by default, in the order of the columns of their tables
+DAILY_COLUMNS = ('dates', 'avg_temps')
+ATMOSPHERE_USECOLS = (0, 1, 2, 3, 4, 5)
+DAILY_USECOLS = (0, 1)
+
+# The periods that daily temperatures can be summarized over by summarize_temperatures.
+# Seasons are meteorological: winter is December to February, and December counts
+# towards the winter of the following year.
+PERIODS = ('year', 'month', 'season', 'decade')
+
+# The suffix of the directory next to a CSV file that caches its parsed columns,
+# and the version of the cache layout. Caches of other versions are rebuilt.
+CACHE_SUFFIX = '.cache'
+CACHE_VERSION = 2
+
+# The number of bytes of a memory-mapped CSV file tokenized at once by mmap_columns,
+# and the largest column index that it can tokenize
+MMAP_BLOCK_SIZE = 2 ** 19
+MAX_COLUMNS = 64
+
+# The number of days in each month of a common year, indexed from 1, and the
+# positions of the digits in an ISO date (YYYY-MM-DD)
+MONTH_LENGTHS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+DATE_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9]
+
+# The open ranges (lower, upper) that the values of the columns of TorontoAtmosphereTable
+# and TorontoTemperatureTable must lie in to pass validate_table1 and validate_table2,
+# from the representation invariants of TorontoAtmosphere, and the reasons for which
+# they quarantine a row, in the order the checks are made. A column with a range
+# must not be empty.
+ATMOSPHERE_RANGES = {'temperature': (-273.15, np.inf), 'nitrogen_dioxide': (0.0, np.inf),
+                     'ozone': (0.0, np.inf)}
+DAILY_RANGES = {'avg_temps': (-273.15, np.inf)}
+QUARANTINE_REASONS = ('invalid date', 'not a number', 'missing field', 'out of range')
+
+# The ways join_daily_temperatures can match a reading to a day: on its own date
+# only, or on the latest day on or before its date ("as of" its date)
+JOIN_METHODS = ('exact', 'asof')
+
+# The proleptic Gregorian ordinal of 1970-01-01, the day numbered 0 by datetime64[D]
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
 
 
 @dataclass
@@ -76,28 +157,1571 @@ class TorontoTemperatureDaily:
     avg_temp: float
 
 
-def read_csv_data1(filepath: str) -> List[TorontoAtmosphere]:
-    """Return a list of TorontoAtmosphere dataclasses that represent
-     rows from the CSV file: toronto_atmospheres.csv.
+@dataclass
+class TorontoAtmosphereTable:
+    """A dataclass representing Toronto's hourly atmosphere readings as columns, one
+    array per variable, indexed by time.
+
+    Row i of the table holds the readings at timestamps[i]. Missing readings are NaN.
+
+    Instance Attributes:
+        - timestamps: the times of the readings, as a datetime64[m] array
+        - temperature: the temperatures in Toronto (in Celsius), as a float64 array
+        - nitrogen_dioxide: the nitrogen dioxide concentrations in Toronto (in ppb),
+          as a float64 array
+        - ozone: the ozone concentrations in Toronto (in ppb), as a float64 array
+        - oxidants: the total oxidant (OX) concentrations in Toronto (in ppb),
+          as a float64 array
+        - ozone_8hr: the moving 8-hour average ozone concentrations in Toronto (in ppb),
+          as a float64 array
+
+    Representation Invariants:
+        - len(self.timestamps) == len(self.temperature) == len(self.nitrogen_dioxide)
+        - len(self.timestamps) == len(self.ozone) == len(self.oxidants)
+        - len(self.timestamps) == len(self.ozone_8hr)
+        - np.all(self.timestamps[:-1] <= self.timestamps[1:])
+    """
+    timestamps: np.ndarray
+    temperature: np.ndarray
+    nitrogen_dioxide: np.ndarray
+    ozone: np.ndarray
+    oxidants: np.ndarray
+    ozone_8hr: np.ndarray
+
+
+@dataclass
+class TorontoTemperatureTable:
+    """A dataclass representing Toronto's average daily temperatures as columns.
+
+    Row i of the table is the average temperature avg_temps[i] on the day dates[i].
+
+    Instance Attributes:
+        - dates: the dates in Toronto, as a datetime64[D] array
+        - avg_temps: the average daily temperatures in Toronto (in Celsius),
+          as a float64 array
+
+    Representation Invariants:
+        - len(self.dates) == len(self.avg_temps)
+    """
+    dates: np.ndarray
+    avg_temps: np.ndarray
+
+
+@dataclass
+class TorontoTemperatureSummary:
+    """A dataclass representing Toronto's daily temperatures summarized over periods
+    (years, months, seasons or decades), as columns.
+
+    Row i of the table summarizes the counts[i] days of the period starting on
+    starts[i]. The rows are sorted by starts.
+
+    Instance Attributes:
+        - period: the kind of period summarized, one of 'year', 'month', 'season' or
+          'decade'
+        - starts: the first day of each period, as a datetime64[D] array
+        - avg_temps: the average temperature of each period (in Celsius)
+        - min_temps: the lowest daily temperature of each period (in Celsius)
+        - max_temps: the highest daily temperature of each period (in Celsius)
+        - counts: the number of days in the data for each period
+
+    Representation Invariants:
+        - self.period in PERIODS
+        - len(self.starts) == len(self.avg_temps) == len(self.min_temps)
+        - len(self.starts) == len(self.max_temps) == len(self.counts)
+        - all(count > 0 for count in self.counts)
+    """
+    period: str
+    starts: np.ndarray
+    avg_temps: np.ndarray
+    min_temps: np.ndarray
+    max_temps: np.ndarray
+    counts: np.ndarray
+
+
+@dataclass
+class TorontoAtmosphereJoin:
+    """A dataclass representing hourly atmosphere readings joined to the daily
+    temperature of their date, as columns.
+
+    Row i of atmosphere was joined to the daily temperature avg_temps[i] of the day
+    dates[i], so avg_temps and the columns of atmosphere can be passed together to
+    simple_linear_regression.
+
+    Instance Attributes:
+        - atmosphere: the readings that were joined to a day
+        - dates: the day each reading was joined to, as a datetime64[D] array
+        - avg_temps: the average daily temperature of that day (in Celsius)
+
+    Representation Invariants:
+        - len(self.atmosphere.timestamps) == len(self.dates) == len(self.avg_temps)
+    """
+    atmosphere: TorontoAtmosphereTable
+    dates: np.ndarray
+    avg_temps: np.ndarray
+
+
+@dataclass
+class QuarantineReport:
+    """A dataclass representing the rows of a CSV file rejected by validate_table1 or
+    validate_table2.
+
+    Row i of the report is the line line_numbers[i] of the file, whose text is lines[i],
+    rejected because its value in the column columns[i] failed the check reasons[i].
+
+    Instance Attributes:
+        - filepath: the path of the CSV file
+        - valid_rows: the number of rows of the file that passed every check
+        - line_numbers: the line numbers of the rejected rows, counting the header as
+          line 1, as an int64 array
+        - columns: the name of the first column of each rejected row that failed a check
+        - reasons: the check that column failed, one of QUARANTINE_REASONS
+        - lines: the text of each rejected row
+
+    Representation Invariants:
+        - self.valid_rows >= 0
+        - len(self.line_numbers) == len(self.columns) == len(self.reasons) == len(self.lines)
+        - all(reason in QUARANTINE_REASONS for reason in self.reasons)
+    """
+    filepath: str
+    valid_rows: int
+    line_numbers: np.ndarray
+    columns: List[str]
+    reasons: List[str]
+    lines: List[str]
+
+
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def read_csv_table1(filepath: Source, workers: int = 1, cache: bool = False,
+                    usecols: Tuple[int, ...] = ATMOSPHERE_USECOLS) -> TorontoAtmosphereTable:
+    """Return a TorontoAtmosphereTable containing every row from the CSV file:
+    toronto_atmospheres.csv, sorted by time.
+
+    The file is parsed in bulk into typed arrays, without creating a Python
+    object per row. workers is the number of processes parsing the file.
+    If cache is True, the columns are memory-mapped from the cache next to the
+    file when it is up to date, and saved there after parsing otherwise.
+    usecols holds the indices of the columns of the file read into each column
+    of the table, for files of other stations whose columns are in another order
+    (see header_indices).
+
+    filepath may also be a file compressed with gzip, bz2, xz or zstd, or a binary
+    file-like object, which are decompressed as they are parsed (see open_source).
+    Only paths are cached.
+
+    Preconditions:
+        - filepath == 'toronto_atmospheres.csv' or usecols describes the columns of filepath
+        - the file at filepath is not empty
+        - len(usecols) == len(ATMOSPHERE_COLUMNS)
+    """
+    cache = cache and isinstance(filepath, str)
+    if cache:
+        cached = read_cache(filepath, ATMOSPHERE_COLUMNS, usecols)
+        if cached is not None:
+            return TorontoAtmosphereTable(**cached)
+
+    columns = load_columns(filepath, usecols=usecols,
+                           dtype=[('timestamps', f'S{TIMESTAMP_WIDTH}')]
+                           + [(name, 'f8') for name in ATMOSPHERE_COLUMNS[1:]], workers=workers)
+    table = sort_by_time(TorontoAtmosphereTable(
+        timestamps=parse_timestamp_strings(columns['timestamps']),
+        **{name: columns[name].copy() for name in ATMOSPHERE_COLUMNS[1:]}))
+
+    if cache:
+        write_cache(filepath, vars(table), usecols)
+
+    return table
+
+
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def read_csv_table2(filepath: Source, workers: int = 1, cache: bool = False,
+                    usecols: Tuple[int, ...] = DAILY_USECOLS) -> TorontoTemperatureTable:
+    """Return a TorontoTemperatureTable containing the rows from the CSV file:
+    weatherstats_toronto_daily.csv.
+
+    Like read_csv_data2, rows without a temperature are skipped. The file is
+    parsed in bulk into typed arrays, without creating a Python object per row.
+    workers is the number of processes parsing the file. cache and usecols are
+    the same as for read_csv_table1, and filepath may also be compressed or a
+    file-like object, as for read_csv_table1.
+
+    Preconditions:
+        - filepath == 'weatherstats_toronto_daily.csv' or usecols describes the columns
+          of filepath
+        - the file at filepath is not empty
+        - len(usecols) == len(DAILY_COLUMNS)
+    """
+    cache = cache and isinstance(filepath, str)
+    if cache:
+        cached = read_cache(filepath, DAILY_COLUMNS, usecols)
+        if cached is not None:
+            return TorontoTemperatureTable(**cached)
+
+    columns = load_columns(filepath, usecols=usecols,
+                           dtype=[('date', 'M8[D]'), ('avg_temp', 'f8')], workers=workers)
+
+    # Check that the temperature exists
+    # Else, skip and don't keep the row
+    columns = columns[~np.isnan(columns['avg_temp'])]
+    table = TorontoTemperatureTable(dates=columns['date'].copy(),
+                                    avg_temps=columns['avg_temp'].copy())
+
+    if cache:
+        write_cache(filepath, vars(table), usecols)
+
+    return table
+
+
+def header_indices(filepath: Source, names: Tuple[str, ...]) -> Tuple[int, ...]:
+    """Return the index of the column of the CSV file at filepath with each of the given
+    names in its header row, ignoring surrounding spaces. filepath may be compressed, as
+    for read_csv_table1.
+
+    Raise a ValueError if the header row has no column with one of the names.
+
+    >>> header_indices('weatherstats_toronto_daily.csv', ('date', 'avg_temperature'))
+    (0, 1)
+    """
+    with open_source(filepath) as (stream, _):
+        header = [name.strip() for name in
+                  read_line(stream).decode().rstrip('\r\n').split(',')]
+
+    missing = [name for name in names if name not in header]
+    if missing != []:
+        raise ValueError(f'{filepath} has no column named {", ".join(missing)}')
+
+    return tuple(header.index(name) for name in names)
+
+
+def read_cache(filepath: str, names: Tuple[str, ...],
+               usecols: Tuple[int, ...]) -> Optional[Dict[str, np.ndarray]]:
+    """Return a mapping of the given column names to read-only memory-mapped arrays
+    from the cache of the CSV file at filepath, or None if there is no up-to-date cache.
+
+    The cache is up to date if it was written by this CACHE_VERSION for the same
+    columns, read from the column indices usecols of the file, and the file has the
+    same path, size and modification time as when it was written. If only the
+    modification time differs, the cache is still used when the content hash of the
+    file is unchanged.
+    """
+    directory = filepath + CACHE_SUFFIX
+
+    try:
+        with open(os.path.join(directory, 'fingerprint.json')) as file:
+            saved = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    fingerprint = file_fingerprint(filepath)
+    if saved.get('version') != CACHE_VERSION or saved.get('names') != list(names) \
+            or saved.get('usecols') != list(usecols) \
+            or any(saved.get(key) != fingerprint[key] for key in ('path', 'size')):
+        return None
+    elif saved.get('mtime_ns') != fingerprint['mtime_ns']:
+        # The file was touched or copied: only trust the cache if its content is the same
+        if saved.get('hash') != content_hash(filepath):
+            return None
+        saved['mtime_ns'] = fingerprint['mtime_ns']
+        write_json(os.path.join(directory, 'fingerprint.json'), saved)
+
+    try:
+        return {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+                for name in names}
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(filepath: str, columns: Dict[str, np.ndarray],
+                usecols: Tuple[int, ...]) -> None:
+    """Save the given columns parsed from the column indices usecols of the CSV file at
+    filepath to its cache, as one .npy file per column.
+
+    The fingerprint is removed before the columns are written and saved after them,
+    so an interrupted write leaves no cache rather than a wrong one. Each file is
+    replaced atomically, so arrays already memory-mapped from an older cache stay
+    valid.
+    """
+    directory = filepath + CACHE_SUFFIX
+    os.makedirs(directory, exist_ok=True)
+    fingerprint_path = os.path.join(directory, 'fingerprint.json')
+
+    try:
+        os.remove(fingerprint_path)
+    except FileNotFoundError:
+        pass
+
+    for name, column in columns.items():
+        path = os.path.join(directory, name + '.npy')
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            np.save(file, np.ascontiguousarray(column))
+        os.replace(temporary_path, path)
+
+    fingerprint = file_fingerprint(filepath)
+    fingerprint.update(version=CACHE_VERSION, names=list(columns), usecols=list(usecols),
+                       hash=content_hash(filepath))
+    write_json(fingerprint_path, fingerprint)
+
+
+def file_fingerprint(filepath: str) -> Dict[str, object]:
+    """Return a mapping of the absolute path, the size (in bytes) and the modification
+    time (in nanoseconds) of the file at filepath.
+    """
+    stat = os.stat(filepath)
+
+    return {'path': os.path.abspath(filepath), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns}
+
+
+def content_hash(filepath: str) -> str:
+    """Return the BLAKE2b hash of the content of the file at filepath, as a hex string."""
+    digest = hashlib.blake2b()
+
+    with open(filepath, 'rb') as file:
+        block = file.read(CHUNK_SIZE)
+        while block != b'':
+            digest.update(block)
+            block = file.read(CHUNK_SIZE)
+
+    return digest.hexdigest()
+
+
+def write_json(path: str, data: Dict[str, object]) -> None:
+    """Atomically replace the file at path with data encoded as JSON. The temporary file
+    is named after this process, so processes loading stations that share a file do not
+    write to the same temporary file."""
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary_path, path)
+
+
+def load_columns(filepath: Source, usecols: Tuple[int, ...], dtype: list,
+                 workers: int = 1) -> np.ndarray:
+    """Return a structured array of the given columns of the CSV file at filepath.
+
+    The header row is skipped and empty fields are read as NaN. dtype is a list of
+    (name, type) pairs, one for each column index in usecols. The file is split
+    into chunks of about CHUNK_SIZE bytes at line boundaries, so only one chunk of
+    text is held in memory per worker. With more than one worker, the chunks are
+    parsed in a pool of that many processes and joined back in file order.
+
+    A compressed file or a file-like object cannot be split at offsets, so it is
+    decompressed by a thread into chunks of whole lines (see load_stream_columns),
+    while the chunks read so far are parsed.
+
+    Preconditions:
+        - len(usecols) == len(dtype)
+        - workers >= 1
+    """
+    if not isinstance(filepath, str) or source_compression(filepath) is not None:
+        return load_stream_columns(filepath, usecols, dtype, workers)
+
+    offsets = chunk_offsets(filepath, CHUNK_SIZE)
+    starts, stops = offsets[:-1], offsets[1:]
+    n_chunks = len(starts)
+
+    if workers == 1 or n_chunks <= 1:
+        blocks = [parse_chunk(filepath, start, stop, usecols, dtype)
+                  for start, stop in zip(starts, stops)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(parse_chunk, [filepath] * n_chunks, starts, stops,
+                                       [usecols] * n_chunks, [dtype] * n_chunks))
+
+    if blocks == []:
+        return np.empty(0, dtype=dtype)
+
+    return np.concatenate(blocks)
+
+
+def load_stream_columns(filepath: Source, usecols: Tuple[int, ...], dtype: list,
+                        workers: int = 1) -> np.ndarray:
+    """Return the same structured array as load_columns, streaming the CSV file at
+    filepath through open_source in chunks of about STREAM_CHUNK_SIZE bytes.
+
+    A thread decompresses the chunks at most READ_AHEAD chunks ahead of the parser. With
+    more than one worker, at most two chunks per worker are being parsed at once, so the
+    memory used stays bounded however large the file is.
+
+    Preconditions:
+        - len(usecols) == len(dtype)
+        - workers >= 1
+    """
+    with open_source(filepath) as (stream, _):
+        chunks = read_ahead(stream_chunks(stream, STREAM_CHUNK_SIZE))
+
+        if workers == 1:
+            blocks = [parse_text(chunk, usecols, dtype) for chunk in chunks]
+        else:
+            # ACCUMULATOR: Keep track of the blocks parsed so far, and of the chunks
+            # being parsed, in file order
+            blocks = []
+            pending = collections.deque()
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                for chunk in chunks:
+                    pending.append(executor.submit(parse_text, chunk, usecols, dtype))
+                    if len(pending) > 2 * workers:
+                        blocks.append(pending.popleft().result())
+                blocks.extend(future.result() for future in pending)
+
+    if blocks == []:
+        return np.empty(0, dtype=dtype)
+
+    return np.concatenate(blocks)
+
+
+@contextlib.contextmanager
+def open_source(filepath: Source) -> Iterator[Tuple[BinaryIO, Optional[str]]]:
+    """Open the CSV file at filepath, or the binary file-like object filepath, and yield a
+    binary stream of its decompressed content and the name of its compression in
+    COMPRESSIONS, or None if it is not compressed.
+
+    The compression is recognized from the first bytes of the file. The stream is
+    decompressed as it is read, so no decompressed copy of the file is made. A
+    file-like object is not closed, and if it can neither peek nor seek, it is read as
+    uncompressed. zstd needs the zstandard package.
+
+    >>> with open_source(io.BytesIO(gzip.compress(b'date,avg_temperature\\n'))) as source:
+    ...     source[0].read(), source[1]
+    (b'date,avg_temperature\\n', 'gzip')
+    """
+    with contextlib.ExitStack() as stack:
+        if isinstance(filepath, str):
+            file = stack.enter_context(open(filepath, 'rb'))
+        else:
+            file = filepath
+        compression = detect_compression(file)
+
+        if compression == 'gzip':
+            stream = stack.enter_context(gzip.GzipFile(fileobj=file, mode='rb'))
+        elif compression == 'bz2':
+            stream = stack.enter_context(bz2.BZ2File(file, mode='rb'))
+        elif compression == 'xz':
+            stream = stack.enter_context(lzma.LZMAFile(file, mode='rb'))
+        elif compression == 'zstd':
+            # zstandard is only needed, and so only imported, to read zstd files
+            import zstandard
+            stream = stack.enter_context(
+                zstandard.ZstdDecompressor().stream_reader(file, closefd=False))
+        else:
+            stream = file
+
+        yield (stream, compression)
+
+
+def detect_compression(file: BinaryIO) -> Optional[str]:
+    """Return the name of the compression in COMPRESSIONS of the content of file from its
+    current position, or None if it is not compressed, without consuming any of it.
+    """
+    if hasattr(file, 'peek'):
+        head = file.peek(8)[:8]
+    elif file.seekable():
+        position = file.tell()
+        head = file.read(8)
+        file.seek(position)
+    else:
+        return None
+
+    for magic, compression in COMPRESSIONS.items():
+        if head.startswith(magic):
+            return compression
+
+    return None
+
+
+def source_compression(filepath: str) -> Optional[str]:
+    """Return the name of the compression in COMPRESSIONS of the file at filepath, or None
+    if it is not compressed."""
+    with open(filepath, 'rb') as file:
+        return detect_compression(file)
+
+
+def source_name(filepath: Source) -> str:
+    """Return filepath if it is a path, or the name of the file-like object filepath."""
+    if isinstance(filepath, str):
+        return filepath
+
+    return str(getattr(filepath, 'name', '<stream>'))
+
+
+def read_line(stream: BinaryIO) -> bytes:
+    """Return the next line of stream, read in small blocks, since not every decompressing
+    stream supports readline. The bytes read past the end of the line are lost.
+    """
+    # ACCUMULATOR: Keep track of the blocks of the line read so far
+    blocks_so_far = [stream.read(2 ** 12)]
+    while b'\n' not in blocks_so_far[-1] and blocks_so_far[-1] != b'':
+        blocks_so_far.append(stream.read(2 ** 12))
+    line = b''.join(blocks_so_far)
+
+    return line[:line.find(b'\n') + 1] if b'\n' in line else line
+
+
+def stream_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    """Yield the data rows of the CSV content of stream, after its header row, in chunks
+    of whole lines of about chunk_size bytes. Only one chunk and the start of the next
+    line are held in memory at once.
+
+    >>> list(stream_chunks(io.BytesIO(b'date,temp\\n2020-12-11,3.1\\n2020-12-10,1.4'), 16))
+    [b'2020-12-11,3.1\\n', b'2020-12-10,1.4']
+
+    Preconditions:
+        - chunk_size > 0
+    """
+    # ACCUMULATOR: Keep track of the bytes read after the last whole line so far,
+    # and of whether the header row was skipped
+    rest = b''
+    in_header = True
+
+    block = stream.read(chunk_size)
+    while block != b'':
+        data = rest + block
+        if in_header and b'\n' in data:
+            # Skip header row
+            data = data[data.find(b'\n') + 1:]
+            in_header = False
+
+        end = 0 if in_header else data.rfind(b'\n') + 1
+        if end > 0:
+            yield data[:end]
+        rest = data[end:]
+        block = stream.read(chunk_size)
+
+    if not in_header and rest.strip() != b'':
+        yield rest
+
+
+def read_ahead(items: Iterator[bytes], depth: int = READ_AHEAD) -> Iterator[bytes]:
+    """Yield the items of the given iterator, computed by a thread up to depth items
+    ahead, so that computing the next items (such as decompressing them, which releases
+    the GIL) overlaps with processing the items yielded. An exception raised by the
+    iterator is raised again here.
+
+    >>> list(read_ahead(iter([b'a', b'b', b'c'])))
+    [b'a', b'b', b'c']
+
+    Preconditions:
+        - depth > 0
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    thread = threading.Thread(target=produce_items, args=(items, buffer, stopped), daemon=True)
+    thread.start()
+
+    try:
+        item, error = buffer.get()
+        while item is not None:
+            yield item
+            item, error = buffer.get()
+        if error is not None:
+            raise error
+    finally:
+        # Stop the thread if the items are not all consumed, before the stream is closed
+        stopped.set()
+        thread.join()
+
+
+def produce_items(items: Iterator[bytes], buffer: queue.Queue, stopped: threading.Event) -> None:
+    """Put each item of items in buffer, with None as the error, then None with the
+    exception raised by items, if any, unless stopped is set first. This is the thread
+    of read_ahead.
+    """
+    try:
+        for item in items:
+            if not offer(buffer, (item, None), stopped):
+                return
+        offer(buffer, (None, None), stopped)
+    except Exception as error:
+        offer(buffer, (None, error), stopped)
+
+
+def offer(buffer: queue.Queue, entry: tuple, stopped: threading.Event) -> bool:
+    """Put entry in buffer once it has room, and return True, or return False if stopped
+    is set first."""
+    while not stopped.is_set():
+        try:
+            buffer.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+
+    return False
+
+
+def chunk_offsets(filepath: str, chunk_size: int) -> List[int]:
+    """Return the byte offsets splitting the data rows of the CSV file at filepath
+    into chunks of about chunk_size bytes.
+
+    The first offset is the start of the first row after the header and the last
+    offset is the end of the file. Every other offset is the start of a line.
+
+    Preconditions:
+        - chunk_size > 0
+    """
+    with open(filepath, 'rb') as file:
+        # Skip header row
+        file.readline()
+        offsets_so_far = [file.tell()]
+        size = os.fstat(file.fileno()).st_size
+
+        while offsets_so_far[-1] < size:
+            # Move to the end of the line containing the next target offset
+            file.seek(offsets_so_far[-1] + chunk_size)
+            file.readline()
+            offsets_so_far.append(min(file.tell(), size))
+
+    return offsets_so_far
+
+
+def parse_chunk(filepath: str, start: int, stop: int, usecols: Tuple[int, ...],
+                dtype: list) -> np.ndarray:
+    """Return a structured array of the given columns of the rows between the byte
+    offsets start and stop of the CSV file at filepath.
+
+    Empty fields are read as NaN. This is the unit of work of load_columns.
+
+    Preconditions:
+        - start and stop are offsets returned by chunk_offsets
+        - len(usecols) == len(dtype)
+    """
+    with open(filepath, 'rb') as file:
+        file.seek(start)
+        data = file.read(stop - start)
+
+    return parse_text(data, usecols, dtype)
+
+
+def parse_text(data: bytes, usecols: Tuple[int, ...], dtype: list) -> np.ndarray:
+    """Return a structured array of the given columns of the CSV rows in data.
+
+    Empty fields are read as NaN. This is the unit of work of load_stream_columns.
+
+    >>> parse_text(b'2020-12-11,3.1,\\n2020-12-10,,\\n', (0, 1), [('date', 'M8[D]'),
+    ...                                                           ('avg_temp', 'f8')]).tolist()
+    [(datetime.date(2020, 12, 11), 3.1), (datetime.date(2020, 12, 10), nan)]
+
+    Preconditions:
+        - len(usecols) == len(dtype)
+    """
+    text = data.decode().replace('\r\n', '\n')
+
+    return np.loadtxt(io.StringIO(fill_empty_fields(text)), delimiter=',', usecols=usecols,
+                      dtype=dtype, ndmin=1)
+
+
+def fill_empty_fields(text: str) -> str:
+    """Return the given CSV text with every empty field replaced by 'nan'.
+
+    >>> fill_empty_fields('2020-12-11,,\\n2020-12-10,1.4,')
+    '2020-12-11,nan,nan\\n2020-12-10,1.4,nan'
+    """
+    # Two passes, since str.replace does not see overlapping matches like ',,,'
+    text = text.replace(',,', ',nan,').replace(',,', ',nan,')
+    text = text.replace(',\n', ',nan\n')
+
+    if text.endswith(','):
+        text += 'nan'
+
+    return text
+
+
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def read_mmap_table1(filepath: str) -> TorontoAtmosphereTable:
+    """Return the same TorontoAtmosphereTable as read_csv_table1, tokenized straight
+    from a memory map of the CSV file: toronto_atmospheres.csv.
+
+    No Python string is created per line or per field. The file is processed in
+    blocks of about MMAP_BLOCK_SIZE bytes, so the memory used besides the returned
+    columns stays bounded however large the file is.
 
     Preconditions:
         - filepath == 'toronto_atmospheres.csv'
         - toronto_atmospheres.csv is not empty
     """
-    with open(filepath) as file:
-        reader = csv.reader(file)
+    columns = mmap_columns(filepath, {name: column for column, name in
+                                      enumerate(ATMOSPHERE_COLUMNS) if column > 0},
+                           date_column=0, with_time=True)
+    columns['timestamps'] = columns.pop('dates')
+
+    return sort_by_time(TorontoAtmosphereTable(**columns))
 
-        # Skip header row
-        next(reader)
 
-        # ACCUMULATOR: Keep track of the rows in the data
-        # converted to TorontoAtmosphere dataclasses so far
-        data_so_far = []
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def read_mmap_table2(filepath: str, start: Optional[datetime.date] = None,
+                     end: Optional[datetime.date] = None) -> TorontoTemperatureTable:
+    """Return the same TorontoTemperatureTable as read_csv_table2, tokenized straight
+    from a memory map of the CSV file: weatherstats_toronto_daily.csv.
 
-        for row in reader:
-            data_so_far.append(csv_to_dataclass1(row))
+    If start or end is given, only the days from start to end (inclusive) are
+    returned. The file must then be sorted by date, in either direction: the
+    rows in the range are found by binary search over the byte offsets of the
+    file, and only those rows are tokenized.
 
-    return data_so_far
+    Preconditions:
+        - filepath == 'weatherstats_toronto_daily.csv'
+        - weatherstats_toronto_daily.csv is not empty
+        - start is None or end is None or start <= end
+    """
+    date_range = None
+    if start is not None or end is not None:
+        date_range = (np.datetime64(start or datetime.date.min, 'D'),
+                      np.datetime64(end or datetime.date.max, 'D'))
+
+    columns = mmap_columns(filepath, {'avg_temps': 1}, date_column=0, date_range=date_range,
+                           required='avg_temps')
+
+    return TorontoTemperatureTable(**columns)
+
+
+def mmap_columns(filepath: str, numeric_columns: Dict[str, int], date_column: Optional[int] = None,
+                 date_range: Optional[Tuple[np.datetime64, np.datetime64]] = None,
+                 required: Optional[str] = None, with_time: bool = False) \
+        -> Dict[str, np.ndarray]:
+    """Return a mapping of names to float64 arrays of the given numeric columns of the
+    CSV file at filepath, tokenized from a memory map of the file.
+
+    numeric_columns maps each name to its column index. Empty fields are read as NaN.
+    If date_column is given, the mapping also has 'dates', a datetime64[D] array of
+    that column, which must hold ISO dates. If date_range is also given, only the
+    rows with dates from date_range[0] to date_range[1] (inclusive) are returned,
+    and they are found by binary search, so the file must be sorted by date.
+    If required is given, the rows where that numeric column is empty are skipped.
+    If with_time is True, 'dates' is instead a datetime64[m] array of the timestamps
+    in the date column, as read by parse_timestamps.
+
+    The lines are counted first so that every column is filled in place, block by
+    block, instead of being joined from copies at the end.
+
+    Preconditions:
+        - the file at filepath is not empty
+        - date_range is None or date_column is not None
+    """
+    with open(filepath, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+        buffer = np.frombuffer(memory, dtype=np.uint8)
+        try:
+            # Skip header row
+            begin = line_end(memory, 0, len(memory))
+            end = len(memory)
+            if date_range is not None:
+                begin, end = search_date_range(memory, buffer, begin, end, date_column,
+                                               date_range)
+
+            # Split the rows into blocks of whole lines and bound the number of lines
+            block_offsets = line_blocks(memory, begin, end)
+            n_lines = sum(int(np.count_nonzero(buffer[start:stop] == ord('\n'))) + 1
+                          for start, stop in zip(block_offsets[:-1], block_offsets[1:]))
+
+            columns = {name: np.empty(n_lines, dtype=np.float64) for name in numeric_columns}
+            if date_column is not None:
+                columns['dates'] = np.empty(n_lines, dtype='datetime64[m]' if with_time
+                                            else 'datetime64[D]')
+            parse = parse_timestamps if with_time else parse_dates
+
+            # ACCUMULATOR: Keep track of the number of rows filled in so far
+            filled_so_far = 0
+
+            for start, stop in zip(block_offsets[:-1], block_offsets[1:]):
+                starts, ends = line_bounds(buffer, start, stop)
+                commas = line_commas(buffer, starts, ends)
+
+                if required is not None:
+                    # Check that the required field exists
+                    # Else, skip and don't keep the row
+                    field_starts, field_ends = field_bounds(starts, ends, commas,
+                                                            numeric_columns[required])
+                    present = field_ends > field_starts
+                    starts, ends = starts[present], ends[present]
+                    commas = line_commas(buffer, starts, ends)
+
+                rows = slice(filled_so_far, filled_so_far + len(starts))
+
+                for name, column in numeric_columns.items():
+                    columns[name][rows] = parse_numbers(buffer,
+                                                        *field_bounds(starts, ends, commas, column))
+                if date_column is not None:
+                    columns['dates'][rows] = parse(buffer, *field_bounds(starts, ends, commas,
+                                                                         date_column))
+                filled_so_far += len(starts)
+        finally:
+            # Release the view of the memory map so that it can be closed, even if
+            # parsing failed
+            del buffer
+
+    return {name: column[:filled_so_far] for name, column in columns.items()}
+
+
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def validate_table1(filepath: Source, usecols: Tuple[int, ...] = ATMOSPHERE_USECOLS,
+                    ranges: Optional[Dict[str, Tuple[float, float]]] = None) \
+        -> Tuple[TorontoAtmosphereTable, QuarantineReport]:
+    """Return a TorontoAtmosphereTable of the valid rows of the CSV file:
+    toronto_atmospheres.csv, sorted by time, and the report of the rows it rejected.
+
+    A row is rejected if its timestamp is not valid, if one of its readings is not a
+    number, or if a reading lies outside its range in ranges, a mapping of columns
+    of the table to open ranges (ATMOSPHERE_RANGES by default). A reading with a range
+    is also rejected if it is empty. The other readings, such as oxidants and
+    ozone_8hr by default, may be empty and are NaN, as for read_csv_table1. The checks
+    are made on whole columns of each block of the file at once, as in
+    read_mmap_table1, so the valid rows are read as fast as by read_mmap_table1. usecols
+    is the same as for read_csv_table1, and filepath may also be compressed or a
+    file-like object, as for read_csv_table1.
+
+    Preconditions:
+        - filepath == 'toronto_atmospheres.csv' or usecols describes the columns of filepath
+        - the file at filepath is not empty
+        - len(usecols) == len(ATMOSPHERE_COLUMNS)
+    """
+    columns, report = validated_columns(filepath, dict(zip(ATMOSPHERE_COLUMNS[1:], usecols[1:])),
+                                        usecols[0], ATMOSPHERE_RANGES if ranges is None
+                                        else ranges, with_time=True)
+    columns['timestamps'] = columns.pop('dates')
+
+    return (sort_by_time(TorontoAtmosphereTable(**columns)), report)
+
+
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def validate_table2(filepath: Source, usecols: Tuple[int, ...] = DAILY_USECOLS,
+                    ranges: Optional[Dict[str, Tuple[float, float]]] = None) \
+        -> Tuple[TorontoTemperatureTable, QuarantineReport]:
+    """Return a TorontoTemperatureTable of the valid rows of the CSV file:
+    weatherstats_toronto_daily.csv, and the report of the rows it rejected.
+
+    Like read_csv_table2, rows with an empty temperature are skipped without being
+    reported. Rows too short to have a temperature are rejected, and the other rows are
+    checked as by validate_table1, with DAILY_RANGES as the default ranges. filepath and
+    usecols are the same as for read_csv_table2.
+
+    >>> table, report = validate_table2('weatherstats_toronto_daily.csv')
+    >>> len(table.dates), report.valid_rows, len(report.line_numbers)
+    (29493, 29493, 0)
+    >>> rows = b'date,avg\\n2020-12-09,3.1\\n2020-12-08,,\\n2020-12-07\\n2020-12-06,4.0\\n'
+    >>> table, report = validate_table2(io.BytesIO(rows))
+    >>> table.avg_temps.tolist(), report.line_numbers.tolist(), report.reasons
+    ([3.1, 4.0], [4], ['missing field'])
+
+    Preconditions:
+        - filepath == 'weatherstats_toronto_daily.csv' or usecols describes the columns
+          of filepath
+        - the file at filepath is not empty
+        - len(usecols) == len(DAILY_COLUMNS)
+    """
+    columns, report = validated_columns(filepath, {'avg_temps': usecols[1]}, usecols[0],
+                                        DAILY_RANGES if ranges is None else ranges,
+                                        required='avg_temps')
+
+    return (TorontoTemperatureTable(**columns), report)
+
+
+def validated_columns(filepath: Source, numeric_columns: Dict[str, int], date_column: int,
+                      ranges: Dict[str, Tuple[float, float]], required: Optional[str] = None,
+                      with_time: bool = False) -> Tuple[Dict[str, np.ndarray], QuarantineReport]:
+    """Return the same mapping of columns as mmap_columns for the rows of the CSV file at
+    filepath that pass every check, and the report of the other rows.
+
+    A row fails if its date column is not a valid date (or timestamp, if with_time is
+    True), if one of its numeric columns is not a number, if a column in ranges is empty
+    or the line is too short to have the required column, or if it lies outside its
+    range in ranges. Rows where the required column is empty are skipped. Line numbers
+    are only computed for the blocks with failing rows.
+    An uncompressed file at a path is memory-mapped. Otherwise, filepath is streamed
+    through open_source, in blocks of about MMAP_BLOCK_SIZE bytes.
+
+    Preconditions:
+        - the file at filepath is not empty
+        - all(name in numeric_columns for name in ranges)
+    """
+    names = ['dates'] + list(numeric_columns)
+    dtypes = dict.fromkeys(numeric_columns, np.float64)
+    dtypes['dates'] = 'datetime64[m]' if with_time else 'datetime64[D]'
+    rejected = {'line_numbers': [], 'columns': [], 'reasons': [], 'lines': []}
+    arguments = (numeric_columns, date_column, ranges, required, with_time)
+
+    if isinstance(filepath, str) and source_compression(filepath) is None:
+        with open(filepath, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+            buffer = np.frombuffer(memory, dtype=np.uint8)
+            block_offsets = line_blocks(memory, line_end(memory, 0, len(memory)), len(memory))
+            newline_counts = [int(np.count_nonzero(buffer[start:stop] == ord('\n')))
+                              for start, stop in zip(block_offsets[:-1], block_offsets[1:])]
+            n_lines = sum(newline_counts) + len(newline_counts)
+            columns = {name: np.empty(n_lines, dtype=dtypes[name]) for name in names}
+
+            # ACCUMULATOR: Keep track of the number of rows filled in so far, and of the
+            # number of lines before the current block (the header is line 1)
+            filled_so_far = 0
+            lines_before = 1
+
+            for i in range(0, len(newline_counts)):
+                block = validate_block(buffer, block_offsets[i], block_offsets[i + 1],
+                                       lines_before, rejected, *arguments)
+                rows = slice(filled_so_far, filled_so_far + len(block['dates']))
+                for name in names:
+                    columns[name][rows] = block[name]
+                filled_so_far = rows.stop
+                lines_before += newline_counts[i]
+
+            # Release the view of the memory map so that it can be closed
+            del buffer
+        columns = {name: column[:filled_so_far] for name, column in columns.items()}
+    else:
+        with open_source(filepath) as (stream, _):
+            # ACCUMULATOR: Keep track of the columns of the valid rows of each block so
+            # far, and of the number of lines before the current block
+            blocks_so_far = {name: [np.empty(0, dtype=dtypes[name])] for name in names}
+            lines_before = 1
+
+            for chunk in read_ahead(stream_chunks(stream, MMAP_BLOCK_SIZE)):
+                block = validate_block(np.frombuffer(chunk, dtype=np.uint8), 0, len(chunk),
+                                       lines_before, rejected, *arguments)
+                for name in names:
+                    blocks_so_far[name].append(block[name])
+                lines_before += chunk.count(b'\n')
+        columns = {name: np.concatenate(blocks) for name, blocks in blocks_so_far.items()}
+
+    report = QuarantineReport(source_name(filepath), len(columns['dates']),
+                              np.concatenate(rejected['line_numbers'] + [np.zeros(0, np.int64)]),
+                              rejected['columns'], rejected['reasons'], rejected['lines'])
+
+    return (columns, report)
+
+
+def validate_block(buffer: np.ndarray, start: int, stop: int, lines_before: int,
+                   rejected: Dict[str, list], numeric_columns: Dict[str, int], date_column: int,
+                   ranges: Dict[str, Tuple[float, float]], required: Optional[str],
+                   with_time: bool) -> Dict[str, np.ndarray]:
+    """Return a mapping of 'dates' and the names of numeric_columns to the values of the
+    rows between the offsets start and stop of buffer that pass every check of
+    validated_columns, and append the line numbers, failing columns, reasons and text of
+    the other rows to the lists of rejected.
+
+    lines_before is the number of lines of the file before start. The other arguments
+    are the same as for validated_columns.
+
+    Preconditions:
+        - start and stop are offsets of the start of a line or of the end of buffer
+    """
+    names = ['dates'] + list(numeric_columns)
+    parse = parse_timestamps_checked if with_time else parse_dates_checked
+    starts, ends = line_bounds(buffer, start, stop)
+    commas = line_commas(buffer, starts, ends)
+
+    if required is not None:
+        # Check that the required field exists
+        # Else, skip and don't keep the row, unless the row is too short to have
+        # the field, so that it is rejected as missing below
+        field_starts, field_ends = field_bounds(starts, ends, commas, numeric_columns[required])
+        present = (field_ends > field_starts) | (commas[2] < numeric_columns[required])
+        starts, ends = starts[present], ends[present]
+        commas = line_commas(buffer, starts, ends)
+
+    # The index in names of the first column failing a check, and the index in
+    # QUARANTINE_REASONS of that check, or -1 if every check passed so far
+    failed_columns = np.full(len(starts), -1)
+    failed_reasons = np.full(len(starts), -1)
+    block = {}
+
+    block['dates'], valid = parse(buffer, *field_bounds(starts, ends, commas, date_column))
+    record_failures(~valid, 0, 0, failed_columns, failed_reasons)
+    for k, (name, column) in enumerate(numeric_columns.items(), start=1):
+        block[name], valid = parse_numbers_checked(buffer,
+                                                   *field_bounds(starts, ends, commas, column))
+        record_failures(~valid, k, 1, failed_columns, failed_reasons)
+        if name in ranges or name == required:
+            # The field is empty or the line is too short to have it
+            record_failures(np.isnan(block[name]), k, 2, failed_columns, failed_reasons)
+        if name in ranges:
+            lower, upper = ranges[name]
+            outside = ~((block[name] > lower) & (block[name] < upper))
+            record_failures(outside, k, 3, failed_columns, failed_reasons)
+
+    failed = np.flatnonzero(failed_columns != -1)
+    if len(failed) > 0:
+        newlines = np.flatnonzero(buffer[start:stop] == ord('\n')) + start
+        rejected['line_numbers'].append(lines_before + 1
+                                        + np.searchsorted(newlines, starts[failed]))
+        rejected['columns'].extend(names[k] for k in failed_columns[failed].tolist())
+        rejected['reasons'].extend(QUARANTINE_REASONS[k] for k in failed_reasons[failed].tolist())
+        rejected['lines'].extend(buffer[starts[k]:ends[k]].tobytes().decode(errors='replace')
+                                 for k in failed.tolist())
+
+    passed = failed_columns == -1
+
+    return {name: block[name][passed] for name in names}
+
+
+def record_failures(failing: np.ndarray, column: int, reason: int, failed_columns: np.ndarray,
+                    failed_reasons: np.ndarray) -> None:
+    """Record in failed_columns and failed_reasons that the rows where failing is True
+    failed the check with the given index in QUARANTINE_REASONS in the column with the
+    given index, unless they already failed an earlier check."""
+    first = failing & (failed_columns == -1)
+    failed_columns[first] = column
+    failed_reasons[first] = reason
+
+
+def format_quarantine(report: QuarantineReport, limit: int = 10) -> str:
+    """Return a summary of the report: the numbers of valid and rejected rows, and the
+    first limit rejected rows with their line numbers and why they were rejected.
+
+    >>> report = QuarantineReport('daily.csv', 2, np.array([3]), ['avg_temps'],
+    ...                           ['not a number'], ['2020-12-10,abc,'])
+    >>> print(format_quarantine(report))
+    daily.csv: 2 valid rows, 1 quarantined
+      line 3: avg_temps not a number: 2020-12-10,abc,
+    """
+    lines = [f'{report.filepath}: {report.valid_rows} valid rows, '
+             f'{len(report.line_numbers)} quarantined']
+    lines.extend(f'  line {report.line_numbers[i]}: {report.columns[i]} {report.reasons[i]}: '
+                 f'{report.lines[i]}' for i in range(min(limit, len(report.line_numbers))))
+    if len(report.line_numbers) > limit:
+        lines.append(f'  ... and {len(report.line_numbers) - limit} more')
+
+    return '\n'.join(lines)
+
+
+def write_quarantine(report: QuarantineReport, path: str) -> None:
+    """Write the rejected rows of the report to a CSV file at path, with their line
+    numbers, the column and the check they failed, and their text."""
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['line', 'column', 'reason', 'text'])
+        writer.writerows(zip(report.line_numbers.tolist(), report.columns, report.reasons,
+                             report.lines))
+
+
+def line_blocks(memory: mmap.mmap, begin: int, end: int) -> List[int]:
+    """Return the offsets splitting the lines between the offsets begin and end of memory
+    into blocks of about MMAP_BLOCK_SIZE bytes of whole lines.
+
+    Preconditions:
+        - begin is the offset of the start of a line
+    """
+    offsets_so_far = [begin]
+    while offsets_so_far[-1] < end:
+        offsets_so_far.append(line_end(memory,
+                                       min(offsets_so_far[-1] + MMAP_BLOCK_SIZE, end) - 1, end))
+
+    return offsets_so_far
+
+
+def line_end(memory: mmap.mmap, offset: int, end: int) -> int:
+    """Return the offset just past the newline ending the line containing offset,
+    or end if that line is not ended before end.
+    """
+    newline = memory.find(b'\n', offset, end)
+
+    return end if newline == -1 else newline + 1
+
+
+def line_bounds(buffer: np.ndarray, begin: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the start offsets and the end offsets (excluding the line terminator)
+    of the non-empty lines between the offsets begin and stop of buffer.
+
+    Preconditions:
+        - begin is the offset of the start of a line
+    """
+    newlines = np.flatnonzero(buffer[begin:stop] == ord('\n')) + begin
+    starts = np.concatenate(([begin], newlines + 1))
+    ends = np.concatenate((newlines, [stop]))
+
+    # Exclude the carriage return of Windows line endings
+    carriage = (ends > starts) & (buffer[np.maximum(ends - 1, 0)] == ord('\r'))
+    ends = ends - carriage
+    keep = ends > starts
+
+    return (starts[keep], ends[keep])
+
+
+def line_commas(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the offsets of the commas in the lines with the given start and end
+    offsets in buffer, the index of the first comma of each line in those offsets,
+    and the number of commas in each line.
+
+    The offsets are padded at the end so that field_bounds can index past the last
+    comma of a line safely.
+    """
+    if len(starts) == 0:
+        return (np.zeros(0, dtype=np.int64), starts, starts)
+
+    commas = np.flatnonzero(buffer[starts[0]:ends[-1]] == ord(',')) + starts[0]
+    first_commas = np.searchsorted(commas, starts)
+    comma_counts = np.searchsorted(commas, ends) - first_commas
+
+    return (np.concatenate((commas, np.zeros(MAX_COLUMNS + 1, dtype=commas.dtype))),
+            first_commas, comma_counts)
+
+
+def field_bounds(starts: np.ndarray, ends: np.ndarray,
+                 commas: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                 column: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the start and end offsets of the field at the given column index of each
+    line with the given start and end offsets. commas is returned by line_commas for
+    the same lines.
+
+    Lines with too few fields get an empty field.
+
+    Preconditions:
+        - 0 <= column <= MAX_COLUMNS
+    """
+    offsets, first_commas, comma_counts = commas
+
+    if column == 0:
+        field_starts = starts
+    else:
+        field_starts = np.where(comma_counts >= column, offsets[first_commas + column - 1] + 1,
+                                ends)
+
+    field_ends = np.where(comma_counts > column, offsets[first_commas + column], ends)
+
+    return (field_starts, field_ends)
+
+
+def gather_bytes(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return a 2-D uint8 array whose column i holds the bytes of buffer from starts[i]
+    to ends[i], padded with zeros to the length of the longest field.
+
+    Row j holds the j-th byte of every field, so that the parsers can work on
+    one contiguous row at a time.
+    """
+    width = int(np.max(ends - starts, initial=0))
+    positions = starts + np.arange(width)[:, np.newaxis]
+    chars = np.take(buffer, positions, mode='clip')
+    chars[positions >= ends] = 0
+
+    return chars
+
+
+def parse_numbers(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return a float64 array of the decimal numbers in buffer between each pair of
+    start and end offsets. Empty fields are read as NaN.
+
+    Numbers made of an optional sign, at most 15 digits and at most one decimal point
+    are converted with integer arithmetic on the bytes. The result is exactly
+    float() of the field, since the digits form an exact integer that is divided
+    once by an exact power of ten. Any other field is converted with float().
+
+    Raise ValueError if a field is not a number.
+
+    >>> text = np.frombuffer(b'3.1,-10.9,,0.25,1e3', dtype=np.uint8)
+    >>> parse_numbers(text, np.array([0, 4, 10, 11, 16]), np.array([3, 9, 10, 15, 19])).tolist()
+    [3.1, -10.9, nan, 0.25, 1000.0]
+    """
+    values, valid = parse_numbers_checked(buffer, starts, ends)
+
+    if not np.all(valid):
+        i = int(np.argmin(valid))
+        raise ValueError(f'Invalid number {buffer[starts[i]:ends[i]].tobytes()!r} '
+                         f'at byte offset {starts[i]}')
+
+    return values
+
+
+def parse_numbers_checked(buffer: np.ndarray, starts: np.ndarray,
+                          ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the same float64 array as parse_numbers, with NaN for the fields that are not
+    numbers, and a boolean array of whether each field is empty or a number.
+
+    >>> text = np.frombuffer(b'3.1,abc,-', dtype=np.uint8)
+    >>> values, valid = parse_numbers_checked(text, np.array([0, 4, 8]), np.array([3, 7, 9]))
+    >>> values.tolist(), valid.tolist()
+    ([3.1, nan, nan], [True, False, False])
+    """
+    chars = gather_bytes(buffer, starts, ends)
+    n = len(starts)
+
+    # ACCUMULATOR: Keep track of the digits of each number as one integer so far,
+    # of how many digits come after its decimal point, and of whether it is not simple
+    mantissas = np.zeros(n, dtype=np.int64)
+    decimals = np.zeros(n, dtype=np.int64)
+    n_digits = np.zeros(n, dtype=np.int64)
+    after_point = np.zeros(n, dtype=bool)
+    not_simple = np.zeros(n, dtype=bool)
+
+    for j in range(0, len(chars)):
+        values = chars[j].astype(np.int64) - ord('0')
+        digits = (values >= 0) & (values <= 9)
+        points = chars[j] == ord('.')
+        allowed = digits | points | (chars[j] == 0)
+        if j == 0:
+            # Only the first byte can be a sign
+            allowed |= (chars[j] == ord('-')) | (chars[j] == ord('+'))
+
+        mantissas = np.where(digits, mantissas * 10 + values, mantissas)
+        decimals += digits & after_point
+        n_digits += digits
+        not_simple |= (points & after_point) | ~allowed
+        after_point |= points
+
+    negative = chars[0] == ord('-') if len(chars) > 0 else np.zeros(n, dtype=bool)
+
+    values = mantissas / 10.0 ** decimals
+    values[negative] *= -1
+    values[ends == starts] = np.nan
+    valid = np.ones(n, dtype=bool)
+
+    for i in np.flatnonzero((not_simple | (n_digits == 0) | (n_digits > 15)) & (ends > starts)):
+        try:
+            values[i] = float(buffer[starts[i]:ends[i]].tobytes())
+        except ValueError:
+            values[i] = np.nan
+            valid[i] = False
+
+    return (values, valid)
+
+
+def parse_dates(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return a datetime64[D] array of the ISO dates (YYYY-MM-DD) in buffer at each
+    pair of start and end offsets. Anything after the date in a field, such as a
+    time, is ignored.
+
+    The day numbers are computed with integer arithmetic on the digits, using the
+    days-from-civil algorithm of Howard Hinnant. Raise ValueError if a field does
+    not start with a valid date.
+
+    >>> text = np.frombuffer(b'2020-12-11,1940-01-01 0:00,2000-02-29', dtype=np.uint8)
+    >>> parse_dates(text, np.array([0, 11, 27]), np.array([10, 26, 37])).tolist()
+    [datetime.date(2020, 12, 11), datetime.date(1940, 1, 1), datetime.date(2000, 2, 29)]
+    """
+    dates, valid = parse_dates_checked(buffer, starts, ends)
+
+    if not np.all(valid):
+        i = int(np.argmin(valid))
+        raise ValueError(f'Invalid date {buffer[starts[i]:ends[i]].tobytes()!r} '
+                         f'at byte offset {starts[i]}')
+
+    return dates
+
+
+def parse_dates_checked(buffer: np.ndarray, starts: np.ndarray,
+                        ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the same datetime64[D] array as parse_dates, with NaT for the fields that do
+    not start with a valid date, and a boolean array of whether each field does.
+
+    >>> text = np.frombuffer(b'2020-02-30,2020-12-1', dtype=np.uint8)
+    >>> dates, valid = parse_dates_checked(text, np.array([0, 11]), np.array([10, 20]))
+    >>> dates.astype(str).tolist(), valid.tolist()
+    (['NaT', 'NaT'], [False, False])
+    """
+    # Fields too short to hold a date are invalid, and their bytes past the end of
+    # buffer are clipped rather than read
+    digits = [np.take(buffer, starts + k, mode='clip').astype(np.int32) - ord('0')
+              for k in range(0, 10)]
+    years = digits[0] * 1000 + digits[1] * 100 + digits[2] * 10 + digits[3]
+    months = digits[5] * 10 + digits[6]
+    days = digits[8] * 10 + digits[9]
+
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    month_lengths = MONTH_LENGTHS[np.clip(months, 0, 12)] + (leap & (months == 2))
+    valid = (ends - starts >= 10) & (digits[4] == ord('-') - ord('0')) \
+        & (digits[7] == ord('-') - ord('0')) \
+        & (months >= 1) & (months <= 12) & (days >= 1) & (days <= month_lengths)
+    for k in DATE_DIGITS:
+        valid &= (digits[k] >= 0) & (digits[k] <= 9)
+
+    # Count the years from March, so that the leap day is the last day of the year
+    years = years.astype(np.int64) - (months <= 2)
+    eras = years // 400
+    year_of_era = years - eras * 400
+    day_of_year = (153 * (months + np.where(months > 2, -3, 9)) + 2) // 5 + days - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+
+    dates = (eras * 146097 + day_of_era - 719468).astype('datetime64[D]')
+    dates[~valid] = np.datetime64('NaT')
+
+    return (dates, valid)
+
+
+def parse_timestamps(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return a datetime64[m] array of the timestamps in buffer at each pair of start
+    and end offsets.
+
+    A timestamp is an ISO date, optionally followed by a space or 'T' and a time of
+    the form H:MM or HH:MM, like '2018-01-12 0:00'. A date alone is read as midnight.
+    Raise ValueError if a field is not a valid timestamp.
+
+    >>> text = np.frombuffer(b'2018-01-12 0:00,2018-01-12T13:45,2018-01-13', dtype=np.uint8)
+    >>> parse_timestamps(text, np.array([0, 16, 33]), np.array([15, 32, 43])).astype(str).tolist()
+    ['2018-01-12T00:00', '2018-01-12T13:45', '2018-01-13T00:00']
+    """
+    timestamps, valid = parse_timestamps_checked(buffer, starts, ends)
+
+    if not np.all(valid):
+        i = int(np.argmin(valid))
+        raise ValueError(f'Invalid timestamp {buffer[starts[i]:ends[i]].tobytes()!r} '
+                         f'at byte offset {starts[i]}')
+
+    return timestamps
+
+
+def parse_timestamps_checked(buffer: np.ndarray, starts: np.ndarray,
+                             ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the same datetime64[m] array as parse_timestamps, with NaT for the fields
+    that are not valid timestamps, and a boolean array of whether each field is one.
+
+    >>> text = np.frombuffer(b'2018-01-12 24:00,2018-01-12 9:30', dtype=np.uint8)
+    >>> timestamps, valid = parse_timestamps_checked(text, np.array([0, 17]), np.array([16, 32]))
+    >>> timestamps.astype(str).tolist(), valid.tolist()
+    (['NaT', '2018-01-12T09:30'], [False, True])
+    """
+    days, valid = parse_dates_checked(buffer, starts, ends)
+    has_time = ends - starts > 10
+
+    # Row j of times holds the j-th byte after the date of every field
+    times = gather_bytes(buffer, np.where(has_time, starts + 10, ends), ends).astype(np.int32)
+    if len(times) < 6:
+        times = np.concatenate((times, np.zeros((6 - len(times), len(starts)), dtype=np.int32)))
+    digits = times - ord('0')
+
+    # The hour has one digit if the colon comes right after it
+    short_hour = times[2] == ord(':')
+    hours = np.where(short_hour, digits[1], digits[1] * 10 + digits[2])
+    minutes = np.where(short_hour, digits[3] * 10 + digits[4], digits[4] * 10 + digits[5])
+    lengths = np.where(short_hour, 5, 6)
+
+    valid &= ~has_time | ((ends - starts - 10 == lengths)
+                         & ((times[0] == ord(' ')) | (times[0] == ord('T')))
+                         & (np.where(short_hour, times[2], times[3]) == ord(':'))
+                         & (hours >= 0) & (hours < 24) & (minutes >= 0) & (minutes < 60))
+    for k in range(1, 6):
+        is_digit = (digits[k] >= 0) & (digits[k] <= 9)
+        valid &= ~has_time | is_digit | (k == 2) & short_hour | (k == 3) & ~short_hour \
+            | (k == 5) & short_hour
+
+    timestamps = days.astype('datetime64[m]') + np.where(has_time, hours * 60 + minutes, 0)
+    timestamps[~valid] = np.datetime64('NaT')
+
+    return (timestamps, valid)
+
+
+def parse_timestamp_strings(values: np.ndarray) -> np.ndarray:
+    """Return a datetime64[m] array of the timestamps in the given array of bytes
+    strings, as read by parse_timestamps.
+
+    >>> parse_timestamp_strings(np.array([b'2018-01-12 9:00'])).astype(str).tolist()
+    ['2018-01-12T09:00']
+    """
+    values = np.ascontiguousarray(values)
+    width = values.dtype.itemsize
+    starts = np.arange(len(values), dtype=np.int64) * width
+
+    return parse_timestamps(values.view(np.uint8), starts, starts + np.char.str_len(values))
+
+
+def sort_by_time(table: TorontoAtmosphereTable) -> TorontoAtmosphereTable:
+    """Return table with its rows sorted by time, or table itself if they already are.
+
+    Rows with the same timestamp keep their order.
+    """
+    if np.all(table.timestamps[:-1] <= table.timestamps[1:]):
+        return table
+
+    order = np.argsort(table.timestamps, kind='stable')
+
+    return TorontoAtmosphereTable(**{name: column[order] for name, column in vars(table).items()})
+
+
+def select_time_range(table: TorontoAtmosphereTable, start: np.datetime64,
+                      end: np.datetime64) -> TorontoAtmosphereTable:
+    """Return the rows of table with timestamps from start to end (inclusive).
+
+    The rows are found by binary search on the sorted timestamps in O(log n) time,
+    and the returned columns are views of the columns of table.
+
+    >>> table = read_csv_table1('toronto_atmospheres.csv')
+    >>> hours = select_time_range(table, np.datetime64('2018-01-12T05:00'),
+    ...                           np.datetime64('2018-01-12T07:00'))
+    >>> hours.timestamps.astype(str).tolist(), hours.ozone_8hr.tolist()
+    (['2018-01-12T05:00', '2018-01-12T06:00', '2018-01-12T07:00'], [nan, nan, 22.75])
+    """
+    first = np.searchsorted(table.timestamps, np.datetime64(start, 'm'), side='left')
+    last = np.searchsorted(table.timestamps, np.datetime64(end, 'm'), side='right')
+
+    return TorontoAtmosphereTable(**{name: column[first:last]
+                                     for name, column in vars(table).items()})
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def resample_daily(table: TorontoAtmosphereTable) -> TorontoAtmosphereTable:
+    """Return a table with one row per day of the given table, holding the average of
+    each column over the readings of that day, at midnight.
+
+    Missing readings are left out of the averages, and a column with no reading on
+    a day is NaN on that day. The days are reduced with numpy.add.reduceat over the
+    sorted timestamps, without a Python loop.
+
+    >>> daily = resample_daily(read_csv_table1('toronto_atmospheres.csv'))
+    >>> str(daily.timestamps[0]), round(float(daily.ozone_8hr[0]), 3)
+    ('2018-01-12T00:00', 21.36)
+
+    Preconditions:
+        - len(table.timestamps) > 0
+    """
+    days = table.timestamps.astype('datetime64[D]')
+    firsts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+
+    # ACCUMULATOR: Keep track of the daily averages of the columns so far
+    columns_so_far = {'timestamps': days[firsts].astype('datetime64[m]')}
+    for name in ATMOSPHERE_COLUMNS[1:]:
+        column = getattr(table, name)
+        present = ~np.isnan(column)
+        sums = np.add.reduceat(np.where(present, column, 0.0), firsts)
+        counts = np.add.reduceat(present.astype(np.int64), firsts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns_so_far[name] = np.where(counts > 0, sums / counts, np.nan)
+
+    return TorontoAtmosphereTable(**columns_so_far)
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def join_daily_temperatures(atmosphere: TorontoAtmosphereTable, daily: TorontoTemperatureTable,
+                            how: str = 'exact', tolerance: Optional[int] = None) \
+        -> TorontoAtmosphereJoin:
+    """Return the readings of atmosphere joined to the daily temperatures of daily.
+
+    With how == 'exact', each reading is joined to the day of its own date. With
+    how == 'asof', it is joined to the latest day on or before its date that is at
+    most tolerance days earlier (any day, if tolerance is None). Readings with no
+    such day are left out.
+
+    The days are sorted once, if they are not already, and every reading is then
+    matched with a single numpy.searchsorted pass over the sorted dates, so the
+    join takes O((m + n) log n) time for m readings and n days.
+
+    >>> atmosphere = read_csv_table1('toronto_atmospheres.csv')
+    >>> daily = read_csv_table2('weatherstats_toronto_daily.csv')
+    >>> joined = join_daily_temperatures(atmosphere, daily)
+    >>> str(joined.dates[0]), float(joined.avg_temps[0]), len(joined.dates)
+    ('2018-01-12', -2.2, 330)
+
+    Preconditions:
+        - how in JOIN_METHODS
+        - tolerance is None or tolerance >= 0
+    """
+    days = daily.dates
+    avg_temps = daily.avg_temps
+    if not np.all(days[:-1] <= days[1:]):
+        order = np.argsort(days, kind='stable')
+        days, avg_temps = days[order], avg_temps[order]
+
+    reading_days = atmosphere.timestamps.astype('datetime64[D]')
+
+    if len(days) == 0:
+        # No reading can be joined; one placeholder day keeps the indexing below valid
+        matches = np.zeros(len(reading_days), dtype=np.int64)
+        joined = np.zeros(len(reading_days), dtype=bool)
+        days, avg_temps = np.zeros(1, dtype='datetime64[D]'), np.zeros(1)
+    elif how == 'exact':
+        matches = np.searchsorted(days, reading_days, side='left')
+        in_range = matches < len(days)
+        matches = np.minimum(matches, len(days) - 1)
+        joined = in_range & (days[matches] == reading_days)
+    else:
+        matches = np.searchsorted(days, reading_days, side='right') - 1
+        joined = matches >= 0
+        matches = np.maximum(matches, 0)
+        if tolerance is not None:
+            joined &= reading_days - days[matches] <= np.timedelta64(tolerance, 'D')
+
+    rows = np.flatnonzero(joined)
+
+    return TorontoAtmosphereJoin(
+        atmosphere=TorontoAtmosphereTable(**{name: column[rows]
+                                             for name, column in vars(atmosphere).items()}),
+        dates=days[matches[rows]],
+        avg_temps=avg_temps[matches[rows]])
+
+
+def search_date_range(memory: mmap.mmap, buffer: np.ndarray, begin: int, end: int,
+                      date_column: int, date_range: Tuple[np.datetime64, np.datetime64]) \
+        -> Tuple[int, int]:
+    """Return the start and end offsets of the rows between the offsets begin and end of
+    the memory-mapped CSV file with dates from date_range[0] to date_range[1] (inclusive).
+
+    The rows must be sorted by date, either ascending or descending. Only
+    O(log n) rows are parsed.
+
+    Preconditions:
+        - begin is the offset of the start of a line
+    """
+    # Skip the empty lines at the end of the rows, which have no date
+    while end > begin and memory[end - 1:end] in (b'\n', b'\r'):
+        end -= 1
+    if begin >= end:
+        return (begin, begin)
+
+    first = line_date(memory, buffer, begin, date_column)
+    last = line_date(memory, buffer, memory.rfind(b'\n', begin, end) + 1 or begin,
+                     date_column)
+    one_day = np.timedelta64(1, 'D')
+
+    if first <= last:
+        return (search_date(memory, buffer, begin, end, date_column, date_range[0], False),
+                search_date(memory, buffer, begin, end, date_column,
+                            date_range[1] + one_day, False))
+    else:
+        return (search_date(memory, buffer, begin, end, date_column, date_range[1], True),
+                search_date(memory, buffer, begin, end, date_column,
+                            date_range[0] - one_day, True))
+
+
+def search_date(memory: mmap.mmap, buffer: np.ndarray, begin: int, end: int,
+                date_column: int, date: np.datetime64, descending: bool) -> int:
+    """Return the offset of the first line between the offsets begin and end whose date
+    is on or after the given date (on or before it, if descending), or end if there is none.
+
+    Preconditions:
+        - begin is the offset of the start of a line
+        - the lines are sorted by date, in descending order if descending
+    """
+    low, high = begin, end
+
+    while low < high:
+        # Move to the start of the line containing the middle offset
+        middle = max(memory.rfind(b'\n', low, (low + high) // 2) + 1, low)
+        line_date_value = line_date(memory, buffer, middle, date_column)
+
+        if (line_date_value > date) if descending else (line_date_value < date):
+            low = line_end(memory, middle, end)
+        else:
+            high = middle
+
+    return low
+
+
+def line_date(memory: mmap.mmap, buffer: np.ndarray, offset: int,
+              date_column: int) -> np.datetime64:
+    """Return the date in the given column of the line starting at offset."""
+    stop = line_end(memory, offset, len(memory))
+    starts, ends = line_bounds(buffer, offset, stop)
+    starts, ends = starts[:1], ends[:1]
+    commas = line_commas(buffer, starts, ends)
+
+    return parse_dates(buffer, *field_bounds(starts, ends, commas, date_column))[0]
+
+
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def read_csv_data1(filepath: Source, workers: int = 1,
+                   cache: bool = False) -> List[TorontoAtmosphere]:
+    """Return a list of TorontoAtmosphere dataclasses that represent
+     rows from the CSV file: toronto_atmospheres.csv.
+
+    filepath, workers and cache are the same as for read_csv_table1.
+
+    Preconditions:
+        - filepath == 'toronto_atmospheres.csv'
+        - toronto_atmospheres.csv is not empty
+    """
+    table = read_csv_table1(filepath, workers, cache)
+
+    return [TorontoAtmosphere(temperature=temperature,
+                              nitrogen_dioxide=nitrogen_dioxide,
+                              ozone=ozone)
+            for temperature, nitrogen_dioxide, ozone in zip(table.temperature.tolist(),
+                                                            table.nitrogen_dioxide.tolist(),
+                                                            table.ozone.tolist())]
 
 
 def csv_to_dataclass1(csv_row: List[str]) -> TorontoAtmosphere:
@@ -114,31 +1738,22 @@ def csv_to_dataclass1(csv_row: List[str]) -> TorontoAtmosphere:
                              ozone=float(csv_row[3]))
 
 
-def read_csv_data2(filepath: str) -> List[TorontoTemperatureDaily]:
+@instrumentation.instrument(rows=instrumentation.result_rows)
+def read_csv_data2(filepath: Source, workers: int = 1,
+                   cache: bool = False) -> List[TorontoTemperatureDaily]:
     """Return a list of TorontoTemperatureDaily dataclasses that represent
      rows from the CSV file: weatherstats_toronto_daily.csv.
 
+    filepath, workers and cache are the same as for read_csv_table2.
+
     Preconditions:
         - filepath == 'weatherstats_toronto_daily.csv'
         - weatherstats_toronto_daily.csv is not empty
     """
-    with open(filepath) as file:
-        reader = csv.reader(file)
-
-        # Skip header row
-        next(reader)
+    table = read_csv_table2(filepath, workers, cache)
 
-        # ACCUMULATOR: Keep track of the rows in the data
-        # converted to TorontoTemperatureDaily dataclasses so far
-        data_so_far = []
-
-        for row in reader:
-            # Check that the temperature exists
-            # Else, skip and don't append to list
-            if row[1] != '':
-                data_so_far.append(csv_to_dataclass2(row))
-
-    return data_so_far
+    return [TorontoTemperatureDaily(date=date, avg_temp=avg_temp)
+            for date, avg_temp in zip(table.dates.tolist(), table.avg_temps.tolist())]
 
 
 def csv_to_dataclass2(csv_row: List[str]) -> TorontoTemperatureDaily:
@@ -154,50 +1769,164 @@ def csv_to_dataclass2(csv_row: List[str]) -> TorontoTemperatureDaily:
                                    avg_temp=float(csv_row[1]))
 
 
+@instrumentation.instrument(rows=instrumentation.argument_rows)
 def daily_to_yearly(daily_temps: List[TorontoTemperatureDaily]) \
         -> List[TorontoTemperatureYearly]:
     """Return a list of TorontoTemperatureYearly dataclasses that contain the average temperature
     of each year from 1940-2020.
 
-    daily_temps is a list of average daily temperatures in Toronto from 1940-2020.
+    daily_temps is a list of average daily temperatures in Toronto from 1940-2020, in any
+    order. The years are returned in the order they first appear in daily_temps.
+
+    >>> daily_temps = [TorontoTemperatureDaily(datetime.date(2020, 1, 1), 2.0),
+    ...                TorontoTemperatureDaily(datetime.date(2019, 12, 31), -1.0),
+    ...                TorontoTemperatureDaily(datetime.date(2020, 6, 1), 20.0)]
+    >>> daily_to_yearly(daily_temps)
+    [TorontoTemperatureYearly(date=datetime.date(2020, 1, 1), avg_temp=11.0), \
+TorontoTemperatureYearly(date=datetime.date(2019, 1, 1), avg_temp=-1.0)]
 
     Preconditions:
         - len(daily_temps) > 0
     """
-    # Add another daily temperature so that the average yearly temperature of 1940 is
-    # calculated in the for loop instead of getting "skipped over"
-    daily_temps_modified = daily_temps + [TorontoTemperatureDaily(date=datetime.date(9999, 1, 1),
-                                                                  avg_temp=0)]
+    n = len(daily_temps)
+    ordinals = np.fromiter((daily_temp.date.toordinal() for daily_temp in daily_temps),
+                           dtype=np.int64, count=n)
+    dates = (ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+    avg_temps = np.fromiter((daily_temp.avg_temp for daily_temp in daily_temps),
+                            dtype=np.float64, count=n)
+
+    # Group the days by year and find where each year first appears
+    _, first_appearances = np.unique(period_keys(dates, 'year'), return_index=True)
+    summary = summarize_temperatures(TorontoTemperatureTable(dates=dates, avg_temps=avg_temps))
 
-    # ACCUMULATOR: Keep track of the current year so far
-    # (Starts from 2020 and goes to 1940)
-    current_year = daily_temps[0].date.year
-    # ACCUMULATOR: Keep track of the average yearly temperatures so far
-    yearly_temps_so_far = []
-    # ACCUMULATOR: Keep track of the average daily temperatures so far
-    temps_so_far = []
+    return [TorontoTemperatureYearly(date=summary.starts[i].item(),
+                                     avg_temp=float(summary.avg_temps[i]))
+            for i in np.argsort(first_appearances)]
 
-    # Loop through each daily average temperature
-    for daily_temp in daily_temps_modified:
-        temps_so_far.append(daily_temp.avg_temp)
 
-        # Check if the year ends
-        if daily_temp.date.year != current_year:
-            # Calculate the average temperature for that year
-            average_temp = sum(temps_so_far) / len(temps_so_far)
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def summarize_temperatures(table: TorontoTemperatureTable, period: str = 'year') \
+        -> TorontoTemperatureSummary:
+    """Return the average, lowest and highest temperature and the number of days of
+    each period in the given table.
+
+    The days can be in any order. Each day is assigned to its period by integer
+    arithmetic on the dates, and the sums, counts, minimums and maximums of all
+    the periods are then reduced together with numpy.bincount and ufunc.at,
+    without sorting or copying the temperatures.
+
+    Preconditions:
+        - len(table.dates) > 0
+        - period in PERIODS
+    """
+    keys = period_keys(table.dates, period)
+    first_key = int(keys.min())
+    keys -= first_key
+    n_keys = int(keys.max()) + 1
 
-            # Create a TorontoTemperatureYearly dataclass
-            yearly_temp = TorontoTemperatureYearly(date=datetime.date(current_year, 1, 1),
-                                                   avg_temp=average_temp)
+    counts = np.bincount(keys, minlength=n_keys)
+    sums = np.bincount(keys, weights=table.avg_temps, minlength=n_keys)
+    min_temps = np.full(n_keys, np.inf)
+    np.minimum.at(min_temps, keys, table.avg_temps)
+    max_temps = np.full(n_keys, -np.inf)
+    np.maximum.at(max_temps, keys, table.avg_temps)
 
-            # Append yearly_temp to yearly_temps_so_far
-            yearly_temps_so_far.append(yearly_temp)
+    # Drop the periods between the first and the last that have no days
+    present = np.flatnonzero(counts)
 
-            # Start a new year
-            current_year = daily_temp.date.year
-            temps_so_far = []
+    return TorontoTemperatureSummary(period=period,
+                                     starts=period_starts(present + first_key, period),
+                                     avg_temps=sums[present] / counts[present],
+                                     min_temps=min_temps[present],
+                                     max_temps=max_temps[present],
+                                     counts=counts[present])
+
+
+def merge_summaries(first: TorontoTemperatureSummary,
+                    second: TorontoTemperatureSummary) -> TorontoTemperatureSummary:
+    """Return the summary of the days summarized by first and by second together.
+
+    The periods of both summaries are combined: a period in both has the days of both,
+    so the summary of new days can be added to the summary of the days before them
+    without summarizing those again.
+
+    >>> first = summarize_temperatures(TorontoTemperatureTable(
+    ...     dates=np.array(['2019-12-31', '2020-01-01'], dtype='datetime64[D]'),
+    ...     avg_temps=np.array([-1.0, 2.0])))
+    >>> second = summarize_temperatures(TorontoTemperatureTable(
+    ...     dates=np.array(['2020-06-01'], dtype='datetime64[D]'), avg_temps=np.array([20.0])))
+    >>> merged = merge_summaries(first, second)
+    >>> merged.avg_temps.tolist(), merged.counts.tolist()
+    ([-1.0, 11.0], [1, 2])
+
+    Preconditions:
+        - first.period == second.period
+        - every day is summarized by at most one of first and second
+    """
+    starts = np.union1d(first.starts, second.starts)
+    first_rows = np.searchsorted(starts, first.starts)
+    second_rows = np.searchsorted(starts, second.starts)
 
-    return yearly_temps_so_far
+    counts = np.zeros(len(starts), dtype=np.int64)
+    counts[first_rows] += first.counts
+    counts[second_rows] += second.counts
+    sums = np.zeros(len(starts))
+    sums[first_rows] += first.avg_temps * first.counts
+    sums[second_rows] += second.avg_temps * second.counts
+    min_temps = np.full(len(starts), np.inf)
+    min_temps[first_rows] = first.min_temps
+    min_temps[second_rows] = np.minimum(min_temps[second_rows], second.min_temps)
+    max_temps = np.full(len(starts), -np.inf)
+    max_temps[first_rows] = first.max_temps
+    max_temps[second_rows] = np.maximum(max_temps[second_rows], second.max_temps)
+
+    return TorontoTemperatureSummary(period=first.period, starts=starts,
+                                     avg_temps=sums / counts, min_temps=min_temps,
+                                     max_temps=max_temps, counts=counts)
+
+
+def period_keys(dates: np.ndarray, period: str) -> np.ndarray:
+    """Return an integer array numbering the period of each of the given dates.
+
+    Consecutive periods have consecutive numbers, counted from the period
+    containing 1970-01-01.
+
+    >>> period_keys(np.array(['1969-12-15', '1970-02-01', '1970-03-01'], dtype='datetime64[D]'),
+    ...             'season').tolist()
+    [0, 0, 1]
+
+    Preconditions:
+        - period in PERIODS
+    """
+    if period == 'year':
+        return dates.astype('datetime64[Y]').astype(np.int64)
+    elif period == 'month':
+        return dates.astype('datetime64[M]').astype(np.int64)
+    elif period == 'decade':
+        # 1970 is the first year of its decade, so the decades split at multiples of 10
+        return dates.astype('datetime64[Y]').astype(np.int64) // 10
+    else:
+        # Shift by one month so that each December joins the next January and February
+        return (dates.astype('datetime64[M]').astype(np.int64) + 1) // 3
+
+
+def period_starts(keys: np.ndarray, period: str) -> np.ndarray:
+    """Return the first day of each period numbered by period_keys.
+
+    >>> period_starts(np.array([0, 1]), 'season').tolist()
+    [datetime.date(1969, 12, 1), datetime.date(1970, 3, 1)]
+
+    Preconditions:
+        - period in PERIODS
+    """
+    if period == 'year':
+        return keys.astype('datetime64[Y]').astype('datetime64[D]')
+    elif period == 'month':
+        return keys.astype('datetime64[M]').astype('datetime64[D]')
+    elif period == 'decade':
+        return (keys * 10).astype('datetime64[Y]').astype('datetime64[D]')
+    else:
+        return (keys * 3 - 1).astype('datetime64[M]').astype('datetime64[D]')
 
 
 if __name__ == '__main__':
@@ -212,10 +1941,16 @@ if __name__ == '__main__':
     python_ta.check_all(
         config={
             # The names (strs) of imported modules
-            'extra-imports': ['dataclasses', 'csv', 'datetime', 'python_ta.contracts'],
+            'extra-imports': ['dataclasses', 'bz2', 'collections', 'concurrent.futures',
+                              'contextlib', 'csv', 'datetime', 'gzip', 'hashlib', 'io', 'json',
+                              'lzma', 'mmap', 'os', 'queue', 'threading', 'numpy', 'zstandard',
+                              'instrumentation', 'python_ta.contracts'],
             # The names (strs) of functions that call print/open/input
-            'allowed-io': ['read_csv_data1', 'read_csv_data2'],
+            'allowed-io': ['chunk_offsets', 'parse_chunk', 'open_source', 'source_compression',
+                           'read_cache', 'write_cache', 'content_hash', 'write_json',
+                           'mmap_columns', 'validated_columns', 'write_quarantine'],
             'max-line-length': 100,
-            'disable': ['R1705', 'C0200']
+            # zstandard is imported inside open_source, since it is only needed for zstd
+            'disable': ['R1705', 'C0200', 'C0415']
         }
     )
@@ -0,0 +1,255 @@
+"""CSC110 Project 2020: The Incremental Updates of the Project
+
+Description
+===========
+This module keeps the yearly summary of a daily temperature CSV file, such as
+weatherstats_toronto_daily.csv, and the statistics of the regression of year vs
+average yearly temperature up to date as days are added to the file, without
+reading the whole file again.
+
+The file is sorted newest first, so new days are added at its top. The state saved
+next to the file remembers a high-water mark: the size of the file, its first row
+and the latest date when the state was last updated. The rows added since then are
+the bytes between the header and that first row, which is found again right after
+them. Only those rows are read and validated. They are summarized by year and merged
+into the summary, and the points of the years they change are replaced in the
+regression statistics, so an update takes time proportional to the new rows rather
+than to the history. If the file changed in any other way, or is compressed, the
+state is rebuilt from the whole file.
+
+Copyright and Usage Information
+===============================
+This file is for the personal and private use of Katherine Luo, Kevin Xia,
+and Jennifer Cao. Any form of distribution of this code, with or without
+changes to this code, is prohibited.
+
+This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
+"""
+from typing import Optional, Tuple
+from dataclasses import dataclass
+import io
+import os
+import pickle
+
+import numpy as np
+
+import data_analysis
+import data_wrangling
+import pipeline
+
+# The suffix added to the path of a CSV file to name the file of its state
+STATE_SUFFIX = '.state'
+
+# The version of the format of the states, to be increased whenever it changes
+STATE_VERSION = 1
+
+
+@dataclass
+class IncrementalState:
+    """A dataclass representing the yearly summary of the rows of a daily temperature
+    CSV file and the statistics of the regression of year vs average yearly temperature,
+    with the high-water mark of the rows they include.
+
+    Instance Attributes:
+        - version: the STATE_VERSION the state was built with
+        - usecols: the column indices of the date and the temperature in the file
+        - header: the header row of the file, with its line break, or b'' if the file
+          is compressed
+        - size: the size of the file (in bytes) when the state was last updated
+        - first_line: the first data row of the file when the state was last updated,
+          with its line break, or b'' if the file is compressed
+        - latest_date: the latest date of the rows included, as a datetime64[D]
+        - summary: the summary of each year of the rows included
+        - regression: the statistics of the regression of year vs average temperature
+          over the years of summary
+        - rows: the number of valid rows included
+        - rejected: the number of rows rejected by validation so far
+
+    Representation Invariants:
+        - self.summary.period == 'year'
+        - self.regression.n == len(self.summary.starts)
+        - self.rows == sum(self.summary.counts)
+        - self.rejected >= 0
+    """
+    version: int
+    usecols: Tuple[int, ...]
+    header: bytes
+    size: int
+    first_line: bytes
+    latest_date: np.datetime64
+    summary: data_wrangling.TorontoTemperatureSummary
+    regression: data_analysis.RegressionAccumulator
+    rows: int
+    rejected: int
+
+
+def update_state(filepath: str, usecols: Tuple[int, ...] = data_wrangling.DAILY_USECOLS,
+                 state_path: Optional[str] = None) -> Tuple[IncrementalState, str]:
+    """Return the state of the daily temperature CSV file at filepath, updated with the
+    rows added to the top of the file since it was saved to state_path, and how it was
+    updated: 'unchanged', 'incremental' or 'rebuilt'.
+
+    The updated state is saved back to state_path, which defaults to filepath +
+    STATE_SUFFIX. The state is rebuilt from the whole file if there is no saved state for
+    usecols, if the file changed other than by adding rows at its top, or if a new row
+    is not later than the latest date already included, such as a corrected past day.
+    Only the rows around the high-water mark are compared with the state, so an edit
+    of older rows that keeps the size of the file is not noticed: remove the state file
+    to rebuild it.
+
+    Preconditions:
+        - the file at filepath is not empty and has at least one valid row
+        - the rows of the file at filepath are sorted newest first
+    """
+    state_path = filepath + STATE_SUFFIX if state_path is None else state_path
+    state = load_state(state_path, usecols)
+    added = None if state is None else prepended_bytes(filepath, state)
+
+    if added == b'':
+        return (state, 'unchanged')
+
+    outcome = 'rebuilt'
+    if added is not None:
+        table, report = data_wrangling.validate_table2(io.BytesIO(state.header + added),
+                                                       usecols)
+        if len(table.dates) == 0 or table.dates.min() > state.latest_date:
+            add_rows(state, table, len(report.line_numbers))
+            state.size += len(added)
+            state.first_line = added[:added.find(b'\n') + 1]
+            outcome = 'incremental'
+
+    if outcome == 'rebuilt':
+        state = build_state(filepath, usecols)
+
+    pipeline.save_result(state_path, state)
+
+    return (state, outcome)
+
+
+def build_state(filepath: str, usecols: Tuple[int, ...]) -> IncrementalState:
+    """Return the state of all the rows of the daily temperature CSV file at filepath.
+
+    Preconditions:
+        - the file at filepath is not empty and has at least one valid row
+    """
+    header, first_line = b'', b''
+    size = os.path.getsize(filepath)
+    if data_wrangling.source_compression(filepath) is None:
+        with open(filepath, 'rb') as file:
+            header = file.readline()
+            first_line = file.readline()
+
+    table, report = data_wrangling.validate_table2(filepath, usecols)
+    summary = data_wrangling.summarize_temperatures(table, 'year')
+    regression = data_analysis.RegressionAccumulator()
+    regression.update(summary_years(summary), summary.avg_temps)
+
+    return IncrementalState(version=STATE_VERSION, usecols=tuple(usecols), header=header,
+                            size=size, first_line=first_line,
+                            latest_date=table.dates.max(), summary=summary,
+                            regression=regression, rows=len(table.dates),
+                            rejected=len(report.line_numbers))
+
+
+def load_state(state_path: str, usecols: Tuple[int, ...]) -> Optional[IncrementalState]:
+    """Return the state saved to state_path, or None if there is none or it was built
+    with another STATE_VERSION or other usecols."""
+    try:
+        with open(state_path, 'rb') as file:
+            state = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None
+
+    if not isinstance(state, IncrementalState) or state.version != STATE_VERSION \
+            or state.usecols != tuple(usecols):
+        return None
+
+    return state
+
+
+def prepended_bytes(filepath: str, state: IncrementalState) -> Optional[bytes]:
+    """Return the rows added between the header and the first row of the CSV file at
+    filepath since state was last updated, or None if the file changed in another way
+    or is compressed.
+
+    Only the header, the new rows and the former first row are read.
+    """
+    growth = os.path.getsize(filepath) - state.size
+    if growth < 0 or state.header == b'':
+        return None
+
+    with open(filepath, 'rb') as file:
+        if file.read(len(state.header)) != state.header:
+            return None
+        data = file.read(growth + len(state.first_line))
+
+    if data[growth:] != state.first_line or (growth > 0 and data[growth - 1] != ord('\n')):
+        return None
+
+    return data[:growth]
+
+
+def add_rows(state: IncrementalState, table: data_wrangling.TorontoTemperatureTable,
+             rejected: int) -> None:
+    """Add the rows of table, and the number of rows rejected with them, to state.
+
+    The rows are summarized by year and merged into the summary of state. The points of
+    the years they fall in are removed from the regression statistics with their former
+    averages and added back with their new ones, so only those years are visited.
+
+    Preconditions:
+        - all(date > state.latest_date for date in table.dates)
+    """
+    state.rejected += rejected
+    if len(table.dates) == 0:
+        return
+
+    added = data_wrangling.summarize_temperatures(table, 'year')
+    former = np.isin(added.starts, state.summary.starts)
+    if np.any(former):
+        rows = np.searchsorted(state.summary.starts, added.starts[former])
+        state.regression.remove(data_analysis.RegressionAccumulator(
+            *data_analysis.sufficient_statistics(summary_years(state.summary)[rows],
+                                                 state.summary.avg_temps[rows])))
+
+    state.summary = data_wrangling.merge_summaries(state.summary, added)
+    rows = np.searchsorted(state.summary.starts, added.starts)
+    state.regression.update(summary_years(state.summary)[rows], state.summary.avg_temps[rows])
+    state.latest_date = max(state.latest_date, table.dates.max())
+    state.rows += len(table.dates)
+
+
+def summary_years(summary: data_wrangling.TorontoTemperatureSummary) -> np.ndarray:
+    """Return the year of each row of the given yearly summary, as float64 numbers.
+
+    >>> summary_years(data_wrangling.TorontoTemperatureSummary(
+    ...     'year', np.array(['1940-01-01', '2020-01-01'], dtype='datetime64[D]'),
+    ...     np.zeros(2), np.zeros(2), np.zeros(2), np.ones(2, dtype=np.int64))).tolist()
+    [1940.0, 2020.0]
+
+    Preconditions:
+        - summary.period == 'year'
+    """
+    return summary.starts.astype('datetime64[Y]').astype(np.float64) + 1970
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import python_ta
+    python_ta.check_all(
+        config={
+            # The names (strs) of imported modules
+            'extra-imports': ['dataclasses', 'io', 'os', 'pickle', 'numpy', 'data_analysis',
+                              'data_wrangling', 'pipeline', 'python_ta.contracts'],
+            # The names (strs) of functions that call print/open/input
+            'allowed-io': ['build_state', 'load_state', 'prepended_bytes'],
+            'max-line-length': 100,
+            'disable': ['R1705', 'C0200']
+        }
+    )
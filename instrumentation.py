@@ -0,0 +1,341 @@
+"""CSC110 Project 2020: The Instrumentation of the Project
+
+Description
+===========
+This module measures where the time of a run of this project goes. The entry
+points of data_wrangling, data_analysis and plots are decorated with instrument,
+which records, for every call, the wall time, the number of rows processed, the
+bytes read from files and the peak memory allocated (traced with tracemalloc).
+
+Instrumentation is off by default, and then a decorated function only checks one
+attribute before calling the original function. It is turned on by setting the
+environment variable named by PROFILE_ENV to a non-empty value, by the --profile
+flags of main.py, or by calling REGISTRY.enable(). The records can be printed as
+a summary table, or written as a JSON trace in the Chrome trace event format,
+which chrome://tracing and https://ui.perfetto.dev can display.
+
+import_times measures the time taken to import modules, and checks that computing
+the results of main.py does not import plotly.
+
+Copyright and Usage Information
+===============================
+This file is for the personal and private use of Katherine Luo, Kevin Xia,
+and Jennifer Cao. Any form of distribution of this code, with or without
+changes to this code, is prohibited.
+
+This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
+"""
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass, fields, is_dataclass
+import functools
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# The environment variable turning instrumentation on when it is set to a non-empty value
+PROFILE_ENV = 'CLIMATE_PROFILE'
+
+
+@dataclass
+class Record:
+    """A dataclass representing the measurements of all the calls of one function.
+
+    Instance Attributes:
+        - calls: the number of calls
+        - seconds: the total wall time of the calls (in seconds)
+        - rows: the total number of rows processed by the calls
+        - bytes_read: the total number of bytes read by the calls through system calls
+        - peak_bytes: the largest peak of memory allocated during one call (in bytes),
+          or 0 if memory was not traced
+
+    Representation Invariants:
+        - self.calls >= 0
+        - self.seconds >= 0
+        - self.rows >= 0
+        - self.peak_bytes >= 0
+    """
+    calls: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    bytes_read: int = 0
+    peak_bytes: int = 0
+
+
+class Registry:
+    """A registry of the measurements of the instrumented functions.
+
+    Instance Attributes:
+        - enabled: whether the calls of the instrumented functions are measured
+        - trace_memory: whether the peak memory of each call is traced with tracemalloc
+        - records: a mapping of the qualified names of the functions measured to their
+          measurements
+        - events: the measurements of each call, in the order the calls ended, as
+          Chrome trace events
+
+    Representation Invariants:
+        - all(record.calls > 0 for record in self.records.values())
+    """
+    enabled: bool
+    trace_memory: bool
+    records: Dict[str, Record]
+    events: List[Dict[str, Any]]
+
+    # Private Instance Attributes:
+    #   - _peaks: for each call in progress, from the outermost, the memory traced when
+    #     it started and the highest memory traced during it so far
+    #   - _origin: the value of time.perf_counter() when the registry was last reset
+    #   - _started_tracing: whether enable started tracemalloc, so disable stops it
+    _peaks: List[List[int]]
+    _origin: float
+    _started_tracing: bool
+
+    def __init__(self) -> None:
+        """Initialize an empty, disabled registry."""
+        self.enabled = False
+        self.trace_memory = False
+        self.records = {}
+        self.events = []
+        self._peaks = []
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+
+    def enable(self, trace_memory: bool = True) -> None:
+        """Start measuring the calls of the instrumented functions, with their peak
+        memory if trace_memory is True."""
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def disable(self) -> None:
+        """Stop measuring the calls of the instrumented functions."""
+        self.enabled = False
+        self.trace_memory = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self) -> None:
+        """Forget every measurement so far."""
+        self.records = {}
+        self.events = []
+        self._origin = time.perf_counter()
+
+    def call(self, func: Callable, rows: Optional[Callable[[Any, tuple], int]],
+             args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """Return func called with args and kwargs, recording its measurements under
+        its qualified name. rows counts the rows processed from the return value and
+        the arguments, or is None if the call does not count rows.
+        """
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1][1] = max(self._peaks[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append([current, current])
+
+        read_before = bytes_read()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = 0
+            if self.trace_memory and self._peaks:
+                _, peak = tracemalloc.get_traced_memory()
+                call_start, call_peak = self._peaks.pop()
+                peak_bytes = max(call_peak, peak) - call_start
+                # The peak of this call is also reached during the call enclosing it
+                if self._peaks:
+                    self._peaks[-1][1] = max(self._peaks[-1][1], peak)
+
+        self.add(f'{func.__module__}.{func.__qualname__}', start, seconds,
+                 0 if rows is None else rows(result, args),
+                 max(bytes_read() - read_before, 0), peak_bytes)
+
+        return result
+
+    def add(self, name: str, start: float, seconds: float, rows: int, read: int,
+            peak_bytes: int) -> None:
+        """Record one call of the function with the given name, which started at the
+        given value of time.perf_counter() and took the given measurements."""
+        record = self.records.setdefault(name, Record())
+        record.calls += 1
+        record.seconds += seconds
+        record.rows += rows
+        record.bytes_read += read
+        record.peak_bytes = max(record.peak_bytes, peak_bytes)
+
+        self.events.append({'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                            'ts': (start - self._origin) * 10 ** 6, 'dur': seconds * 10 ** 6,
+                            'args': {'rows': rows, 'bytes read': read,
+                                     'peak bytes': peak_bytes}})
+
+    def format_summary(self) -> str:
+        """Return a table of the measurements of each function, slowest first. The first
+        column is as wide as the longest function name.
+
+        >>> registry = Registry()
+        >>> registry.add('data_wrangling.read_csv_table2', 0.0, 0.5, 29493, 10 ** 6, 2 ** 20)
+        >>> registry.add('data_analysis.simple_linear_regression', 0.0, 0.25, 2, 0, 2 ** 10)
+        >>> print(registry.format_summary())
+        function                                calls   seconds       rows  MiB read  peak MiB
+        data_wrangling.read_csv_table2              1    0.5000      29493       1.0       1.0
+        data_analysis.simple_linear_regression      1    0.2500          2       0.0       0.0
+        """
+        width = max([len('function')] + [len(name) for name in self.records])
+        lines = [f'{"function":<{width}} {"calls":>6} {"seconds":>9} {"rows":>10} '
+                 f'{"MiB read":>9} {"peak MiB":>9}']
+        lines.extend(f'{name:<{width}} {record.calls:>6} {record.seconds:>9.4f} {record.rows:>10} '
+                     f'{record.bytes_read / 2 ** 20:>9.1f} {record.peak_bytes / 2 ** 20:>9.1f}'
+                     for name, record in sorted(self.records.items(),
+                                                key=lambda item: -item[1].seconds))
+
+        return '\n'.join(lines)
+
+    def write_trace(self, path: str) -> None:
+        """Write the measurements of each call to the file at path as a JSON trace in the
+        Chrome trace event format."""
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, file)
+
+
+# The registry of this process, enabled if the environment variable PROFILE_ENV is set
+REGISTRY = Registry()
+if os.environ.get(PROFILE_ENV):
+    REGISTRY.enable()
+
+
+def instrument(rows: Optional[Callable[[Any, tuple], int]] = None) -> Callable:
+    """Return a decorator recording the calls of the function it decorates in REGISTRY
+    while REGISTRY.enabled is True.
+
+    rows counts the rows processed by a call from its return value and its positional
+    arguments, for example result_rows or argument_rows, or is None if the function
+    does not process rows.
+
+    >>> @instrument(rows=argument_rows)
+    ... def total(values: list) -> float:
+    ...     return sum(values)
+    >>> REGISTRY.enable(trace_memory=False)
+    >>> total([1.0, 2.0, 3.0])
+    6.0
+    >>> REGISTRY.records['instrumentation.total'].rows
+    3
+    >>> REGISTRY.disable()
+    >>> REGISTRY.reset()
+    """
+    def decorator(func: Callable) -> Callable:
+        """Return the instrumented version of func."""
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            """Call the decorated function, recording the call if REGISTRY is enabled."""
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+
+            return REGISTRY.call(func, rows, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def length(value: Any) -> int:
+    """Return the number of rows of value: its length, or the length of its first field if
+    it is a dataclass of columns such as data_wrangling.TorontoTemperatureTable.
+
+    >>> length([1, 2, 3])
+    3
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        value = getattr(value, fields(value)[0].name)
+
+    return len(value)
+
+
+def result_rows(result: Any, args: tuple) -> int:
+    """Return the number of rows of result, for functions returning the rows they read."""
+    if isinstance(result, tuple):
+        return length(result[0])
+
+    return length(result)
+
+
+def argument_rows(result: Any, args: tuple) -> int:
+    """Return the number of rows of the first argument, for functions processing it."""
+    return length(args[0])
+
+
+def bytes_read() -> int:
+    """Return the number of bytes this process has read through system calls so far,
+    or -1 if the operating system does not report it.
+
+    Pages of memory-mapped files are not counted, since they are not read through
+    system calls.
+    """
+    try:
+        with open('/proc/self/io') as file:
+            for line in file:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+
+    return -1
+
+
+def import_times(statement: str) -> Dict[str, float]:
+    """Return a mapping of the name of every module imported by running statement in a
+    new Python interpreter, from the directory of this file, to the time (in seconds)
+    its import took, including the modules it imported, as reported by
+    python -X importtime.
+
+    The modules needed to compute the results of main.py must not import plotly, so
+    they must import faster than plots, which does. plots is imported first, so any
+    module both import is already in the file system cache for pipeline:
+
+    >>> baseline = import_times('import plots')['plots']
+    >>> times = import_times('import pipeline; pipeline.compute_results(cache_dir=None)')
+    >>> sorted(name for name in times if name.startswith('plotly'))
+    []
+    >>> times['pipeline'] < baseline
+    True
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    # ACCUMULATOR: Keep track of the import times of the modules so far
+    times_so_far = {}
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('imported package'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times_so_far[name.strip()] = int(cumulative) / 10 ** 6
+
+    return times_so_far
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import python_ta
+    python_ta.check_all(
+        config={
+            # The names (strs) of imported modules
+            'extra-imports': ['dataclasses', 'functools', 'json', 'os', 'subprocess', 'sys', 'time',
+                              'tracemalloc', 'python_ta.contracts'],
+            # The names (strs) of functions that call print/open/input
+            'allowed-io': ['Registry.write_trace', 'bytes_read'],
+            'max-line-length': 100,
+            'disable': ['R1705', 'C0200']
+        }
+    )
@@ -6,7 +6,25 @@ This is the main file of the CSC110 project. This project focuses on the
 effects of climate change and ozone concentration on Torontonian residents'
 respiratory health. This main file runs the code necessary to wrangle the
 datasets, perform simple linear regression on the data, and display the
-results of this project.
+results of this project, as the stages of the pipeline in pipeline.py.
+
+Run `python main.py` to display the plots, or `python main.py <stage> --timings`
+to evaluate a single stage and print how long each stage took. Stages whose
+inputs have not changed since the last run are loaded from the cache instead of
+being recomputed. `python main.py results` prints the results of the five
+regressions without importing plotly, which only the render stage needs. Add
+`--profile` to print the time, rows, bytes read and peak memory of each function
+of the data wrangling, analysis and plots, or `--profile-json trace.json` to
+save every call as a Chrome trace. While profiling, every stage is computed
+instead of being loaded from the cache, so every function is measured.
+`python main.py --stations stations.json` runs the regressions for every station
+of a registry in a pool of processes and prints a summary of their slopes; add
+`--memory-limit 2048` to cap the memory of each process at 2048 MiB. Rows of
+the CSV files that are malformed or out of range are left out of the analysis;
+`python main.py quarantine` lists them with their line numbers.
+`python main.py --incremental` only reads the days added to the top of the daily
+file since its last run, updates the yearly temperatures and the regression of year
+vs temperature with them, and prints that regression.
 
 Copyright and Usage Information
 ===============================
@@ -16,70 +34,99 @@ changes to this code, are prohibited.
 
 This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
 """
+import argparse
+import os
+
 import data_wrangling
-import data_analysis
-import plots
+import incremental
+import instrumentation
+import pipeline
+import stations
 
 
 if __name__ == '__main__':
-    # Data wrangling: csv to dataclass
-    toronto_atmospheres = data_wrangling.read_csv_data1('toronto_atmospheres.csv')
-    toronto_daily_temps = data_wrangling.read_csv_data2('weatherstats_toronto_daily.csv')
-
-    # Convert daily temperatures to yearly temperatures
-    toronto_yearly_temps = data_wrangling.daily_to_yearly(toronto_daily_temps)
-
-    # Set up the x-coordinates and y-coordinates for simple linear regression
-    # ACCUMULATOR: Keep track of the x-coordinates (year) so far
-    x_coords1 = []
-    # ACCUMULATOR: Keep track of the y-coordinates (temperature) so far
-    y_coords1 = []
-    for yearly_temp in toronto_yearly_temps:
-        x_coords1.append(yearly_temp.date.year)
-        y_coords1.append(yearly_temp.avg_temp)
-
-    # ACCUMULATOR: Keep track of the x-coordinates (temperature) so far
-    x_coords2 = []
-    # ACCUMULATOR: Keep track of the y-coordinates (nitrogen dioxide) so far
-    y_coords2 = []
-    # ACCUMULATOR: Keep track of the y-coordinates (ozone) so far
-    y_coords3 = []
-    for atmosphere in toronto_atmospheres:
-        x_coords2.append(atmosphere.temperature)
-        y_coords2.append(atmosphere.nitrogen_dioxide)
-        y_coords3.append(atmosphere.ozone)
-
-    # Data analysis: simple linear regression
-    # year vs temperature
-    results1 = data_analysis.simple_linear_regression(x_coords1, y_coords1)
-    # temperature vs nitrogen dioxide concentration
-    results2 = data_analysis.simple_linear_regression(x_coords2, y_coords2)
-    # temperature vs ozone concentration
-    results3 = data_analysis.simple_linear_regression(x_coords2, y_coords3)
-
-    # SPECIAL ANALYSIS: year -> temperature -> nitrogen dioxide/ozone
-    # ACCUMULATOR: Keep track of the predicted y-coordinates (nitrogen dioxide) so far
-    y_coords4 = []
-    # ACCUMULATOR: Keep track of the predicted y-coordinates (ozone) so far
-    y_coords5 = []
+    parser = argparse.ArgumentParser(description='Climate change and respiratory health '
+                                                 'in Toronto.')
+    parser.add_argument('target', nargs='?', default='render',
+                        choices=list(pipeline.build_pipeline(cache_dir=None).stages),
+                        help='the stage of the pipeline to evaluate (default: render)')
+    parser.add_argument('--atmosphere-path', default=pipeline.DEFAULT_PARAMETERS['atmosphere_path'])
+    parser.add_argument('--daily-path', default=pipeline.DEFAULT_PARAMETERS['daily_path'])
+    parser.add_argument('--output', default=None,
+                        help='save the plots to this HTML (or image) file instead of '
+                             'displaying them, or with --stations, save the summary to this '
+                             'CSV file')
+    parser.add_argument('--stations', default=None,
+                        help='run the regressions for every station of this registry (such as '
+                             'stations.json) and print a summary of their slopes')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='the number of processes analysing the stations (default: the '
+                             'number of CPUs)')
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help='with --stations, cap the memory of each process analysing the '
+                             'stations at this many MiB, so that a station needing more fails '
+                             'alone (default: no cap)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only read the days added to the daily file since the last '
+                             'incremental run, and print the regression of year vs temperature')
+    parser.add_argument('--timings', action='store_true',
+                        help='print the time taken by each stage')
+    parser.add_argument('--profile', action='store_true',
+                        help='print the time, rows, bytes read and peak memory of each '
+                             'function of the data wrangling, analysis and plots (also '
+                             f'enabled by the environment variable {instrumentation.PROFILE_ENV}); '
+                             'the cache is not used, so every stage is computed')
+    parser.add_argument('--profile-json', default=None,
+                        help='write the measurements of each function call to this file as a '
+                             'Chrome trace')
+    arguments = parser.parse_args()
+    if arguments.memory_limit is not None and arguments.memory_limit <= 0:
+        parser.error('--memory-limit must be positive')
 
-    # Determine the predicted concentrations from year
-    for year in x_coords1:
-        temperature = results1['slope'] * year + results1['y-intercept']
-        nitrogen_dioxide = results2['slope'] * temperature + results2['y-intercept']
-        ozone = results3['slope'] * temperature + results3['y-intercept']
+    if arguments.profile or arguments.profile_json:
+        instrumentation.REGISTRY.enable()
 
-        y_coords4.append(nitrogen_dioxide)
-        y_coords5.append(ozone)
+    if arguments.stations is not None:
+        # Perform the regressions of every station in a pool of processes
+        memory_limit = None if arguments.memory_limit is None else arguments.memory_limit * 2 ** 20
+        summary = stations.analyze_stations(stations.read_registry(arguments.stations),
+                                            arguments.workers, memory_limit=memory_limit)
+        print(stations.format_station_summary(summary))
+        if arguments.output is not None:
+            stations.write_station_summary(summary, arguments.output)
+    elif arguments.incremental:
+        # Add the days prepended to the daily file since the last run to the saved yearly
+        # temperatures and regression statistics
+        state, outcome = incremental.update_state(arguments.daily_path)
+        print(f'{arguments.daily_path}: {outcome}, {state.rows} days up to '
+              f'{state.latest_date} ({state.rejected} rows rejected)')
+        print(state.regression.results())
+    else:
+        # Wrangle the data, perform the regressions and display the plots,
+        # reusing the results of the stages whose inputs have not changed, unless
+        # profiling, where the stages loaded from the cache would not be measured
+        cache_dir = None if instrumentation.REGISTRY.enabled else pipeline.DEFAULT_CACHE_DIR
+        project_pipeline = pipeline.build_pipeline({'atmosphere_path': arguments.atmosphere_path,
+                                                    'daily_path': arguments.daily_path,
+                                                    'output_path': arguments.output}, cache_dir)
+        result = project_pipeline.run(arguments.target)
 
-    # year vs predicted nitrogen dioxide concentration
-    results4 = data_analysis.simple_linear_regression(x_coords1, y_coords4)
-    # year vs predicted ozone concentration
-    results5 = data_analysis.simple_linear_regression(x_coords1, y_coords5)
+        if arguments.target == 'quarantine':
+            print('\n'.join(data_wrangling.format_quarantine(report) for report in result))
+        elif arguments.target != 'render':
+            print(result)
+        if arguments.timings:
+            print(project_pipeline.format_timings())
 
-    # Display plots
-    plots.display_plots([(x_coords1, y_coords1, results1),
-                         (x_coords2, y_coords2, results2),
-                         (x_coords2, y_coords3, results3),
-                         (x_coords1, y_coords4, results4),
-                         (x_coords1, y_coords5, results5)])
+        # Report the rows left out of the analysis because they failed validation, only
+        # for the files validated by the target, so that no other file is parsed
+        evaluated = {name for name, _, _ in project_pipeline.timings}
+        if arguments.target != 'quarantine':
+            for name in ('validate_atmospheres', 'validate_daily'):
+                report = project_pipeline.run(name)[1] if name in evaluated else None
+                if report is not None and len(report.line_numbers) > 0:
+                    print(data_wrangling.format_quarantine(report, limit=3))
+    if arguments.profile or (instrumentation.REGISTRY.enabled and not arguments.profile_json):
+        print(instrumentation.REGISTRY.format_summary())
+    if arguments.profile_json:
+        instrumentation.REGISTRY.write_trace(arguments.profile_json)
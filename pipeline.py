@@ -0,0 +1,451 @@
+"""CSC110 Project 2020: The Pipeline of the Project
+
+Description
+===========
+This module expresses the workflow of this project as a graph of named stages:
+loading and validating the datasets, aggregating the daily temperatures by year, performing
+the regressions, projecting the concentrations from year, and rendering the
+plots. Each stage is evaluated only when a later stage needs it, and its result
+is memoized on a key computed from its parameters, the content hashes of its input
+files and the keys of the stages it depends on. Changing one input file or parameter
+therefore only recomputes the stages downstream of it, while touching a file or
+checking it out again recomputes nothing.
+
+Copyright and Usage Information
+===============================
+This file is for the personal and private use of Katherine Luo, Kevin Xia,
+and Jennifer Cao. Any forms of distribution of this code, with or without
+changes to this code, are prohibited.
+
+This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+import data_analysis
+import data_wrangling
+
+# The default parameters of the project pipeline
+DEFAULT_PARAMETERS = {'atmosphere_path': 'toronto_atmospheres.csv',
+                      'daily_path': 'weatherstats_toronto_daily.csv',
+                      'atmosphere_usecols': data_wrangling.ATMOSPHERE_USECOLS,
+                      'daily_usecols': data_wrangling.DAILY_USECOLS,
+                      'output_path': None}
+
+# The default directory where the pipeline saves the results of its stages
+DEFAULT_CACHE_DIR = '.pipeline_cache'
+
+# The name of the file of the cache directory where the content hashes of the input files
+# are saved, with the size and modification time of each file when it was hashed
+HASHES_FILENAME = 'hashes.json'
+
+
+@dataclass
+class Stage:
+    """A dataclass representing one named stage of a pipeline.
+
+    The stage is computed by calling func with the results of its dependencies,
+    in order, followed by the values of its parameters, in order.
+
+    Instance Attributes:
+        - name: the name of the stage
+        - func: the function computing the result of the stage
+        - dependencies: the names of the stages whose results func takes
+        - parameters: the names of the pipeline parameters func takes
+        - files: the names of the parameters that are paths of input files, whose
+          content hashes are part of the key of the stage
+        - persist: whether the result of the stage is saved to the cache directory
+        - version: the version of func, part of the key of the stage, to be increased
+          whenever func starts returning something different for the same inputs
+
+    Representation Invariants:
+        - all(file in self.parameters for file in self.files)
+    """
+    name: str
+    func: Callable[..., Any]
+    dependencies: Tuple[str, ...] = ()
+    parameters: Tuple[str, ...] = ()
+    files: Tuple[str, ...] = ()
+    persist: bool = True
+    version: int = 1
+
+
+class Pipeline:
+    """A graph of stages evaluated lazily, with their results memoized.
+
+    Instance Attributes:
+        - stages: a mapping of the names of the stages to the stages
+        - parameters: a mapping of the names of the parameters to their values
+        - cache_dir: the directory where the persistent results are saved, or None
+          to only memoize results in memory
+        - timings: the name, the outcome ('computed', 'memory' or 'disk') and the
+          wall time (in seconds) of each stage evaluated by the last call to run
+
+    Representation Invariants:
+        - all(dependency in self.stages for stage in self.stages.values()
+              for dependency in stage.dependencies)
+    """
+    stages: Dict[str, Stage]
+    parameters: Dict[str, Any]
+    cache_dir: Optional[str]
+    timings: List[Tuple[str, str, float]]
+
+    # Private Instance Attributes:
+    #   - _memo: a mapping of the names of the stages to the key and the result
+    #     of their last evaluation
+    #   - _hashes: a mapping of the absolute paths of the input files hashed so far to
+    #     their fingerprints, as returned by data_wrangling.file_fingerprint, with their
+    #     content hashes, or None if they were not loaded from the cache directory yet
+    _memo: Dict[str, Tuple[str, Any]]
+    _hashes: Optional[Dict[str, Dict[str, Any]]]
+
+    def __init__(self, stages: List[Stage], parameters: Dict[str, Any],
+                 cache_dir: Optional[str] = None) -> None:
+        """Initialize a pipeline with the given stages, parameters and cache directory."""
+        self.stages = {stage.name: stage for stage in stages}
+        self.parameters = dict(parameters)
+        self.cache_dir = cache_dir
+        self.timings = []
+        self._memo = {}
+        self._hashes = None
+
+    def key(self, name: str, keys: Optional[Dict[str, str]] = None) -> str:
+        """Return the key of the stage with the given name: a hash of its name, its
+        parameters, the fingerprints of its input files and the keys of its dependencies.
+
+        keys maps the names of the stages whose keys are already known to them.
+        """
+        keys = {} if keys is None else keys
+        if name in keys:
+            return keys[name]
+
+        stage = self.stages[name]
+        description = {'name': name, 'version': stage.version,
+                       'parameters': [repr(self.parameters[parameter])
+                                      for parameter in stage.parameters],
+                       'files': [self.file_hash(self.parameters[file]) for file in stage.files],
+                       'dependencies': [self.key(dependency, keys)
+                                        for dependency in stage.dependencies]}
+        keys[name] = hashlib.blake2b(json.dumps(description).encode(),
+                                     digest_size=16).hexdigest()
+
+        return keys[name]
+
+    def file_hash(self, path: str) -> str:
+        """Return the content hash of the file at path.
+
+        The hash is only computed again if the size or the modification time of the file
+        changed since it was last hashed, so touching a file costs one hash and changes no
+        key. The hashes are saved to HASHES_FILENAME in the cache directory, if any.
+        """
+        if self._hashes is None:
+            self._hashes = {}
+            if self.cache_dir is not None:
+                try:
+                    with open(os.path.join(self.cache_dir, HASHES_FILENAME)) as file:
+                        self._hashes = json.load(file)
+                except (OSError, ValueError):
+                    pass
+
+        fingerprint = data_wrangling.file_fingerprint(path)
+        known = self._hashes.get(fingerprint['path'])
+        if known is None or any(known.get(key) != fingerprint[key]
+                                for key in ('size', 'mtime_ns')):
+            known = dict(fingerprint, hash=data_wrangling.content_hash(path))
+            self._hashes[fingerprint['path']] = known
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                data_wrangling.write_json(os.path.join(self.cache_dir, HASHES_FILENAME),
+                                          self._hashes)
+
+        return known['hash']
+
+    def run(self, target: str) -> Any:
+        """Return the result of the stage named target, evaluating only the stages it
+        depends on whose results are not memoized under their current keys.
+
+        The timings of the evaluated stages are recorded in self.timings.
+        """
+        self.timings = []
+
+        return self._evaluate(target, {})
+
+    def _evaluate(self, name: str, keys: Dict[str, str]) -> Any:
+        """Return the result of the stage with the given name, evaluating its
+        dependencies first if needed."""
+        stage = self.stages[name]
+        key = self.key(name, keys)
+
+        if name in self._memo and self._memo[name][0] == key:
+            self.timings.append((name, 'memory', 0.0))
+            return self._memo[name][1]
+
+        path = None
+        if self.cache_dir is not None and stage.persist:
+            path = os.path.join(self.cache_dir, f'{name}-{key}.pickle')
+
+        start = time.perf_counter()
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as file:
+                result = pickle.load(file)
+            self.timings.append((name, 'disk', time.perf_counter() - start))
+        else:
+            arguments = [self._evaluate(dependency, keys) for dependency in stage.dependencies]
+            # Time the stage itself, without the dependencies evaluated above
+            start = time.perf_counter()
+            result = stage.func(*arguments,
+                                *[self.parameters[parameter] for parameter in stage.parameters])
+            self.timings.append((name, 'computed', time.perf_counter() - start))
+
+            if path is not None:
+                save_result(path, result)
+                remove_stale_results(self.cache_dir, name, path)
+
+        self._memo[name] = (key, result)
+
+        return result
+
+    def format_timings(self) -> str:
+        """Return a table of the timings of the stages evaluated by the last call to run."""
+        lines = [f'{"stage":<20} {"outcome":<9} {"seconds":>9}']
+        lines.extend(f'{name:<20} {outcome:<9} {seconds:>9.4f}'
+                     for name, outcome, seconds in self.timings)
+
+        return '\n'.join(lines)
+
+
+def save_result(path: str, result: Any) -> None:
+    """Atomically save result to the file at path with pickle, creating its directory."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    with open(path + '.tmp', 'wb') as file:
+        pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def remove_stale_results(cache_dir: str, name: str, path: str) -> None:
+    """Remove the results of the stage with the given name saved in cache_dir under
+    other keys than the one of the file at path."""
+    for filename in os.listdir(cache_dir):
+        other = os.path.join(cache_dir, filename)
+        if filename.startswith(name + '-') and filename.endswith('.pickle') and other != path:
+            os.remove(other)
+
+
+def validate_atmospheres(atmosphere_path: str, atmosphere_usecols: Tuple[int, ...]) \
+        -> Tuple[data_wrangling.TorontoAtmosphereTable, data_wrangling.QuarantineReport]:
+    """Return the time-indexed table of the valid rows of the CSV file:
+    toronto_atmospheres.csv, or of another station's atmosphere file with the columns
+    atmosphere_usecols, and the report of the rows it rejected."""
+    return data_wrangling.validate_table1(atmosphere_path, atmosphere_usecols)
+
+
+def validate_daily(daily_path: str, daily_usecols: Tuple[int, ...]) \
+        -> Tuple[data_wrangling.TorontoTemperatureTable, data_wrangling.QuarantineReport]:
+    """Return the table of the valid rows of the CSV file: weatherstats_toronto_daily.csv,
+    or of another station's daily file with the columns daily_usecols, and the report of
+    the rows it rejected."""
+    return data_wrangling.validate_table2(daily_path, daily_usecols)
+
+
+def load_atmospheres(validated: Tuple[data_wrangling.TorontoAtmosphereTable,
+                                      data_wrangling.QuarantineReport]) \
+        -> data_wrangling.TorontoAtmosphereTable:
+    """Return the table of the valid atmosphere readings."""
+    return validated[0]
+
+
+def load_daily(validated: Tuple[data_wrangling.TorontoTemperatureTable,
+                                data_wrangling.QuarantineReport]) \
+        -> data_wrangling.TorontoTemperatureTable:
+    """Return the table of the valid daily temperatures."""
+    return validated[0]
+
+
+def quarantine(atmospheres: Tuple[data_wrangling.TorontoAtmosphereTable,
+                                  data_wrangling.QuarantineReport],
+               daily: Tuple[data_wrangling.TorontoTemperatureTable,
+                            data_wrangling.QuarantineReport]) \
+        -> List[data_wrangling.QuarantineReport]:
+    """Return the reports of the rows rejected from the atmosphere and the daily files."""
+    return [atmospheres[1], daily[1]]
+
+
+def aggregate(daily: data_wrangling.TorontoTemperatureTable) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the years and the average yearly temperatures of the given daily temperatures.
+    """
+    summary = data_wrangling.summarize_temperatures(daily, 'year')
+
+    return (summary.starts.astype('datetime64[Y]').astype(np.int64) + 1970, summary.avg_temps)
+
+
+def regress(yearly: Tuple[np.ndarray, np.ndarray],
+            atmospheres: data_wrangling.TorontoAtmosphereTable) -> List[Dict[str, float]]:
+    """Return the results of simple linear regression of year vs temperature, temperature
+    vs nitrogen dioxide concentration, and temperature vs ozone concentration.
+    """
+    # year vs temperature
+    results1 = data_analysis.simple_linear_regression(*yearly)
+
+    # temperature vs nitrogen dioxide and ozone concentrations, sharing the
+    # temperature statistics between both regressions
+    concentration_results = data_analysis.batch_linear_regression(
+        atmospheres.temperature,
+        np.column_stack([atmospheres.nitrogen_dioxide, atmospheres.ozone]))
+
+    return [results1,
+            data_analysis.column_results(concentration_results, 0),
+            data_analysis.column_results(concentration_results, 1)]
+
+
+def project(yearly: Tuple[np.ndarray, np.ndarray], results: List[Dict[str, float]]) \
+        -> List[Tuple[np.ndarray, Dict[str, float]]]:
+    """Return the predicted nitrogen dioxide and ozone concentrations of each year, found
+    by chaining the regression lines year -> temperature -> concentration, and the results
+    of simple linear regression of year vs each predicted concentration.
+    """
+    years = yearly[0]
+    chain = data_analysis.chain_models(data_analysis.simple_model(results[:1]),
+                                       data_analysis.simple_model(results[1:]))
+    predicted = chain.predict(years.reshape(-1, 1).astype(np.float64))
+    projection_results = data_analysis.batch_linear_regression(years, predicted)
+
+    return [(predicted[:, j], data_analysis.column_results(projection_results, j))
+            for j in range(predicted.shape[1])]
+
+
+def trends(yearly: Tuple[np.ndarray, np.ndarray],
+           daily: data_wrangling.TorontoTemperatureTable) \
+        -> Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+    """Return the temperature trends over time: a mapping of 'rolling' to the first year of
+    every 30-year window of the yearly temperatures and the results of the regression of
+    year vs temperature on each window, and of 'decades' to the first day of each decade
+    and the results of the regression of day vs temperature on the days of each decade.
+
+    A window holds the years from its first year to 29 years later that have a
+    temperature, so it spans 30 years even if some years are missing. Only the windows
+    ending by the last year are kept.
+    """
+    years, yearly_temps = yearly
+    order = np.argsort(years)
+    years, yearly_temps = years[order], yearly_temps[order]
+    starts = np.flatnonzero(years + 29 <= years[-1])
+    stops = np.searchsorted(years, years[starts] + 30)
+    rolling = data_analysis.window_linear_regression(years, yearly_temps, starts, stops)
+
+    keys = data_wrangling.period_keys(daily.dates, 'decade')
+    decades, decade_results = data_analysis.grouped_linear_regression(
+        daily.dates.astype(np.float64), daily.avg_temps, keys)
+
+    return {'rolling': (years[starts], rolling),
+            'decades': (data_wrangling.period_starts(decades, 'decade'), decade_results)}
+
+
+def render(yearly: Tuple[np.ndarray, np.ndarray],
+           atmospheres: data_wrangling.TorontoAtmosphereTable,
+           results: List[Dict[str, float]],
+           projections: List[Tuple[np.ndarray, Dict[str, float]]],
+           output_path: Optional[str]) -> None:
+    """Display the plots for the results of the data analysis, or save them to output_path
+    if it is not None."""
+    # Import plotly only when plotting, so that the other stages start faster
+    import plots
+
+    years, yearly_temps = yearly
+    analyses, views = plots.project_analyses(
+        [(years, yearly_temps, results[0]),
+         (atmospheres.temperature, atmospheres.nitrogen_dioxide, results[1]),
+         (atmospheres.temperature, atmospheres.ozone, results[2]),
+         (years, projections[0][0], projections[0][1]),
+         (years, projections[1][0], projections[1][1])])
+    plots.display_plots(analyses, views, output_path)
+
+
+def summarize_results(results: List[Dict[str, float]],
+                      projections: List[Tuple[np.ndarray, Dict[str, float]]]) \
+        -> List[Dict[str, float]]:
+    """Return the results of the five regressions shown by the plots, in the order of the
+    plots: year vs temperature, temperature vs nitrogen dioxide and ozone, and year vs
+    predicted nitrogen dioxide and ozone.
+    """
+    return results + [projection[1] for projection in projections]
+
+
+def compute_results(parameters: Optional[Dict[str, Any]] = None,
+                    cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> List[Dict[str, float]]:
+    """Return the results of the five regressions of this project, as summarize_results,
+    without importing plotly.
+
+    parameters and cache_dir are the same as for build_pipeline.
+    """
+    return build_pipeline(parameters, cache_dir).run('results')
+
+
+def build_pipeline(parameters: Optional[Dict[str, Any]] = None,
+                   cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Pipeline:
+    """Return the pipeline of this project, with DEFAULT_PARAMETERS updated by parameters.
+
+    The stages are validate_atmospheres, validate_daily, load_atmospheres, load_daily,
+    quarantine, aggregate, regress, project, trends, results and render. The rows that
+    fail validation are left out of the tables, and quarantine reports them. quarantine,
+    trends and results are not needed by render, so they are only evaluated when they
+    are the target. Only render imports plotly.
+    """
+    all_parameters = dict(DEFAULT_PARAMETERS)
+    all_parameters.update(parameters or {})
+
+    return Pipeline([Stage('validate_atmospheres', validate_atmospheres,
+                           parameters=('atmosphere_path', 'atmosphere_usecols'),
+                           files=('atmosphere_path',)),
+                     Stage('validate_daily', validate_daily,
+                           parameters=('daily_path', 'daily_usecols'), files=('daily_path',)),
+                     Stage('load_atmospheres', load_atmospheres,
+                           dependencies=('validate_atmospheres',), persist=False, version=3),
+                     Stage('load_daily', load_daily, dependencies=('validate_daily',),
+                           persist=False, version=2),
+                     Stage('quarantine', quarantine,
+                           dependencies=('validate_atmospheres', 'validate_daily'),
+                           persist=False),
+                     Stage('aggregate', aggregate, dependencies=('load_daily',)),
+                     Stage('regress', regress, dependencies=('aggregate', 'load_atmospheres')),
+                     Stage('project', project, dependencies=('aggregate', 'regress'),
+                           version=2),
+                     Stage('trends', trends, dependencies=('aggregate', 'load_daily'),
+                           version=2),
+                     Stage('results', summarize_results, dependencies=('regress', 'project'),
+                           persist=False),
+                     Stage('render', render,
+                           dependencies=('aggregate', 'load_atmospheres', 'regress', 'project'),
+                           parameters=('output_path',), persist=False)],
+                    all_parameters, cache_dir)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import python_ta
+    python_ta.check_all(
+        config={
+            # The names (strs) of imported modules
+            'extra-imports': ['dataclasses', 'hashlib', 'json', 'os', 'pickle', 'time', 'numpy',
+                              'data_analysis', 'data_wrangling', 'plots',
+                              'python_ta.contracts'],
+            # The names (strs) of functions that call print/open/input
+            'allowed-io': ['Pipeline.file_hash', 'Pipeline._evaluate', 'save_result'],
+            'max-line-length': 100,
+            # plots is imported inside render, so that plotly is only imported to plot
+            'disable': ['R1705', 'C0200', 'C0415']
+        }
+    )
@@ -2,8 +2,8 @@
 
 Description
 ===========
-This module displays the plots for this project. It uses the plotly library
-and contains the functions necessary to do so.
+This module displays the plots for this project, or saves them to files. It uses
+the plotly library and contains the functions necessary to do so.
 
 Copyright and Usage Information
 ===============================
@@ -13,12 +13,202 @@ changes to this code, are prohibited.
 
 This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
 """
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Union
+from dataclasses import dataclass
+import concurrent.futures
+import os
+
+import numpy as np
 import plotly.graph_objects as go
+import plotly.offline
+
+import instrumentation
+
+# The number of points a scatter plot is reduced to before being drawn, about the
+# number of pixels across a plot
+DISPLAY_POINTS = 2000
+
+# The number of drawn points of a scatter plot above which it is drawn with WebGL
+# (go.Scattergl) instead of SVG
+WEBGL_THRESHOLD = 1000
+
+# The ways add_plot can reduce a scatter plot to DISPLAY_POINTS points
+DECIMATIONS = ('lttb', 'minmax')
+
+# The name of the plotly.js bundle that HTML files saved with include_plotlyjs='directory'
+# load from their directory
+PLOTLYJS_BUNDLE = 'plotly.min.js'
+
+
+@dataclass
+class Analysis:
+    """A dataclass representing one analysis drawn in the figure: a scatter plot of its
+    coordinates and its regression line, shown by a button of the drop-down menu.
+
+    Instance Attributes:
+        - name: the name of the plot, which is also the label of its button
+        - x_coords: the x-coordinates of the plot
+        - y_coords: the y-coordinates of the plot
+        - results: a mapping of the regression line results (slope, y-intercept,
+          correlation, and coefficient of determination (R^2)) to their values
+        - x_axis: the smallest and the largest x-value of the regression line
+        - line_name: the name of the regression line
+        - title: the title of the figure when this analysis is shown
+        - x_title: the title of the x-axis when this analysis is shown
+        - y_title: the title of the y-axis when this analysis is shown
+
+    Representation Invariants:
+        - len(self.x_coords) == len(self.y_coords) > 0
+        - len(self.x_axis) == 2
+        - self.x_axis[0] < self.x_axis[1]
+    """
+    name: str
+    x_coords: List[float]
+    y_coords: List[float]
+    results: Dict[str, float]
+    x_axis: List[float]
+    line_name: str
+    title: str
+    x_title: str
+    y_title: str
+
+
+@dataclass
+class View:
+    """A dataclass representing a button of the drop-down menu showing several analyses
+    at once.
+
+    Instance Attributes:
+        - label: the label of the button
+        - names: the names of the analyses shown
+        - title: the title of the figure when the analyses are shown
+        - x_title: the title of the x-axis when the analyses are shown
+        - y_title: the title of the y-axis when the analyses are shown
+
+    Representation Invariants:
+        - len(self.names) > 0
+    """
+    label: str
+    names: Tuple[str, ...]
+    title: str
+    x_title: str
+    y_title: str
+
+
+@instrumentation.instrument()
+def display_plots(analyses: List[Analysis], views: Optional[List[View]] = None,
+                  path: Optional[str] = None, include_plotlyjs: Union[bool, str] = True) -> None:
+    """Display the plots for the given analyses, or save them to path.
+
+    analyses and views are the same as for create_figure.
+
+    If path is None, the figure is opened in a browser. Otherwise, it is written to path,
+    without needing a display: as HTML if path ends with '.html', or else as an image in
+    the format of its extension, which needs the kaleido package. include_plotlyjs is how
+    an HTML file includes plotly.js, as for plotly's write_html: True to inline it, or
+    'directory' to share one copy of PLOTLYJS_BUNDLE with the other files of its directory.
+
+    Preconditions:
+        - len(analyses) > 0
+    """
+    fig = create_figure(analyses, views)
+
+    if path is None:
+        # Display the figure with the plots
+        fig.show()
+        return
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.html'):
+        fig.write_html(path, include_plotlyjs=include_plotlyjs)
+    else:
+        fig.write_image(path)
+
+
+@instrumentation.instrument()
+def export_plots(figures: List[Tuple[List[Analysis], List[View]]], paths: List[str],
+                 include_plotlyjs: Union[bool, str] = 'directory', workers: int = 1) -> None:
+    """Save the plots for the analyses and views of each element of figures to the path
+    at the same index of paths, as display_plots does, for example one figure per station.
+
+    workers is the number of processes building and writing the figures. When
+    include_plotlyjs is 'directory', PLOTLYJS_BUNDLE is written once per directory
+    before the figures.
+
+    Preconditions:
+        - len(figures) == len(paths)
+        - all(path is not None for path in paths)
+        - workers >= 1
+    """
+    if include_plotlyjs == 'directory':
+        for directory in {os.path.dirname(os.path.abspath(path)) for path in paths}:
+            write_plotlyjs(directory)
+
+    analyses = [figure[0] for figure in figures]
+    views = [figure[1] for figure in figures]
+    if workers == 1:
+        for figure_analyses, figure_views, path in zip(analyses, views, paths):
+            display_plots(figure_analyses, figure_views, path, include_plotlyjs)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(display_plots, analyses, views, paths,
+                              [include_plotlyjs] * len(paths)))
+
+
+def write_plotlyjs(directory: str) -> None:
+    """Write PLOTLYJS_BUNDLE to the given directory, unless it is already there."""
+    bundle_path = os.path.join(directory, PLOTLYJS_BUNDLE)
+
+    if not os.path.exists(bundle_path):
+        os.makedirs(directory, exist_ok=True)
+        with open(bundle_path + '.tmp', 'w', encoding='utf-8') as file:
+            file.write(plotly.offline.get_plotlyjs())
+        os.replace(bundle_path + '.tmp', bundle_path)
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def create_figure(analyses: List[Analysis], views: Optional[List[View]] = None) -> go.Figure:
+    """Return the figure of the plots for the given analyses, with a drop-down menu
+    showing one analysis per button, and also each of the given views.
+
+    Only the first analysis is initially visible. The buttons are in the order of the
+    analyses, and the button of each view follows the button of the last analysis it
+    shows. The traces are all created before the figure, which validates them once.
+
+    >>> fig = create_figure(example_analyses(3), [View('All', ('0', '1', '2'), '', '', '')])
+    >>> len(fig.data), [button.label for button in fig.layout.updatemenus[0].buttons]
+    (6, ['0', '1', '2', 'All'])
+    >>> fig = create_figure(example_analyses(100))
+    >>> buttons = fig.layout.updatemenus[0].buttons
+    >>> len(fig.data), len(buttons), {len(button.args[0]['visible']) for button in buttons}
+    (200, 100, {200})
+    >>> [i for i, shown in enumerate(buttons[42].args[0]['visible']) if shown]
+    [84, 85]
+
+    Preconditions:
+        - len(analyses) > 0
+        - all names of analyses are different
+        - every name of every view is the name of one of analyses
+    """
+    # ACCUMULATOR: Keep track of the traces of the analyses so far
+    traces_so_far = []
+    for i, analysis in enumerate(analyses):
+        traces_so_far.extend(plot_traces(analysis.x_axis, (analysis.name, analysis.line_name),
+                                         i == 0, (analysis.x_coords, analysis.y_coords,
+                                                  analysis.results)))
+
+    # Add the drop-down menu to the figure by calling create_buttons()
+    return go.Figure(data=traces_so_far, layout=dict(
+        title=analyses[0].title,
+        xaxis_title=analyses[0].x_title,
+        yaxis_title=analyses[0].y_title,
+        updatemenus=[dict(buttons=create_buttons(analyses, views or []))]
+    ))
 
 
-def display_plots(results: List[Tuple[List[float], List[float], Dict[str, float]]]) -> None:
-    """Display the plots for the results of the data analysis.
+def project_analyses(results: List[Tuple[List[float], List[float], Dict[str, float]]]) \
+        -> Tuple[List[Analysis], List[View]]:
+    """Return the analyses and the views of the figure of this project.
 
     results consists of a list containing five tuples.
     Index 0 of the tuples contains the x-coordinates.
@@ -37,46 +227,48 @@ def display_plots(results: List[Tuple[List[float], List[float], Dict[str, float]
         - all(len(result[0]) == len(result[1]) for result in results)
         - results follows the structure and other requirements mentioned above.
     """
-    # Create a blank figure
-    fig = go.Figure()
-
-    # Add the plot and regression line of year vs temperature
-    add_plot(fig=fig, x_axis=[1920, 2150], titles=('Year vs Temperature', 'Regression Line'),
-             initial_visibility=True, results=results[0])
-
-    # Add the plot and regression line of temperature vs nitrogen dioxide concentration
-    add_plot(fig=fig, x_axis=[-50, 50],
-             titles=('Temperature vs Nitrogen Dioxide', 'Nitrogen Dioxide Regression Line'),
-             initial_visibility=False, results=results[1])
-
-    # Add the plot and regression line of temperature vs ozone concentration
-    add_plot(fig=fig, x_axis=[-50, 50],
-             titles=('Temperature vs Ozone', 'Ozone Regression Line'),
-             initial_visibility=False, results=results[2])
-
-    # Add the plot and regression line of year vs nitrogen dioxide concentration
-    add_plot(fig=fig, x_axis=[1920, 2150],
-             titles=('Year vs Nitrogen Dioxide', 'Nitrogen Dioxide Regression Line'),
-             initial_visibility=False, results=results[3])
-
-    # Add the plot and regression line of year vs ozone concentration
-    add_plot(fig=fig, x_axis=[1920, 2150], titles=('Year vs Ozone', 'Ozone Regression Line'),
-             initial_visibility=False, results=results[4])
-
-    # Add the drop-down menu to the figure by calling create_buttons()
-    fig.update_layout(
-        title='Year vs Average Temperature in Toronto',
-        xaxis_title='Year',
-        yaxis_title='Average Temperature (Celsius)',
-        updatemenus=[dict(buttons=create_buttons())]
-    )
-
-    # Display the figure with the plots
-    fig.show()
+    analyses = [
+        Analysis('Year vs Temperature', *results[0], [1920, 2150], 'Regression Line',
+                 'Year vs Average Temperature in Toronto',
+                 'Year', 'Average Temperature (Celsius)'),
+        Analysis('Temperature vs Nitrogen Dioxide', *results[1], [-50, 50],
+                 'Nitrogen Dioxide Regression Line',
+                 'Average Temperature vs Nitrogen Dioxide Concentration in Toronto',
+                 'Temperature (Celsius)', 'Nitrogen Dioxide Concentration (ppb)'),
+        Analysis('Temperature vs Ozone', *results[2], [-50, 50], 'Ozone Regression Line',
+                 'Average Temperature vs Ozone Concentration in Toronto',
+                 'Temperature (Celsius)', 'Ozone Concentration (ppb)'),
+        Analysis('Year vs Nitrogen Dioxide', *results[3], [1920, 2150],
+                 'Nitrogen Dioxide Regression Line',
+                 'Year vs Predicted Nitrogen Dioxide Concentration in Toronto',
+                 'Year', 'Predicted Nitrogen Dioxide Concentration (ppb)'),
+        Analysis('Year vs Ozone', *results[4], [1920, 2150], 'Ozone Regression Line',
+                 'Year vs Predicted Ozone Concentration in Toronto',
+                 'Year', 'Predicted Ozone Concentration (ppb)')]
+
+    views = [View('Temperature vs Concentrations',
+                  ('Temperature vs Nitrogen Dioxide', 'Temperature vs Ozone'),
+                  'Average Temperature vs Concentrations in Toronto',
+                  'Temperature (Celsius)', 'Concentration (ppb)'),
+             View('Year vs Concentrations', ('Year vs Nitrogen Dioxide', 'Year vs Ozone'),
+                  'Year vs Predicted Concentrations in Toronto',
+                  'Year', 'Predicted Concentration (ppb)')]
+
+    return (analyses, views)
+
+
+def example_analyses(n: int) -> List[Analysis]:
+    """Return n analyses named '0', '1', ..., of a few points each, for examples and
+    benchmarks."""
+    return [Analysis(str(i), [0.0, 1.0, 2.0], [0.0, i, 2.0 * i],
+                     {'slope': float(i), 'y-intercept': 0.0, 'correlation': 1.0, 'R^2': 1.0},
+                     [0.0, 2.0], f'Line {i}', f'Analysis {i}', 'x', 'y')
+                     for i in range(n)]
 
 
 def add_plot(fig: go.Figure, x_axis: List[float], titles: Tuple[str, str], initial_visibility: bool,
-             results: Tuple[List[float], List[float], Dict[str, float]]) -> None:
+             results: Tuple[List[float], List[float], Dict[str, float]],
+             decimation: Optional[str] = 'lttb') -> None:
     """Add the plot and regression line for the given results to the given figure.
 
     x_axis is a list containing the smallest x-value at index 0 and the
@@ -88,6 +280,10 @@ def add_plot(fig: go.Figure, x_axis: List[float], titles: Tuple[str, str], initi
     results[1] contains the y-coordinates for the plot.
     results[2] contains a mapping of the regression line results (slope, y-intercept,
     correlation, and coefficient of determination (R^2) to their corresponding values).
+    decimation is the way a plot of more than DISPLAY_POINTS points is reduced to
+    DISPLAY_POINTS points before being drawn, one of DECIMATIONS, or None to draw
+    every point. The regression line is not affected, as it comes from results[2].
+    Plots of more than WEBGL_THRESHOLD drawn points are drawn with WebGL.
 
     Preconditions:
         - len(x_axis) == 2
@@ -95,18 +291,33 @@ def add_plot(fig: go.Figure, x_axis: List[float], titles: Tuple[str, str], initi
         - len(results[0]) > 0
         - len(results[1]) > 0
         - len(results[0]) == len(results[1])
+        - decimation is None or decimation in DECIMATIONS
     """
-    # Add scatter plot
-    fig.add_trace(
-        go.Scatter(name=f'<br>{titles[0]}',
-                   x=results[0],  # x-coordinates
-                   y=results[1],  # y-coordinates
-                   mode='markers',
-                   visible=initial_visibility)
-    )
+    fig.add_traces(plot_traces(x_axis, titles, initial_visibility, results, decimation))
+
+
+def plot_traces(x_axis: List[float], titles: Tuple[str, str], initial_visibility: bool,
+                results: Tuple[List[float], List[float], Dict[str, float]],
+                decimation: Optional[str] = 'lttb') -> List[go.Scatter]:
+    """Return the traces of the plot and regression line for the given results, the
+    scatter plot followed by the regression line.
 
-    # Add regression line
-    fig.add_trace(
+    The parameters are the same as for add_plot.
+    """
+    x_coords, y_coords = results[0], results[1]
+    if decimation is not None and len(x_coords) > DISPLAY_POINTS:
+        x_coords, y_coords = decimate(x_coords, y_coords, DISPLAY_POINTS, decimation)
+    scatter = go.Scattergl if len(x_coords) > WEBGL_THRESHOLD else go.Scatter
+
+    return [
+        # Scatter plot
+        scatter(name=f'<br>{titles[0]}',
+                x=x_coords,  # x-coordinates
+                y=y_coords,  # y-coordinates
+                mode='markers',
+                visible=initial_visibility),
+
+        # Regression line
         go.Scatter(name=f'<br>{titles[1]}'
                         f'<br>Slope: {round(results[2]["slope"], 3)}'
                         f'<br>Y-intercept: {round(results[2]["y-intercept"], 3)}'
@@ -121,91 +332,151 @@ def add_plot(fig: go.Figure, x_axis: List[float], titles: Tuple[str, str], initi
                                     x_axis[1])],
                    mode='lines',
                    visible=initial_visibility)
-    )
+    ]
 
 
-def create_buttons() -> List[Dict[str, Any]]:
-    """Return a list of the seven buttons for a drop-down menu."""
-    # Button for year vs temperature plot
-    button1 = dict(
-        label='Year vs Temperature',
-        method='update',
-        args=[{'visible': [True, True, False, False, False, False,
-                           False, False, False, False]},
-              {'title': 'Year vs Average Temperature in Toronto',
-               'xaxis': {'title': 'Year'},
-               'yaxis': {'title': 'Average Temperature (Celsius)'}}]
-    )
+def decimate(x_coords: List[float], y_coords: List[float], n_points: int,
+             decimation: str = 'lttb') -> Tuple[np.ndarray, np.ndarray]:
+    """Return n_points or fewer of the given points, sorted by x-coordinate, chosen to keep
+    the shape of the plot.
 
-    # Button for temperature vs nitrogen dioxide concentration plot
-    button2 = dict(
-        label='Temperature vs Nitrogen Dioxide',
-        method='update',
-        args=[{'visible': [False, False, True, True, False, False,
-                           False, False, False, False]},
-              {'title': 'Average Temperature vs Nitrogen Dioxide '
-                        'Concentration in Toronto',
-               'xaxis': {'title': 'Temperature (Celsius)'},
-               'yaxis': {'title': 'Nitrogen Dioxide Concentration (ppb)'}}]
-    )
+    If decimation is 'lttb', the points are chosen by the Largest-Triangle-Three-Buckets
+    algorithm. If decimation is 'minmax', the points are the lowest and the highest of
+    each of n_points // 2 buckets of consecutive x-coordinates.
 
-    # Button for temperature vs ozone concentration plot
-    button3 = dict(
-        label='Temperature vs Ozone',
-        method='update',
-        args=[{'visible': [False, False, False, False, True, True,
-                           False, False, False, False]},
-              {'title': 'Average Temperature vs Ozone Concentration in Toronto',
-               'xaxis': {'title': 'Temperature (Celsius)'},
-               'yaxis': {'title': 'Ozone Concentration (ppb)'}}]
-    )
+    >>> decimate([3.0, 0.0, 1.0, 2.0, 4.0], [1.0, 0.0, 5.0, 0.5, 0.0], 3)[1].tolist()
+    [0.0, 5.0, 0.0]
 
-    # Button for temperature vs concentrations plots
-    button4 = dict(
-        label='Temperature vs Concentrations',
-        method='update',
-        args=[{'visible': [False, False, True, True, True, True,
-                           False, False, False, False]},
-              {'title': 'Average Temperature vs Concentrations in Toronto',
-               'xaxis': {'title': 'Temperature (Celsius)'},
-               'yaxis': {'title': 'Concentration (ppb)'}}]
-    )
+    Preconditions:
+        - len(x_coords) == len(y_coords)
+        - n_points >= 3
+        - decimation in DECIMATIONS
+    """
+    x_array = np.asarray(x_coords)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    order = np.argsort(x_array, kind='stable')
+    x_array = x_array[order]
+    y_array = y_array[order]
 
-    # Button for year vs nitrogen dioxide concentration plot
-    button5 = dict(
-        label='Year vs Nitrogen Dioxide',
-        method='update',
-        args=[{'visible': [False, False, False, False, False, False,
-                           True, True, False, False]},
-              {'title': 'Year vs Predicted Nitrogen Dioxide Concentration in Toronto',
-               'xaxis': {'title': 'Year'},
-               'yaxis': {'title': 'Predicted Nitrogen Dioxide Concentration (ppb)'}}]
-    )
+    if len(x_array) <= n_points:
+        return (x_array, y_array)
+    elif decimation == 'lttb':
+        indices = lttb_indices(x_array.astype(np.float64), y_array, n_points)
+    else:
+        indices = minmax_indices(y_array, n_points // 2)
 
-    # Button for year vs ozone concentration plot
-    button6 = dict(
-        label='Year vs Ozone',
-        method='update',
-        args=[{'visible': [False, False, False, False, False, False,
-                           False, False, True, True]},
-              {'title': 'Year vs Predicted Ozone Concentration in Toronto',
-               'xaxis': {'title': 'Year'},
-               'yaxis': {'title': 'Predicted Ozone Concentration (ppb)'}}]
-    )
+    return (x_array[indices], y_array[indices])
+
+
+def lttb_indices(x_array: np.ndarray, y_array: np.ndarray, n_points: int) -> np.ndarray:
+    """Return the indices of the n_points points chosen by the Largest-Triangle-Three-Buckets
+    algorithm from the given points, sorted by x-coordinate.
 
-    # Button for year vs concentrations plot
-    button7 = dict(
-        label='Year vs Concentrations',
+    The first and the last points are kept, and the others are split into n_points - 2
+    buckets. From each bucket, the point kept forms the largest triangle with the point
+    kept from the previous bucket and the average point of the next bucket.
+
+    Preconditions:
+        - len(x_array) == len(y_array) > n_points >= 3
+        - x_array is sorted
+    """
+    n = len(x_array)
+    edges = np.linspace(1, n - 1, n_points - 1).astype(np.int64)
+    counts = np.diff(edges)
+    x_averages = np.append(np.add.reduceat(x_array[:-1], edges[:-1]) / counts, x_array[-1])
+    y_averages = np.append(np.add.reduceat(y_array[:-1], edges[:-1]) / counts, y_array[-1])
+
+    indices = np.empty(n_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        x_previous, y_previous = x_array[previous], y_array[previous]
+        # Twice the areas of the triangles, up to sign
+        areas = np.abs((x_previous - x_averages[bucket + 1])
+                       * (y_array[start:stop] - y_previous)
+                       - (x_previous - x_array[start:stop])
+                       * (y_averages[bucket + 1] - y_previous))
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+
+    return indices
+
+
+def minmax_indices(y_array: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Return the indices, in increasing order, of the lowest and the highest point of each
+    of n_buckets buckets of consecutive points.
+
+    Preconditions:
+        - len(y_array) >= n_buckets > 0
+    """
+    n = len(y_array)
+    buckets = np.arange(n) * n_buckets // n
+    # Sort by y-coordinate within each bucket, so each bucket starts with its lowest
+    # point and ends with its highest
+    order = np.lexsort((y_array, buckets))
+    starts = np.searchsorted(buckets, np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def create_buttons(analyses: List[Analysis], views: List[View]) -> List[Dict[str, Any]]:
+    """Return a list of the buttons for a drop-down menu: one per analysis, in order,
+    and one per view, following the button of the last analysis the view shows.
+
+    Each analysis has two traces, its plot and its regression line, so the visibility
+    lists have 2 * len(analyses) elements.
+
+    >>> buttons = create_buttons(example_analyses(2), [View('Both', ('0', '1'), '', '', '')])
+    >>> [button['args'][0]['visible'] for button in buttons]
+    [[True, True, False, False], [False, False, True, True], [True, True, True, True]]
+
+    Preconditions:
+        - all names of analyses are different
+        - every name of every view is the name of one of analyses
+    """
+    positions = {analysis.name: i for i, analysis in enumerate(analyses)}
+
+    # Map the position of each analysis to the views following its button
+    views_after = {}
+    for view in views:
+        last = max(positions[name] for name in view.names)
+        views_after.setdefault(last, []).append(view)
+
+    # ACCUMULATOR: Keep track of the buttons so far
+    buttons_so_far = []
+    for i, analysis in enumerate(analyses):
+        buttons_so_far.append(create_button(analysis.name, [i], len(analyses),
+                                            (analysis.title, analysis.x_title, analysis.y_title)))
+        for view in views_after.get(i, []):
+            buttons_so_far.append(create_button(view.label,
+                                                [positions[name] for name in view.names],
+                                                len(analyses),
+                                                (view.title, view.x_title, view.y_title)))
+
+    return buttons_so_far
+
+
+def create_button(label: str, shown: List[int], n_analyses: int,
+                  titles: Tuple[str, str, str]) -> Dict[str, Any]:
+    """Return the button with the given label showing the plots of the analyses at the
+    indices in shown, out of n_analyses analyses.
+
+    titles contains the title of the figure, of the x-axis and of the y-axis.
+    """
+    visible = np.zeros((n_analyses, 2), dtype=bool)
+    visible[shown] = True
+
+    return dict(
+        label=label,
         method='update',
-        args=[{'visible': [False, False, False, False, False, False,
-                           True, True, True, True]},
-              {'title': 'Year vs Predicted Concentrations in Toronto',
-               'xaxis': {'title': 'Year'},
-               'yaxis': {'title': 'Predicted Concentration (ppb)'}}]
+        args=[{'visible': visible.ravel().tolist()},
+              {'title': titles[0],
+               'xaxis': {'title': titles[1]},
+               'yaxis': {'title': titles[2]}}]
     )
 
-    return [button1, button2, button3, button4, button5, button6, button7]
-
 
 def evaluate_line(slope: float, y_intercept: float, x: float) -> float:
     """Return the y-value given the slope and the y-intercept of the regression line
@@ -226,9 +497,11 @@ if __name__ == '__main__':
     python_ta.check_all(
         config={
             # The names (strs) of imported modules
-            'extra-imports': ['plotly.graph_objects', 'python_ta.contracts'],
+            'extra-imports': ['dataclasses', 'concurrent.futures', 'os', 'numpy',
+                              'plotly.graph_objects', 'plotly.offline', 'instrumentation',
+                              'python_ta.contracts'],
             # The names (strs) of functions that call print/open/input
-            'allowed-io': [],
+            'allowed-io': ['write_plotlyjs'],
             'max-line-length': 100,
             'disable': ['R1705', 'C0200']
         }
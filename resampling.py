@@ -0,0 +1,256 @@
+"""CSC110 Project 2020: The Resampling of the Project
+
+Description
+===========
+This module estimates the uncertainty of the results of simple linear regression
+by resampling the coordinates. Bootstrap replicates, drawn with replacement, give
+confidence intervals for the slope, the y-intercept, the correlation and R^2, and
+permutation replicates, which shuffle the y-coordinates, give the p-value of the
+correlation.
+
+The replicates are computed in batches, one row of a matrix of indices per
+replicate, and the batches can be spread over a pool of processes. Each batch
+draws from its own seed, spawned from the given seed, so the replicates are the
+same whatever the number of processes.
+
+Copyright and Usage Information
+===============================
+This file is for the personal and private use of Katherine Luo, Kevin Xia,
+and Jennifer Cao. Any form of distribution of this code, with or without
+changes to this code, is prohibited.
+
+This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
+"""
+from typing import Callable, Dict, List
+import concurrent.futures
+
+import numpy as np
+
+import data_analysis
+import instrumentation
+
+# The approximate number of resampled coordinates held in memory at once per batch,
+# small enough for a batch to stay in the CPU cache
+BATCH_ELEMENTS = 2 ** 16
+
+# The keys of the results of simple linear regression, in the order of the rows
+# returned by bootstrap_batch
+RESULT_KEYS = ('slope', 'y-intercept', 'correlation', 'R^2')
+
+# The default seed of the random replicates
+DEFAULT_SEED = 110
+
+
+@instrumentation.instrument(rows=instrumentation.argument_rows)
+def resampled_linear_regression(x_coords: data_analysis.Coordinates,
+                                y_coords: data_analysis.Coordinates,
+                                replicates: int = 2000, confidence: float = 0.95,
+                                seed: int = DEFAULT_SEED, workers: int = 1) -> Dict[str, float]:
+    """Return the results of simple_linear_regression on the given x- and y-coordinates,
+    with the bounds of their bootstrap confidence intervals and the permutation p-value
+    of the correlation.
+
+    For each key of simple_linear_regression, the mapping also holds key + ' lower' and
+    key + ' upper', the percentile bounds of the confidence interval at the given level,
+    computed from replicates bootstrap replicates. 'p-value' is the two-sided p-value of
+    the correlation against replicates permutations of the y-coordinates.
+
+    workers is the number of processes computing the replicates. The results only
+    depend on the coordinates, replicates, confidence and seed.
+
+    >>> results = resampled_linear_regression([1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    ...                                       [2.0, 4.1, 5.9, 8.2, 9.8, 12.1], replicates=200)
+    >>> results['slope lower'] <= results['slope'] <= results['slope upper']
+    True
+    >>> results['p-value'] < 0.05
+    True
+
+    Preconditions:
+        - len(x_coords) > 1
+        - len(x_coords) == len(y_coords)
+        - replicates > 0
+        - 0 < confidence < 1
+        - workers >= 1
+    """
+    results = data_analysis.simple_linear_regression(x_coords, y_coords)
+    bootstrap = bootstrap_regression(x_coords, y_coords, replicates, seed, workers)
+    correlations = permutation_correlations(x_coords, y_coords, replicates, seed, workers)
+
+    tail = (1 - confidence) / 2
+    for key in RESULT_KEYS:
+        # Degenerate replicates, where every resampled x-coordinate is equal, are NaN
+        lower, upper = np.nanquantile(bootstrap[key], [tail, 1 - tail])
+        results[key + ' lower'] = float(lower)
+        results[key + ' upper'] = float(upper)
+
+    # Count the observed correlation as one of the permutations, so the p-value is never 0
+    extreme = int(np.count_nonzero(np.abs(correlations) >= abs(results['correlation']) - 1e-12))
+    results['p-value'] = (extreme + 1) / (replicates + 1)
+
+    return results
+
+
+def bootstrap_regression(x_coords: data_analysis.Coordinates,
+                         y_coords: data_analysis.Coordinates, replicates: int = 2000,
+                         seed: int = DEFAULT_SEED, workers: int = 1) -> Dict[str, np.ndarray]:
+    """Return a mapping of the keys of simple_linear_regression to arrays holding their
+    values for each of replicates bootstrap replicates of the given coordinates.
+
+    Each replicate draws len(x_coords) points with replacement. workers is the number of
+    processes computing the replicates.
+
+    Preconditions:
+        - len(x_coords) > 0
+        - len(x_coords) == len(y_coords)
+        - replicates > 0
+        - workers >= 1
+    """
+    rows = np.concatenate(run_batches(bootstrap_batch, x_coords, y_coords,
+                                      replicates, seed, workers), axis=1)
+
+    return {key: rows[i] for i, key in enumerate(RESULT_KEYS)}
+
+
+def permutation_correlations(x_coords: data_analysis.Coordinates,
+                             y_coords: data_analysis.Coordinates, replicates: int = 2000,
+                             seed: int = DEFAULT_SEED, workers: int = 1) -> np.ndarray:
+    """Return the correlations of replicates permutation replicates of the given
+    coordinates, each pairing the x-coordinates with a shuffle of the y-coordinates.
+
+    workers is the number of processes computing the replicates.
+
+    Preconditions:
+        - len(x_coords) > 0
+        - len(x_coords) == len(y_coords)
+        - replicates > 0
+        - workers >= 1
+    """
+    return np.concatenate(run_batches(permutation_batch, x_coords, y_coords,
+                                      replicates, seed, workers))
+
+
+def run_batches(batch: Callable[[np.ndarray, np.ndarray, int, np.random.SeedSequence],
+                                np.ndarray],
+                x_coords: data_analysis.Coordinates, y_coords: data_analysis.Coordinates,
+                replicates: int, seed: int, workers: int) -> List[np.ndarray]:
+    """Return the results of batch on the given coordinates for replicates replicates,
+    split in batches of about BATCH_ELEMENTS resampled coordinates, in order.
+
+    The batches and their seeds, spawned from seed, do not depend on workers, the
+    number of processes computing them. Each process computes a contiguous run of
+    batches, so the coordinates are sent to it only once.
+
+    Preconditions:
+        - replicates > 0
+        - workers >= 1
+    """
+    x_array = np.asarray(x_coords, dtype=np.float64)
+    y_array = np.asarray(y_coords, dtype=np.float64)
+    batch_size = max(1, BATCH_ELEMENTS // len(x_array))
+    sizes = [min(batch_size, replicates - start) for start in range(0, replicates, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers == 1 or len(sizes) == 1:
+        return compute_batches(batch, x_array, y_array, sizes, seeds)
+    else:
+        bounds = np.linspace(0, len(sizes), min(workers, len(sizes)) + 1).astype(int).tolist()
+        runs = list(zip(bounds[:-1], bounds[1:]))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(compute_batches, [batch] * len(runs),
+                                   [x_array] * len(runs), [y_array] * len(runs),
+                                   [sizes[start:stop] for start, stop in runs],
+                                   [seeds[start:stop] for start, stop in runs])
+            return [rows for run_rows in results for rows in run_rows]
+
+
+def compute_batches(batch: Callable[[np.ndarray, np.ndarray, int, np.random.SeedSequence],
+                                    np.ndarray],
+                    x_array: np.ndarray, y_array: np.ndarray, sizes: List[int],
+                    seeds: List[np.random.SeedSequence]) -> List[np.ndarray]:
+    """Return the results of batch on the given coordinates for each size in sizes,
+    drawn from the seed at the same index of seeds.
+
+    Preconditions:
+        - len(sizes) == len(seeds)
+    """
+    return [batch(x_array, y_array, size, child) for size, child in zip(sizes, seeds)]
+
+
+def bootstrap_batch(x_array: np.ndarray, y_array: np.ndarray, size: int,
+                    seed: np.random.SeedSequence) -> np.ndarray:
+    """Return an array of shape (4, size) of the slope, the y-intercept, the correlation
+    and R^2 of size bootstrap replicates of the given coordinates, drawn from seed.
+
+    The coordinates are centred on their averages before being resampled, so the sums
+    of each replicate do not lose precision to cancellation.
+
+    Preconditions:
+        - len(x_array) > 0
+        - len(x_array) == len(y_array)
+        - size > 0
+    """
+    n = len(x_array)
+    x_shift = x_array.mean()
+    y_shift = y_array.mean()
+    indices = np.random.default_rng(seed).integers(0, n, size * n)
+    x_samples = (x_array - x_shift)[indices].reshape(size, n)
+    y_samples = (y_array - y_shift)[indices].reshape(size, n)
+
+    sum_x = x_samples.sum(axis=1)
+    sum_y = y_samples.sum(axis=1)
+    numerator = np.einsum('ij,ij->i', x_samples, y_samples) - sum_x * sum_y / n
+    x_denominator = np.einsum('ij,ij->i', x_samples, x_samples) - sum_x * sum_x / n
+    y_denominator = np.einsum('ij,ij->i', y_samples, y_samples) - sum_y * sum_y / n
+    x_avg = x_shift + sum_x / n
+    y_avg = y_shift + sum_y / n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = numerator / x_denominator
+        return np.array([slope, y_avg - slope * x_avg,
+                         numerator / np.sqrt(x_denominator * y_denominator),
+                         1 - (y_denominator - slope * numerator) / y_denominator])
+
+
+def permutation_batch(x_array: np.ndarray, y_array: np.ndarray, size: int,
+                      seed: np.random.SeedSequence) -> np.ndarray:
+    """Return the correlations of size permutation replicates of the given coordinates,
+    drawn from seed.
+
+    Shuffling the y-coordinates leaves their average and the denominators of the
+    correlation unchanged, so only the numerator is computed per replicate.
+
+    Preconditions:
+        - len(x_array) > 0
+        - len(x_array) == len(y_array)
+        - size > 0
+    """
+    x_centred = x_array - x_array.mean()
+    y_centred = y_array - y_array.mean()
+    denominator = np.sqrt(np.dot(x_centred, x_centred) * np.dot(y_centred, y_centred))
+
+    indices = np.random.default_rng(seed).permuted(
+        np.broadcast_to(np.arange(len(y_array)), (size, len(y_array))), axis=1)
+
+    return (y_centred[indices] @ x_centred) / denominator
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import python_ta
+    python_ta.check_all(
+        config={
+            # The names (strs) of imported modules
+            'extra-imports': ['concurrent.futures', 'numpy', 'data_analysis', 'instrumentation',
+                              'python_ta.contracts'],
+            # The names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            'max-line-length': 100,
+            'disable': ['R1705', 'C0200']
+        }
+    )
@@ -0,0 +1,317 @@
+"""CSC110 Project 2020: The Stations of the Project
+
+Description
+===========
+This module runs the workflow of main.py (loading the datasets, aggregating the
+daily temperatures by year and performing the five regressions) for many weather
+stations, possibly in many cities, and collects their results into one table.
+
+The stations are described by a registry: a JSON file listing, for each station,
+its name, its city, the paths of its atmosphere and daily temperature CSV files,
+and the names of the columns of those files holding each column of
+TorontoAtmosphereTable and TorontoTemperatureTable. Columns that are not given are
+looked up under the names of the Toronto files, so the registry of stations.json,
+which only has Toronto, needs no column names.
+
+The stations are analysed in a pool of processes, one station at a time per
+process. A process only returns the results of its station, so its memory is
+bounded by the largest station it loads, and it can be capped with memory_limit.
+
+Copyright and Usage Information
+===============================
+This file is for the personal and private use of Katherine Luo, Kevin Xia,
+and Jennifer Cao. Any form of distribution of this code, with or without
+changes to this code, is prohibited.
+
+This file is Copyright (c) 2020 Katherine Luo, Kevin Xia, and Jennifer Cao.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import concurrent.futures
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+import data_wrangling
+import pipeline
+
+# The names of the columns of the Toronto CSV files holding each column of
+# TorontoAtmosphereTable and TorontoTemperatureTable, the defaults of every station
+TORONTO_ATMOSPHERE_HEADERS = {'timestamps': 'Date', 'temperature': 'temperature',
+                              'nitrogen_dioxide': 'NO2', 'ozone': 'O3', 'oxidants': 'OX',
+                              'ozone_8hr': 'O3 moving 8hr'}
+TORONTO_DAILY_HEADERS = {'dates': 'date', 'avg_temps': 'avg_temperature'}
+
+# The five regressions of pipeline.summarize_results, in order: year vs temperature,
+# temperature vs nitrogen dioxide and ozone, and year vs predicted nitrogen dioxide and ozone
+REGRESSIONS = ('year_temperature', 'temperature_no2', 'temperature_o3', 'year_predicted_no2',
+               'year_predicted_o3')
+
+# The keys of the results of simple linear regression
+RESULT_KEYS = ('slope', 'y-intercept', 'correlation', 'R^2')
+
+
+@dataclass
+class Station:
+    """A dataclass representing the datasets of one weather station.
+
+    Instance Attributes:
+        - name: the unique name of the station
+        - city: the city of the station
+        - atmosphere_path: the path of the CSV file of hourly atmosphere readings
+        - daily_path: the path of the CSV file of average daily temperatures
+        - atmosphere_headers: a mapping of the columns of TorontoAtmosphereTable to the
+          names of the columns of the atmosphere file holding them
+        - daily_headers: a mapping of the columns of TorontoTemperatureTable to the names
+          of the columns of the daily file holding them
+
+    Representation Invariants:
+        - self.name != ''
+        - set(self.atmosphere_headers) == set(data_wrangling.ATMOSPHERE_COLUMNS)
+        - set(self.daily_headers) == set(data_wrangling.DAILY_COLUMNS)
+    """
+    name: str
+    city: str
+    atmosphere_path: str
+    daily_path: str
+    atmosphere_headers: Dict[str, str] = field(
+        default_factory=lambda: dict(TORONTO_ATMOSPHERE_HEADERS))
+    daily_headers: Dict[str, str] = field(default_factory=lambda: dict(TORONTO_DAILY_HEADERS))
+
+
+@dataclass
+class StationSummary:
+    """A dataclass representing the results of the five regressions of many stations,
+    as columns.
+
+    Row i of each array is the station names[i]. Column j of each array of results is
+    the regression REGRESSIONS[j]. The results of a station whose analysis failed are NaN,
+    and its error is errors[i].
+
+    Instance Attributes:
+        - names: the names of the stations
+        - cities: the cities of the stations
+        - results: a mapping of each key of simple_linear_regression to a float64 array of
+          shape (len(names), len(REGRESSIONS)) of its values
+        - seconds: the wall time of the analysis of each station (in seconds)
+        - errors: the error of each station whose analysis failed, or '' for the others
+
+    Representation Invariants:
+        - len(self.names) == len(self.cities) == len(self.seconds) == len(self.errors)
+        - all(self.results[key].shape == (len(self.names), len(REGRESSIONS))
+              for key in RESULT_KEYS)
+    """
+    names: List[str]
+    cities: List[str]
+    results: Dict[str, np.ndarray]
+    seconds: np.ndarray
+    errors: List[str]
+
+
+def read_registry(path: str) -> List[Station]:
+    """Return the stations of the registry at path.
+
+    The registry is a JSON object whose 'stations' are objects with a 'name', a 'city',
+    an 'atmosphere_path' and a 'daily_path', relative to the directory of the registry,
+    and optionally 'atmosphere_headers' and 'daily_headers' mapping columns of the tables
+    to the names of the columns of the files holding them.
+
+    Raise a ValueError if two stations have the same name.
+
+    >>> [(station.name, station.daily_headers) for station in read_registry('stations.json')]
+    [('toronto', {'dates': 'date', 'avg_temps': 'avg_temperature'})]
+    """
+    with open(path) as file:
+        registry = json.load(file)
+
+    directory = os.path.dirname(path)
+    stations = []
+    for entry in registry['stations']:
+        atmosphere_headers = dict(TORONTO_ATMOSPHERE_HEADERS)
+        atmosphere_headers.update(entry.get('atmosphere_headers', {}))
+        daily_headers = dict(TORONTO_DAILY_HEADERS)
+        daily_headers.update(entry.get('daily_headers', {}))
+        stations.append(Station(entry['name'], entry['city'],
+                                os.path.join(directory, entry['atmosphere_path']),
+                                os.path.join(directory, entry['daily_path']),
+                                atmosphere_headers, daily_headers))
+
+    names = [station.name for station in stations]
+    if len(set(names)) != len(names):
+        raise ValueError(f'{path} has more than one station with the same name')
+
+    return stations
+
+
+def station_parameters(station: Station) -> Dict[str, Any]:
+    """Return the parameters of the project pipeline loading the files of station.
+
+    Raise a ValueError if one of the files has no column with a name in its headers.
+    """
+    return {'atmosphere_path': station.atmosphere_path,
+            'daily_path': station.daily_path,
+            'atmosphere_usecols': data_wrangling.header_indices(
+                station.atmosphere_path,
+                tuple(station.atmosphere_headers[name]
+                      for name in data_wrangling.ATMOSPHERE_COLUMNS)),
+            'daily_usecols': data_wrangling.header_indices(
+                station.daily_path,
+                tuple(station.daily_headers[name] for name in data_wrangling.DAILY_COLUMNS))}
+
+
+def analyze_station(station: Station, cache_dir: Optional[str] = None) \
+        -> Tuple[List[Dict[str, float]], float, str]:
+    """Return the results of the five regressions of station, as
+    pipeline.compute_results, the wall time of its analysis and '', or no results, the
+    wall time and the error if its files could not be read (or were truncated).
+
+    The results of the stages are saved to a directory named after the station in
+    cache_dir, unless it is None.
+    """
+    start = time.perf_counter()
+    station_cache_dir = None if cache_dir is None else os.path.join(cache_dir, station.name)
+
+    try:
+        results = pipeline.compute_results(station_parameters(station), station_cache_dir)
+    except (OSError, EOFError, ValueError, MemoryError) as error:
+        return ([], time.perf_counter() - start, f'{type(error).__name__}: {error}')
+
+    return (results, time.perf_counter() - start, '')
+
+
+def analyze_stations(stations: List[Station], workers: int = 1,
+                     cache_dir: Optional[str] = None,
+                     memory_limit: Optional[int] = None) -> StationSummary:
+    """Return the summary of the analysis of each station, in order.
+
+    With more than one worker, or if memory_limit is not None, the stations are analysed
+    in a pool of that many processes, one station at a time per process, and memory_limit
+    caps the memory of each process (in bytes), if it is not None. A station that needs
+    more fails with a MemoryError in the summary instead of stopping the other stations.
+    cache_dir is the same as for analyze_station.
+
+    Preconditions:
+        - workers >= 1
+        - memory_limit is None or memory_limit > 0
+    """
+    if memory_limit is None and (workers == 1 or len(stations) <= 1):
+        outcomes = [analyze_station(station, cache_dir) for station in stations]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    initializer=limit_memory,
+                                                    initargs=(memory_limit,)) as executor:
+            outcomes = list(executor.map(analyze_station, stations,
+                                         [cache_dir] * len(stations)))
+
+    return summarize_stations(stations, outcomes)
+
+
+def limit_memory(memory_limit: Optional[int]) -> None:
+    """Cap the address space of this process at memory_limit bytes, if it is not None and
+    the operating system supports it. This initializes the processes of analyze_stations.
+    """
+    if memory_limit is None:
+        return
+
+    # resource is only available on Unix
+    try:
+        import resource
+    except ImportError:
+        return
+
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+def summarize_stations(stations: List[Station],
+                       outcomes: List[Tuple[List[Dict[str, float]], float, str]]) \
+        -> StationSummary:
+    """Return the summary of the given outcomes of analyze_station for each station.
+
+    >>> station = Station('toronto', 'Toronto', 'a.csv', 'b.csv')
+    >>> results = [{'slope': 1.0, 'y-intercept': 0.0, 'correlation': 0.5, 'R^2': 0.25}] * 5
+    >>> summary = summarize_stations([station, station], [(results, 1.5, ''),
+    ...                                                    ([], 0.5, 'OSError: missing')])
+    >>> summary.results['slope'].tolist()[1]
+    [nan, nan, nan, nan, nan]
+    >>> summary.errors
+    ['', 'OSError: missing']
+
+    Preconditions:
+        - len(stations) == len(outcomes)
+    """
+    results = {key: np.full((len(stations), len(REGRESSIONS)), np.nan) for key in RESULT_KEYS}
+    for i, (station_results, _, _) in enumerate(outcomes):
+        for j, regression_results in enumerate(station_results):
+            for key in RESULT_KEYS:
+                results[key][i, j] = regression_results[key]
+
+    return StationSummary(names=[station.name for station in stations],
+                          cities=[station.city for station in stations],
+                          results=results,
+                          seconds=np.array([outcome[1] for outcome in outcomes]),
+                          errors=[outcome[2] for outcome in outcomes])
+
+
+def format_station_summary(summary: StationSummary, key: str = 'slope') -> str:
+    """Return a table of the given result of the five regressions of each station, or of
+    its error if its analysis failed.
+
+    Preconditions:
+        - key in RESULT_KEYS
+    """
+    lines = [f'{"station":<16} {"city":<16} {"seconds":>8} '
+             + ' '.join(f'{regression:>19}' for regression in REGRESSIONS)]
+    for i in range(len(summary.names)):
+        row = f'{summary.names[i]:<16} {summary.cities[i]:<16} {summary.seconds[i]:>8.3f} '
+        if summary.errors[i] != '':
+            lines.append(row + summary.errors[i])
+        else:
+            lines.append(row + ' '.join(f'{value:>19.6g}' for value in summary.results[key][i]))
+
+    return '\n'.join(lines)
+
+
+def write_station_summary(summary: StationSummary, path: str) -> None:
+    """Write the summary to a CSV file at path, with one row per station and one column
+    per result of each regression, named after the regression and the key of the result.
+    """
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['station', 'city', 'seconds', 'error']
+                        + [f'{regression} {key}' for regression in REGRESSIONS
+                           for key in RESULT_KEYS])
+        for i in range(len(summary.names)):
+            writer.writerow([summary.names[i], summary.cities[i], summary.seconds[i],
+                             summary.errors[i]]
+                            + [summary.results[key][i, j] for j in range(len(REGRESSIONS))
+                               for key in RESULT_KEYS])
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(verbose=True)
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import python_ta
+    python_ta.check_all(
+        config={
+            # The names (strs) of imported modules
+            'extra-imports': ['concurrent.futures', 'csv', 'dataclasses', 'json', 'os', 'resource',
+                              'time', 'numpy', 'data_wrangling', 'pipeline',
+                              'python_ta.contracts'],
+            # The names (strs) of functions that call print/open/input
+            'allowed-io': ['read_registry', 'write_station_summary'],
+            'max-line-length': 100,
+            # resource is imported inside limit_memory, since it is only available on Unix
+            'disable': ['R1705', 'C0200', 'C0415']
+        }
+    )